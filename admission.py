@@ -0,0 +1,242 @@
+"""
+Session admission control
+
+Her yeni WebSocket session'ı model yüklenmeden önce buradan geçer. Son
+ADMISSION_WINDOW_SECONDS içindeki ASR sonuçlarından (canlı session'ların
+final ve partial decode'ları ile /jobs utterance'ları) ölçülür:
+
+  rtf          decode süresi / ses süresi (batch'te utterance payı)
+  utilization  decode'da geçen süre / (pencere × paralel decode sayısı)
+  p95          final utterance'ların gecikmesinin (session kuyruğu +
+               scheduler kuyruğu + decode) 95. yüzdeliği
+
+Yeni session mevcut session'ların ortalama yükünü ekler varsayımıyla
+kullanımın canlı payı n+1/n oranında büyütülür (/jobs payı aynı kalır) ve
+p95 gecikme kuyruk modeliyle tahmin edilir: decode p95 / (1 - kullanım).
+Tahmin (veya ölçülen p95) ADMISSION_P95_SLO_MS'i aşıyorsa session
+ADMISSION_QUEUE_SECONDS'a kadar sırada bekletilir (session_queued),
+kapasite açılmazsa reddedilir (session_rejected). Hiç session yokken her zaman kabul edilir.
+
+ADMISSION_P95_SLO_MS=0 (varsayılan): kapalı, yalnızca ADMISSION_MAX_SESSIONS.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+import runtime
+
+# Final utterance gecikmesi için p95 hedefi (ms, 0: SLO kontrolü kapalı)
+ADMISSION_P95_SLO_MS = float(os.environ.get("ADMISSION_P95_SLO_MS", "0"))
+# Ölçüm penceresi (s)
+ADMISSION_WINDOW_SECONDS = float(os.environ.get("ADMISSION_WINDOW_SECONDS", "60"))
+# Kapasite yoksa yeni session'ın bekleyebileceği süre (0: hemen reddet)
+ADMISSION_QUEUE_SECONDS = float(os.environ.get("ADMISSION_QUEUE_SECONDS", "10"))
+# Aynı anda sırada bekleyebilecek en fazla session
+ADMISSION_MAX_QUEUED = int(os.environ.get("ADMISSION_MAX_QUEUED", "16"))
+# Açık session üst sınırı (0: sınırsız)
+ADMISSION_MAX_SESSIONS = int(os.environ.get("ADMISSION_MAX_SESSIONS", "0"))
+
+# Tahmin için gereken en az final utterance
+MIN_SAMPLES = 5
+# Kullanımın hesaplandığı en kısa süre (ilk ölçümlerde aşırı tahmini önler)
+MIN_SPAN_SECONDS = 5.0
+# Sıradaki session'ların kapasiteyi yeniden değerlendirme aralığı (s)
+RECHECK_SECONDS = 0.5
+
+ADMITTED_SESSIONS = metrics.Counter(
+    'whisper_admitted_sessions_total', 'Sessions admitted (queued: admitted after waiting)', labels=('queued',)
+)
+REJECTED_SESSIONS = metrics.Counter(
+    'whisper_rejected_sessions_total', 'Sessions rejected by admission control', labels=('reason',)
+)
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of values, nearest rank"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Decision:
+    """Outcome of one admission request"""
+
+    def __init__(self, admitted, reason=None, waited=0.0, estimate=None):
+        self.admitted = admitted
+        self.reason = reason  # Ret nedeni: slo, max_sessions, queue_full, timeout
+        self.waited = waited
+        self.estimate = estimate
+
+
+class AdmissionController:
+    """Admits sessions while the predicted p95 latency stays within the SLO"""
+
+    def __init__(self, slo_ms=ADMISSION_P95_SLO_MS, window_seconds=ADMISSION_WINDOW_SECONDS,
+                 parallelism=1, max_sessions=ADMISSION_MAX_SESSIONS,
+                 queue_seconds=ADMISSION_QUEUE_SECONDS, max_queued=ADMISSION_MAX_QUEUED):
+        self.slo = slo_ms / 1000.0
+        self.window = window_seconds
+        self.parallelism = max(1, int(parallelism))
+        self.max_sessions = max_sessions
+        self.queue_seconds = queue_seconds
+        self.max_queued = max_queued
+        self.active = 0
+        self._cond = threading.Condition()  # RLock: estimate() kilit altında da çağrılır
+        self._waiting = deque()  # FIFO: sıradaki session'ların token'ları
+        self._decodes = deque()  # (zaman, ses s, decode payı s, canlı mı)
+        self._finals = deque()  # (zaman, gecikme s, decode s)
+
+    @property
+    def enabled(self):
+        return self.slo > 0 or self.max_sessions > 0
+
+    def observe(self, audio_seconds, decode_seconds, batch_size=1, latency_seconds=None, live=True):
+        """Record one ASR result (latency only for final utterances; live=False for /jobs)"""
+        now = time.monotonic()
+        with self._cond:
+            # Batch'te geçişin süresi utterance'lar arasında paylaştırılır
+            self._decodes.append((now, audio_seconds, decode_seconds / max(1, batch_size), live))
+            if latency_seconds is not None:
+                self._finals.append((now, latency_seconds, decode_seconds))
+            self._prune(now)
+
+    def _prune(self, now):
+        horizon = now - self.window
+        while self._decodes and self._decodes[0][0] < horizon:
+            self._decodes.popleft()
+        while self._finals and self._finals[0][0] < horizon:
+            self._finals.popleft()
+
+    def estimate(self, extra_sessions=1):
+        """Rolling measurements and the predicted p95 with extra_sessions more sessions"""
+        now = time.monotonic()
+        with self._cond:
+            self._prune(now)
+            audio = sum(sample[1] for sample in self._decodes)
+            busy = sum(sample[2] for sample in self._decodes)
+            live_busy = sum(sample[2] for sample in self._decodes if sample[3])
+            latencies = [sample[1] for sample in self._finals]
+            services = [sample[2] for sample in self._finals]
+            sessions = self.active
+            # Ölçüm süresi penceredeki ilk decode'un başından itibaren (boşta geçen başlangıç sayılmaz)
+            first = self._decodes[0][0] - self._decodes[0][2] if self._decodes else now
+
+        span = max(MIN_SPAN_SECONDS, min(self.window, now - first))
+        utilization = busy / (span * self.parallelism)
+        live_utilization = live_busy / (span * self.parallelism)
+        p95 = percentile(latencies, 95) if latencies else None
+        # Yeni session'lar yalnızca canlı yükü büyütür; /jobs yükü sabit kalır
+        predicted_utilization = utilization
+        if sessions:
+            predicted_utilization += live_utilization * extra_sessions / sessions
+        predicted = None
+        saturated = len(services) >= MIN_SAMPLES and predicted_utilization >= 1.0
+        if len(services) >= MIN_SAMPLES and not saturated:
+            predicted = percentile(services, 95) / (1.0 - predicted_utilization)
+        return {
+            'sessions': sessions,
+            'rtf': round(busy / audio, 4) if audio else None,
+            'utilization': round(utilization, 4),
+            'batch_utilization': round(utilization - live_utilization, 4),
+            'p95_ms': round(p95 * 1000) if p95 is not None else None,
+            'predicted_utilization': round(predicted_utilization, 4),
+            'predicted_p95_ms': round(predicted * 1000) if predicted is not None else None,
+            'saturated': saturated,  # Yeni session ile kullanım >= 1: kuyruk sınırsız büyür
+            'samples': len(latencies)
+        }
+
+    def _refusal(self):
+        """Reason a new session cannot be admitted now (None: admit; under lock)"""
+        if self.max_sessions and self.active >= self.max_sessions:
+            return 'max_sessions'
+        if self.slo <= 0 or self.active == 0:
+            return None
+        estimate = self.estimate()
+        if estimate['p95_ms'] is not None and estimate['samples'] >= MIN_SAMPLES \
+                and estimate['p95_ms'] > self.slo * 1000:
+            return 'slo'
+        predicted = estimate['predicted_p95_ms']
+        if estimate['saturated'] or predicted is not None and predicted > self.slo * 1000:
+            return 'slo'
+        return None
+
+    def admit(self, on_queued=None):
+        """Admit a new session, waiting up to queue_seconds for capacity; returns a Decision"""
+        started = time.monotonic()
+        with self._cond:
+            # Sırada bekleyen varsa yeni session onların arkasına girer
+            reason = self._refusal() if not self._waiting else 'queue'
+            if reason is None:
+                self.active += 1
+                ADMITTED_SESSIONS.inc(queued='false')
+                return Decision(True)
+            if self.queue_seconds <= 0:
+                REJECTED_SESSIONS.inc(reason=reason)
+                return Decision(False, reason, estimate=self.estimate())
+            if len(self._waiting) >= self.max_queued:
+                REJECTED_SESSIONS.inc(reason='queue_full')
+                return Decision(False, 'queue_full', estimate=self.estimate())
+
+            token = object()
+            self._waiting.append(token)
+            position = len(self._waiting)
+        if on_queued is not None:
+            on_queued(position)
+
+        deadline = started + self.queue_seconds
+        with self._cond:
+            try:
+                while True:
+                    # Sıra korunur: yalnızca baştaki session kabul edilebilir
+                    if self._waiting[0] is token:
+                        reason = self._refusal()
+                        if reason is None:
+                            self.active += 1
+                            ADMITTED_SESSIONS.inc(queued='true')
+                            return Decision(True, waited=time.monotonic() - started)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        REJECTED_SESSIONS.inc(reason='timeout')
+                        return Decision(False, 'timeout', time.monotonic() - started, self.estimate())
+                    self._cond.wait(min(remaining, RECHECK_SECONDS))
+            finally:
+                self._waiting.remove(token)
+                self._cond.notify_all()
+
+    def release(self):
+        """A session admitted by admit() closed"""
+        with self._cond:
+            self.active = max(0, self.active - 1)
+            self._cond.notify_all()
+
+    def status(self):
+        """Payload of GET /health 'admission'"""
+        estimate = self.estimate()
+        estimate.update({
+            'enabled': self.enabled,
+            'slo_p95_ms': round(self.slo * 1000) or None,
+            'max_sessions': self.max_sessions or None,
+            'queued': len(self._waiting)
+        })
+        return estimate
+
+
+# Paralel decode sayısı: scheduler worker'ları × (varsa) worker süreçleri
+controller = AdmissionController(parallelism=runtime.ASR_WORKERS * max(1, runtime.ASR_PROCESSES))
+
+metrics.Gauge(
+    'whisper_rolling_real_time_factor', 'ASR real-time factor over the admission window',
+    function=lambda: controller.estimate()['rtf'] or 0.0
+)
+metrics.Gauge(
+    'whisper_asr_utilization', 'Fraction of ASR decode capacity used over the admission window',
+    function=lambda: controller.estimate()['utilization']
+)
+metrics.Gauge(
+    'whisper_queued_sessions', 'Sessions waiting for admission',
+    function=lambda: controller.status()['queued']
+)
@@ -14,103 +14,24 @@ Model Boyutları ve Performans:
 - large-v3: ~3GB, en yavaş, en yüksek doğruluk
 """
 
-import os
 import json
-import base64
-import numpy as np
-from flask import Flask, render_template, jsonify
+import os
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
 from flask_cors import CORS
 from flask_sock import Sock
-import threading
-import time
-
-# Load environment variables from .env file (for local development)
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not installed, will use system environment variables
+import batch_jobs
+import metrics
+import runtime
+from runtime import (  # noqa: F401 (geriye dönük uyumluluk için dışa açık)
+    DEFAULT_MODEL, get_device, get_model, get_scheduler, get_vad_model,
+    get_vad_service, model_key, model_registry, start_warmup, warm_up
+)
+from session import TranscriptionSession
 
 app = Flask(__name__)
 CORS(app)
 sock = Sock(app)
 
-# Global models (lazy loading)
-whisper_model = None
-vad_model = None
-model_lock = threading.Lock()
-vad_lock = threading.Lock()
-
-def get_vad_model():
-    """Lazy load Silero VAD model"""
-    global vad_model
-    if vad_model is None:
-        with vad_lock:
-            if vad_model is None:
-                try:
-                    import torch
-                    print("🔄 Loading Silero VAD model...")
-                    vad_model, utils = torch.hub.load(
-                        repo_or_dir='snakers4/silero-vad',
-                        model='silero_vad',
-                        force_reload=False,
-                        onnx=False
-                    )
-                    print("✅ VAD model loaded")
-                except Exception as e:
-                    print(f"⚠️  VAD model yüklenemedi: {e}")
-                    print("   VAD olmadan devam edilecek")
-                    return None
-    return vad_model
-
-def get_model():
-    """Lazy load Whisper model"""
-    global whisper_model
-    if whisper_model is None:
-        with model_lock:
-            if whisper_model is None:
-                try:
-                    from faster_whisper import WhisperModel
-                except ImportError:
-                    print("❌ faster-whisper yüklü değil!")
-                    print("   Yüklemek için: pip install faster-whisper")
-                    raise
-
-                # Colab'dan gelen DEVICE_TYPE'ı veya yerel için USE_GPU'yu kullan
-                # Varsayılan olarak 'cuda' denenir, bulunamazsa 'cpu'ya düşer
-                device = os.environ.get("DEVICE_TYPE", "cuda")
-
-                # GPU kontrolü
-                try:
-                    import torch
-                    if device == "cuda" and not torch.cuda.is_available():
-                        print("⚠️  CUDA seçildi ancak kullanılamıyor, CPU'ya geçiliyor...")
-                        device = "cpu"
-                    elif device == "cuda":
-                         print(f"✅ GPU bulundu: {torch.cuda.get_device_name(0)}")
-                except ImportError:
-                    print("⚠️  PyTorch yüklü değil, CPU kullanılacak.")
-                    device = "cpu"
-
-                compute_type = "float16" if device == "cuda" else "int8"
-
-                model_size = os.environ.get("WHISPER_MODEL", "small")
-                print(f"🔄 Loading Whisper model: {model_size} on {device} ({compute_type})...")
-
-                try:
-                    whisper_model = WhisperModel(
-                        model_size,
-                        device=device,
-                        compute_type=compute_type
-                    )
-                    print(f"✅ Model loaded: {model_size}")
-                except Exception as e:
-                    print(f"❌ Model yükleme hatası: {e}")
-                    print("   Daha küçük bir model deneyin (tiny, base, small)")
-                    raise
-
-    return whisper_model
-
 @app.route('/')
 def index():
     """Ana sayfa - Web arayüzü"""
@@ -119,275 +40,104 @@ def index():
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    try:
-        import torch
-        gpu_available = torch.cuda.is_available()
-        gpu_name = torch.cuda.get_device_name(0) if gpu_available else None
-    except:
-        gpu_available = False
-        gpu_name = None
+    return jsonify(runtime.health_status())
 
-    return jsonify({
-        'status': 'ok',
-        'model': os.environ.get("WHISPER_MODEL", "small"),
-        'gpu': os.environ.get("USE_GPU", "1") == "1",
-        'gpu_available': gpu_available,
-        'gpu_name': gpu_name,
-        'model_loaded': whisper_model is not None
-    })
+@app.route('/ready')
+def ready():
+    """Readiness: 200 once configured models are loaded and warmed up"""
+    status, code = runtime.ready_status()
+    return jsonify(status), code
 
 @app.route('/config')
 def config():
     """Model konfigürasyon bilgisi"""
-    return jsonify({
-        'models': [
-            {'value': 'tiny', 'name': 'Tiny (~75MB)', 'speed': 'fastest', 'quality': 'low'},
-            {'value': 'base', 'name': 'Base (~150MB)', 'speed': 'fast', 'quality': 'medium'},
-            {'value': 'small', 'name': 'Small (~500MB)', 'speed': 'balanced', 'quality': 'good', 'recommended': True},
-            {'value': 'medium', 'name': 'Medium (~1.5GB)', 'speed': 'slow', 'quality': 'high'},
-            {'value': 'large-v3', 'name': 'Large-v3 (~3GB)', 'speed': 'slowest', 'quality': 'highest'}
-        ],
-        'languages': [
-            {'code': 'auto', 'name': 'Auto-detect'},
-            {'code': 'tr', 'name': 'Türkçe'},
-            {'code': 'en', 'name': 'English'},
-            {'code': 'de', 'name': 'Deutsch'},
-            {'code': 'fr', 'name': 'Français'},
-            {'code': 'es', 'name': 'Español'},
-            {'code': 'pt', 'name': 'Português'},
-            {'code': 'it', 'name': 'Italiano'},
-            {'code': 'ar', 'name': 'العربية'},
-            {'code': 'zh', 'name': '中文'},
-            {'code': 'ja', 'name': '日本語'}
-        ],
-        'default_config': {
-            'chunk_length_s': 3,
-            'vad_filter': True,
-            'sample_rate': 16000
-        }
-    })
+    return jsonify(runtime.CONFIG_INFO)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Offline transcription: multipart 'file' or raw request body -> job id"""
+    try:
+        # Bildirilen boyut sınırı aşıyorsa gövde hiç okunmaz
+        batch_jobs.check_upload_size(request.content_length or 0)
+    except batch_jobs.UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    params = dict(request.args)
+    params.update(request.form)
+    upload = request.files.get('file')
+    try:
+        options = batch_jobs.parse_options(params)
+        if upload is not None:
+            job = batch_jobs.get_manager().submit(upload.stream, options, upload.filename)
+        else:
+            job = batch_jobs.get_manager().submit(request.stream, options, params.get('filename'))
+    except batch_jobs.UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Batch job status and progress"""
+    manager = batch_jobs.get_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Bilinmeyen iş'}), 404
+    return jsonify(manager.summary(job))
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Full result of a finished batch job (409 while it is still running)"""
+    manager = batch_jobs.get_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Bilinmeyen iş'}), 404
+    result = manager.result(job)
+    if result is None:
+        return jsonify(manager.summary(job)), 409
+    return jsonify(result)
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """NDJSON: utterance results in order as they finish, then the final status"""
+    manager = batch_jobs.get_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Bilinmeyen iş'}), 404
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in manager.stream(job))
+    return Response(stream_with_context(lines), content_type='application/x-ndjson')
 
 @sock.route('/ws')
 def websocket(ws):
     """WebSocket endpoint for realtime transcription"""
     print("🔌 New WebSocket connection")
 
-    # Get models
-    try:
-        model = get_model()
-        vad = get_vad_model()
-    except Exception as e:
-        ws.send(json.dumps({
-            'type': 'error',
-            'error': f'Model yüklenemedi: {str(e)}'
-        }))
+    # Her bağlantı bir thread; session mesajları sırayla işler
+    session = TranscriptionSession(ws.send)
+    if not session.start():
         return
 
-    # Audio buffer
-    audio_buffer = []
-    sample_rate = 16000
-
-    # VAD state tracking
-    is_speaking = False
-    silence_duration = 0
-    speech_duration = 0
-    vad_window_size = int(sample_rate * 0.032)  # 32ms window for VAD (512 samples at 16kHz)
-
-    # Config from client
-    config = {
-        'language': 'tr',  # Default Turkish
-        'silence_threshold': 0.5,  # Silence duration in seconds to trigger processing
-        'min_speech_duration': 0.5,  # Minimum speech duration to process
-        'vad_threshold': 0.5  # VAD confidence threshold (0-1)
-    }
-
-    # Send ready message
-    ws.send(json.dumps({
-        'type': 'session_started',
-        'message_type': 'session_started',
-        'config': config,
-        'vad_enabled': vad is not None
-    }))
-
     try:
         while True:
             message = ws.receive()
             if message is None:
                 break
-
-            try:
-                data = json.loads(message)
-            except:
-                continue
-
-            msg_type = data.get('type', data.get('message_type', ''))
-
-            # Config update
-            if msg_type == 'config':
-                config.update(data.get('config', {}))
-                print(f"📝 Config updated: {config}")
-                ws.send(json.dumps({
-                    'type': 'config_updated',
-                    'config': config
-                }))
-                continue
-
-            # Audio chunk
-            if msg_type == 'audio' or msg_type == 'input_audio_chunk':
-                audio_b64 = data.get('audio_base_64') or data.get('audio')
-                if not audio_b64:
-                    continue
-
-                # Decode base64 to PCM
-                try:
-                    audio_bytes = base64.b64decode(audio_b64)
-                    # Convert bytes to numpy array (16-bit PCM)
-                    audio_chunk = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-                    audio_buffer.extend(audio_chunk)
-                except Exception as e:
-                    print(f"Audio decode error: {e}")
-                    continue
-
-                # VAD-based speech detection
-                buffer_duration = len(audio_buffer) / sample_rate
-                should_process = False
-
-                if vad is not None and len(audio_buffer) >= vad_window_size:
-                    # Run VAD on recent audio
-                    recent_audio = np.array(audio_buffer[-vad_window_size:], dtype=np.float32)
-
-                    try:
-                        import torch
-                        audio_tensor = torch.from_numpy(recent_audio).unsqueeze(0)
-                        speech_prob = vad(audio_tensor, sample_rate).item()
-
-                        # Update state based on VAD
-                        if speech_prob > config['vad_threshold']:
-                            # Speech detected
-                            if not is_speaking:
-                                is_speaking = True
-                                silence_duration = 0
-                                ws.send(json.dumps({
-                                    'type': 'speech_started',
-                                    'message_type': 'speech_started'
-                                }))
-                            speech_duration += len(recent_audio) / sample_rate
-                        else:
-                            # Silence detected
-                            if is_speaking:
-                                silence_duration += len(recent_audio) / sample_rate
-
-                                # Check if silence is long enough to process
-                                if silence_duration >= config['silence_threshold']:
-                                    if speech_duration >= config['min_speech_duration']:
-                                        should_process = True
-                                    is_speaking = False
-                                    speech_duration = 0
-                                    silence_duration = 0
-
-                                    ws.send(json.dumps({
-                                        'type': 'speech_ended',
-                                        'message_type': 'speech_ended',
-                                        'speech_duration': round(speech_duration, 2)
-                                    }))
-
-                        # Send VAD status update
-                        ws.send(json.dumps({
-                            'type': 'vad_status',
-                            'message_type': 'vad_status',
-                            'is_speaking': is_speaking,
-                            'speech_prob': round(speech_prob, 2),
-                            'buffer_duration': round(buffer_duration, 2)
-                        }))
-
-                    except Exception as e:
-                        print(f"VAD error: {e}")
-                        # Fallback to time-based processing
-                        should_process = buffer_duration >= 3.0
-                else:
-                    # No VAD - fallback to time-based
-                    should_process = buffer_duration >= 3.0 or data.get('commit', False)
-
-                if should_process and len(audio_buffer) > sample_rate * 0.3:  # At least 0.3s
-                    # Convert to numpy array
-                    audio_np = np.array(audio_buffer, dtype=np.float32)
-
-                    # Transcribe
-                    start_time = time.time()
-
-                    try:
-                        segments, info = model.transcribe(
-                            audio_np,
-                            language=config['language'] if config['language'] != 'auto' else None,
-                            vad_filter=config['vad_filter'],
-                            vad_parameters={
-                                "min_silence_duration_ms": 500,
-                                "speech_pad_ms": 200
-                            }
-                        )
-
-                        # Collect all text
-                        full_text = ""
-                        words = []
-                        for segment in segments:
-                            full_text += segment.text
-                            if hasattr(segment, 'words') and segment.words:
-                                for word in segment.words:
-                                    words.append({
-                                        'text': word.word,
-                                        'start': word.start,
-                                        'end': word.end,
-                                        'probability': word.probability
-                                    })
-
-                        latency = (time.time() - start_time) * 1000
-
-                        if full_text.strip():
-                            # Send committed transcript
-                            ws.send(json.dumps({
-                                'type': 'committed_transcript',
-                                'message_type': 'committed_transcript',
-                                'text': full_text.strip(),
-                                'language_code': info.language if hasattr(info, 'language') else config['language'],
-                                'latency_ms': round(latency),
-                                'words': words if words else None,
-                                'buffer_duration': round(buffer_duration, 2)
-                            }))
-                            print(f"📝 [{round(latency)}ms] {full_text.strip()}")
-                        else:
-                            # Empty result
-                            ws.send(json.dumps({
-                                'type': 'partial_transcript',
-                                'message_type': 'partial_transcript',
-                                'text': ''
-                            }))
-
-                    except Exception as e:
-                        print(f"Transcription error: {e}")
-                        ws.send(json.dumps({
-                            'type': 'error',
-                            'error': str(e)
-                        }))
-
-                    # Clear buffer
-                    audio_buffer = []
-
-                # Send partial update (buffer status)
-                elif len(audio_buffer) > sample_rate * 0.3 and not is_speaking:
-                    ws.send(json.dumps({
-                        'type': 'partial_transcript',
-                        'message_type': 'partial_transcript',
-                        'text': f"[{buffer_duration:.1f}s audio buffered...]",
-                        'buffer_duration': buffer_duration
-                    }))
-
-            # Manual commit
-            elif msg_type == 'commit':
-                if len(audio_buffer) > sample_rate * 0.3:
-                    # Force process - will be handled on next iteration
-                    pass
+            session.handle_message(message)
 
     except Exception as e:
         print(f"WebSocket error: {e}")
 
+    session.close()
     print("🔌 WebSocket disconnected")
+
+if __name__ == '__main__':
+    start_warmup()
+    batch_jobs.get_manager()  # Yarım kalan batch işlerine devam et
+    port = int(os.environ.get("PORT", "5000"))
+    print(f"🚀 Flask sunucusu başlatılıyor (port {port})...")
+    app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False)
@@ -0,0 +1,354 @@
+"""
+Faster-Whisper Realtime STT - ASGI sunucusu
+
+app.py ile aynı `/`, `/health`, `/ready`, `/config`, `/metrics`, `/jobs` ve `/ws` sözleşmesi;
+fark bağlantı modelindedir. WebSocket I/O tek bir asyncio event loop'unda
+çalışır, boşta bekleyen bağlantılar thread tutmaz. Session'ın decode ve VAD
+işleri sınırlı bir thread pool'a (SESSION_WORKERS) gönderilir, ASR
+paylaşılan scheduler'da arka planda çalışır; giden mesajlar session başına
+sınırlı bir kuyruktan (SEND_QUEUE_FRAMES) event loop'ta yazılır. Admission
+kuyruğunda bekleyen session'lar ayrı bir havuzda bekler, session worker'ı
+tutmaz.
+
+Çalıştırma:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+    python asgi_app.py
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+
+import admission
+import batch_jobs
+import metrics
+import runtime
+from session import TranscriptionSession
+
+# Session işlerini (decode, VAD) çalıştıran thread sayısı;
+# bağlantı sayısından bağımsızdır
+SESSION_WORKERS = int(os.environ.get("SESSION_WORKERS", "64"))
+# Bağlantı başına gönderilmeyi bekleyen en fazla frame (okumayan/yavaş client)
+SEND_QUEUE_FRAMES = int(os.environ.get("SEND_QUEUE_FRAMES", "256"))
+# Kuyruk doluyken birleştirilebilen durum mesajları: yenisi eskisini geçersiz kılar
+STATUS_FRAME_TYPES = ('vad_status', 'partial_transcript')
+
+DROPPED_FRAMES = metrics.Counter(
+    'whisper_dropped_frames_total', 'Outbound status frames dropped because a send queue was full'
+)
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'index.html')
+
+session_executor = ThreadPoolExecutor(max_workers=SESSION_WORKERS, thread_name_prefix="session")
+# Kapasite bekleyen session'lar (en fazla ADMISSION_MAX_QUEUED) burada bekler
+admission_executor = ThreadPoolExecutor(
+    max_workers=admission.ADMISSION_MAX_QUEUED + 1, thread_name_prefix="admission"
+)
+
+
+def frame_type(text):
+    """'type' of a session frame (json.dumps of a dict whose first key is 'type')"""
+    if text.startswith('{"type": "'):
+        return text[10:text.find('"', 10)]
+    return None
+
+
+class SendQueue:
+    """
+    Bounded queue of one connection's outbound frames (event loop only)
+
+    Kuyruk doluyken gelen durum mesajı (STATUS_FRAME_TYPES) aynı türden
+    bekleyen mesajın yerini alır, yoksa atılır; olay mesajları (transcript,
+    speech_started, hata...) için bekleyen en eski durum mesajı atılır.
+    Kuyruk yalnızca olaylarla doluysa client okumuyordur: overflowed olur ve
+    bağlantı kapatılır.
+    """
+
+    def __init__(self, maxsize=SEND_QUEUE_FRAMES):
+        self.maxsize = maxsize
+        self.overflowed = False
+        self._frames = deque()  # (tür, text)
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def put(self, text):
+        """Queue a frame; None ends the sender after the queued frames"""
+        if self.overflowed:
+            return
+        kind = frame_type(text) if text is not None else None
+        if text is not None and len(self._frames) >= self.maxsize and not self._make_room(kind):
+            if kind in STATUS_FRAME_TYPES:
+                DROPPED_FRAMES.inc()
+                return
+            self.overflowed = True
+            self._frames.clear()
+            text = None
+        self._frames.append((kind, text))
+        self._ready.set()
+
+    def _make_room(self, kind):
+        """Drop one queued status frame for a new frame of kind; False if none can go"""
+        statuses = [i for i, (queued, _) in enumerate(self._frames) if queued in STATUS_FRAME_TYPES]
+        if kind in STATUS_FRAME_TYPES:
+            # Aynı türün bekleyen eski durumu yenisiyle birleşir
+            statuses = [i for i in statuses if self._frames[i][0] == kind]
+        if not statuses:
+            return False
+        del self._frames[statuses[0]]
+        DROPPED_FRAMES.inc()
+        return True
+
+    async def get(self):
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._frames.popleft()[1]
+
+
+async def index(request):
+    """Ana sayfa - Web arayüzü"""
+    return FileResponse(TEMPLATE_PATH, media_type='text/html')
+
+
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse(runtime.health_status())
+
+
+async def ready(request):
+    """Readiness: 200 once configured models are loaded and warmed up"""
+    status, code = runtime.ready_status()
+    return JSONResponse(status, status_code=code)
+
+
+async def config(request):
+    """Model konfigürasyon bilgisi"""
+    return JSONResponse(runtime.CONFIG_INFO)
+
+
+async def metrics_endpoint(request):
+    """Prometheus metrics"""
+    return Response(metrics.render(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+class RequestBodyReader:
+    """
+    Blocking file-like view of a request body, read from a worker thread
+
+    BatchJobManager.submit() gövdeyi executor thread'inde 1 MB'lık
+    parçalarla okur; parçalar event loop'taki request.stream()'den alınır.
+    Gövde belleğe toplanmaz ve sınır aşılınca okuma durur.
+    """
+
+    def __init__(self, request, loop):
+        self._chunks = request.stream()
+        self._loop = loop
+        self._buffer = bytearray()
+        self._done = False
+
+    async def _next_chunk(self):
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def read(self, size=-1):
+        while not self._done and (size < 0 or len(self._buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                self._done = True
+            else:
+                self._buffer += chunk
+        size = len(self._buffer) if size < 0 else size
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def size_limited(request):
+    """Same request whose body stream raises UploadTooLarge past BATCH_MAX_UPLOAD_MB"""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        received += len(message.get('body', b''))
+        batch_jobs.check_upload_size(received)
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def submit_job(request):
+    """Offline transcription: multipart 'file' or raw request body -> job id"""
+    loop = asyncio.get_running_loop()
+    params = dict(request.query_params)
+    length = request.headers.get('content-length', '')
+    try:
+        # Bildirilen boyut sınırı aşıyorsa gövde hiç okunmaz
+        batch_jobs.check_upload_size(int(length) if length.isdigit() else 0)
+    except batch_jobs.UploadTooLarge as e:
+        return JSONResponse({'error': str(e)}, status_code=413)
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        try:
+            # Content-Length olmasa da multipart ayrıştırma sınırda durur
+            form = await size_limited(request).form()
+        except batch_jobs.UploadTooLarge as e:
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except AssertionError:
+            # starlette multipart için python-multipart gerektirir
+            return JSONResponse({'error': 'multipart yükleme için python-multipart gerekli; '
+                                          'dosyayı istek gövdesi olarak gönderin'}, status_code=415)
+        params.update({k: v for k, v in form.items() if isinstance(v, str)})
+        upload = form.get('file')
+        if upload is None or isinstance(upload, str):
+            return JSONResponse({'error': "'file' alanı eksik"}, status_code=400)
+        fileobj, filename = upload.file, upload.filename
+    else:
+        fileobj, filename = RequestBodyReader(request, loop), params.get('filename')
+    try:
+        options = batch_jobs.parse_options(params)
+        manager = batch_jobs.get_manager()
+        job = await loop.run_in_executor(session_executor, manager.submit, fileobj, options, filename)
+    except batch_jobs.UploadTooLarge as e:
+        return JSONResponse({'error': str(e)}, status_code=413)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return JSONResponse({'job_id': job.id, 'status': job.status}, status_code=202)
+
+
+def _find_job(request):
+    manager = batch_jobs.get_manager()
+    return manager, manager.get(request.path_params['job_id'])
+
+
+async def job_status(request):
+    """Batch job status and progress"""
+    manager, job = _find_job(request)
+    if job is None:
+        return JSONResponse({'error': 'Bilinmeyen iş'}, status_code=404)
+    return JSONResponse(manager.summary(job))
+
+
+async def job_result(request):
+    """Full result of a finished batch job (409 while it is still running)"""
+    manager, job = _find_job(request)
+    if job is None:
+        return JSONResponse({'error': 'Bilinmeyen iş'}, status_code=404)
+    result = await asyncio.get_running_loop().run_in_executor(session_executor, manager.result, job)
+    if result is None:
+        return JSONResponse(manager.summary(job), status_code=409)
+    return JSONResponse(result)
+
+
+async def job_stream(request):
+    """NDJSON: utterance results in order as they finish, then the final status"""
+    manager, job = _find_job(request)
+    if job is None:
+        return JSONResponse({'error': 'Bilinmeyen iş'}, status_code=404)
+    # Senkron generator starlette tarafından thread pool'da tüketilir
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in manager.stream(job))
+    return StreamingResponse(lines, media_type='application/x-ndjson')
+
+
+async def websocket(ws):
+    """WebSocket endpoint for realtime transcription"""
+    await ws.accept()
+    print("🔌 New WebSocket connection")
+    loop = asyncio.get_running_loop()
+
+    # Session thread'lerinden gelen mesajlar sırayla event loop'ta gönderilir
+    outbox = SendQueue()
+
+    def send(text):
+        loop.call_soon_threadsafe(outbox.put, text)
+
+    async def sender():
+        while True:
+            text = await outbox.get()
+            if text is None:
+                break
+            try:
+                await ws.send_text(text)
+            except Exception:
+                return
+        if outbox.overflowed:
+            # Client olayları okumuyor: bağlantı kapatılır, receive döngüsü disconnect alır
+            print(f"⚠️ Gönderim kuyruğu doldu ({outbox.maxsize} frame), bağlantı kapatılıyor")
+            with contextlib.suppress(Exception):
+                await ws.close(code=1013)
+
+    sender_task = asyncio.create_task(sender())
+    session = TranscriptionSession(send)
+
+    try:
+        # Kapasite beklemesi session worker'ı tutmaz; modeller session havuzunda alınır
+        if await loop.run_in_executor(admission_executor, session.admit) \
+                and await loop.run_in_executor(session_executor, session.start):
+            while True:
+                message = await ws.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                payload = message.get('bytes')
+                if payload is None:
+                    payload = message.get('text')
+                # Aynı session'ın mesajları sırayla işlenir
+                await loop.run_in_executor(session_executor, session.handle_message, payload)
+
+    except Exception as e:
+        print(f"WebSocket error: {e}")
+
+    session.close()
+    outbox.put(None)
+    await sender_task
+    with contextlib.suppress(Exception):
+        await ws.close()
+    print("🔌 WebSocket disconnected")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Modelleri arka planda yükle ve ısıt (/ready hazır olunca 200 döner)
+    runtime.start_warmup()
+    batch_jobs.get_manager()  # Yarım kalan batch işlerine devam et
+    yield
+    session_executor.shutdown(wait=False)
+    admission_executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/health', health),
+        Route('/ready', ready),
+        Route('/config', config),
+        Route('/metrics', metrics_endpoint),
+        Route('/jobs', submit_job, methods=['POST']),
+        Route('/jobs/{job_id}', job_status),
+        Route('/jobs/{job_id}/result', job_result),
+        Route('/jobs/{job_id}/stream', job_stream),
+        WebSocketRoute('/ws', websocket),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get("PORT", "5000"))
+    print(f"🚀 ASGI sunucusu başlatılıyor (port {port})...")
+    uvicorn.run(app, host='0.0.0.0', port=port)
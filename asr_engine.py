@@ -0,0 +1,256 @@
+"""
+ASR engine arayüzü
+
+Scheduler'lar (inference.py, process_pool.py) modeli doğrudan değil bir
+ASREngine üzerinden çağırır: transcribe() bir utterance'ı segment dict'lerine
+ve dile çevirir. Yetenek bayrakları scheduler'ın ve session'ın hangi yolları
+kullanacağını belirler:
+
+  supports_batching  transcribe_batch() birden çok utterance'ı tek geçişte işler
+  supports_streaming word_timestamps=True ile kelime zamanları döner
+                     (streaming partial'ları ve zaman tabanlı kesimler için gerekli)
+
+transcribe_stream() aynı sonucu segment segment verir (faster-whisper'ın
+generator'ı tüketildikçe); uzun utterance'larda ilk segment sonuncudan çok
+önce hazırdır.
+
+Motorlar: faster_whisper (varsayılan) ve stub (model indirmeden, sabit ve
+deterministik çıktı + ayarlanabilir gecikme; testler ve benchmark'lar için).
+"""
+
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+ENGINES = ('faster_whisper', 'stub')
+
+# Batched modda uygulanmayan seçenekler: utterance'lar zaten session VAD'ı
+# ile uç noktalarından kesilmiş durumda, clip_timestamps iç VAD'ı devre dışı bırakır.
+# initial_prompt burada değildir: batched pipeline tüm batch'e tek prompt verir,
+# bu yüzden yalnızca aynı prompt'lu utterance'lar birlikte batch'lenir
+BATCH_IGNORED_OPTIONS = ('vad_filter', 'vad_parameters')
+
+
+def segment_to_dict(segment, offset=0.0):
+    """Convert a faster-whisper Segment into a plain dict relative to offset"""
+    words = None
+    if getattr(segment, 'words', None):
+        words = [
+            {
+                'text': word.word,
+                'start': round(word.start - offset, 3),
+                'end': round(word.end - offset, 3),
+                'probability': word.probability
+            }
+            for word in segment.words
+        ]
+    return {
+        'text': segment.text,
+        'start': round(segment.start - offset, 3),
+        'end': round(segment.end - offset, 3),
+        'words': words
+    }
+
+
+class ASREngine:
+    """
+    Base class: transcribe(audio, **options) -> (segments, language).
+
+    audio 16 kHz float32, options faster-whisper transcribe() seçenekleridir
+    (language, word_timestamps, initial_prompt, ...); motor tanımadıklarını
+    yok sayar. Segment'ler segment_to_dict() biçimindedir.
+    """
+
+    name = 'base'
+    supports_batching = False
+    supports_streaming = False
+
+    def transcribe(self, audio, **options):
+        raise NotImplementedError
+
+    def transcribe_stream(self, audio, **options):
+        """(iterator of segments yielded as they decode, language); default: all at once"""
+        segments, language = self.transcribe(audio, **options)
+        return iter(segments), language
+
+    def transcribe_batch(self, audios, **options):
+        """Transcribe utterances sharing the same options; one result per utterance"""
+        return [self.transcribe(audio, **options) for audio in audios]
+
+    def close(self):
+        pass
+
+
+class FasterWhisperEngine(ASREngine):
+    """faster-whisper WhisperModel (or any object with the same transcribe())"""
+
+    name = 'faster_whisper'
+    supports_streaming = True
+
+    def __init__(self, model):
+        self.model = model
+        self._batched = None
+        try:
+            from faster_whisper import BatchedInferencePipeline
+            self._pipeline_class = BatchedInferencePipeline
+            self.supports_batching = True
+        except ImportError:
+            self._pipeline_class = None
+
+    def transcribe(self, audio, **options):
+        segments, language = self.transcribe_stream(audio, **options)
+        return list(segments), language
+
+    def transcribe_stream(self, audio, **options):
+        # Dil tespiti transcribe() içinde yapılır; segment'ler generator tüketildikçe decode edilir
+        segments, info = self.model.transcribe(audio, **options)
+        return (segment_to_dict(segment) for segment in segments), getattr(info, 'language', options.get('language'))
+
+    def transcribe_batch(self, audios, **options):
+        """Concatenate utterances and decode them as clips of one batched pass"""
+        if self._batched is None:
+            self._batched = self._pipeline_class(self.model)
+
+        offsets = []
+        clips = []
+        position = 0
+        for audio in audios:
+            offsets.append(position / SAMPLE_RATE)
+            clips.append({
+                'start': position / SAMPLE_RATE,
+                'end': (position + len(audio)) / SAMPLE_RATE
+            })
+            position += len(audio)
+
+        options = {k: v for k, v in options.items() if k not in BATCH_IGNORED_OPTIONS}
+        segments, info = self._batched.transcribe(
+            np.concatenate(audios),
+            clip_timestamps=clips,
+            batch_size=len(audios),
+            vad_filter=False,
+            **options
+        )
+
+        # Her segment'i başlangıç zamanına göre ait olduğu utterance'a yönlendir
+        per_audio = [[] for _ in audios]
+        for segment in segments:
+            index = max(0, bisect_right(offsets, segment.start + 1e-3) - 1)
+            per_audio[index].append(segment_to_dict(segment, offsets[index]))
+        return [(segments, info.language) for segments in per_audio]
+
+
+class StubEngine(ASREngine):
+    """
+    Deterministic stand-in for a model with configurable latency.
+
+    Sesteki her enerjili bölge (>= 100 ms) bir "kelime" olur; etiketi bölgenin
+    ortalama genliğinden türetilir, böylece aynı ses her decode'da aynı
+    kelimeleri verir. Gecikme: base_ms + per_second_ms * ses süresi (batch'te
+    base_ms batch başına bir kez ödenir). transcribe_stream() kelimeleri
+    en fazla SEGMENT_SECONDS'lik segment'lere böler ve gecikmeyi segment'lerin
+    süresine göre dağıtır.
+    """
+
+    name = 'stub'
+    supports_batching = True
+    supports_streaming = True
+
+    SEGMENT_SECONDS = 3.0
+
+    def __init__(self, base_ms=50.0, per_second_ms=10.0, threshold=0.02):
+        self.base_ms = float(base_ms)
+        self.per_second_ms = float(per_second_ms)
+        self.threshold = threshold
+
+    def transcribe(self, audio, **options):
+        time.sleep((self.base_ms + self.per_second_ms * len(audio) / SAMPLE_RATE) / 1000)
+        return self._decode(audio, options)
+
+    def transcribe_stream(self, audio, **options):
+        words, language = self._words(audio, options)
+        return self._stream(words, len(audio) / SAMPLE_RATE, options), language
+
+    def transcribe_batch(self, audios, **options):
+        seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+        time.sleep((self.base_ms + self.per_second_ms * seconds) / 1000)
+        return [self._decode(audio, options) for audio in audios]
+
+    def _stream(self, words, duration, options):
+        time.sleep(self.base_ms / 1000)
+        segments = []
+        for word in words:
+            if segments and word['end'] - segments[-1][0]['start'] <= self.SEGMENT_SECONDS:
+                segments[-1].append(word)
+            else:
+                segments.append([word])
+        decoded = 0.0
+        for group in segments:
+            # Segment sonuna kadar olan sesin payı
+            time.sleep(self.per_second_ms * (group[-1]['end'] - decoded) / 1000)
+            decoded = group[-1]['end']
+            yield self._segment(group, options)
+        time.sleep(self.per_second_ms * max(0.0, duration - decoded) / 1000)
+
+    def _segment(self, words, options):
+        return {
+            'text': ''.join(word['text'] for word in words),
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'words': words if options.get('word_timestamps') else None
+        }
+
+    def _decode(self, audio, options):
+        words, language = self._words(audio, options)
+        if not words:
+            return [], language
+        return [self._segment(words, options)], language
+
+    def _words(self, audio, options):
+        """Energy regions of audio as word dicts, and the language"""
+        language = options.get('language') or 'en'
+        audio = np.asarray(audio, dtype=np.float32)
+        frame = SAMPLE_RATE // 50  # 20 ms
+        n = len(audio) // frame
+        if n == 0:
+            return [], language
+        rms = np.sqrt(np.mean(audio[:n * frame].reshape(n, frame) ** 2, axis=1))
+        voiced = np.concatenate(([0], (rms > self.threshold).astype(np.int8), [0]))
+        edges = np.diff(voiced)
+        starts, ends = np.where(edges == 1)[0], np.where(edges == -1)[0]
+
+        words = []
+        for a, b in zip(starts, ends):
+            if b - a < 5:  # < 100 ms
+                continue
+            level = int(round(float(rms[a:b].mean()) * 100))
+            words.append({
+                'text': f" w{level}",
+                'start': round(a * frame / SAMPLE_RATE, 3),
+                'end': round(b * frame / SAMPLE_RATE, 3),
+                'probability': 1.0
+            })
+        return words, language
+
+
+def as_engine(model):
+    """Wrap a WhisperModel-like object in an engine (engines are returned as-is)"""
+    return model if isinstance(model, ASREngine) else FasterWhisperEngine(model)
+
+
+def create_engine(name, key, cpu_threads=0, num_workers=1, stub_options=None):
+    """Create the engine `name` for a (model size, device, compute_type) key"""
+    if name == 'stub':
+        return StubEngine(**(stub_options or {}))
+    if name != 'faster_whisper':
+        raise ValueError(f"Bilinmeyen ASR engine: {name} ({', '.join(ENGINES)})")
+
+    from faster_whisper import WhisperModel
+
+    model_size, device, compute_type = key
+    options = {'device': device, 'compute_type': compute_type, 'num_workers': num_workers}
+    if cpu_threads:
+        options['cpu_threads'] = cpu_threads
+    return FasterWhisperEngine(WhisperModel(model_size, **options))
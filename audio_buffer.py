@@ -0,0 +1,106 @@
+"""
+Per-session audio ring buffer
+
+WebSocket handler'ındaki Python list tabanlı buffer'ın yerine geçer.
+Örnekler float32 olarak önceden ayrılmış bir NumPy dizisinde tutulur;
+VAD ve transcription için kopyasız (zero-copy) view'lar döner.
+"""
+
+import numpy as np
+
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'error')
+
+
+class AudioRingBuffer:
+    """
+    Sabit kapasiteli float32 ses buffer'ı.
+
+    Depolama 2 * capacity boyutundadır: veri her zaman bitişik (contiguous)
+    tutulur, sona ulaşıldığında canlı bölüm başa kaydırılır (amortize O(1)).
+    Bu sayede tail() ve view() her zaman kopyasız slice döndürür.
+
+    Döndürülen view'lar bir sonraki append/consume/clear çağrısına kadar
+    geçerlidir; daha uzun yaşayacaksa çağıran taraf kopyalamalıdır.
+    """
+
+    def __init__(self, capacity, overflow='drop_oldest'):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+
+        self.capacity = int(capacity)
+        self.overflow = overflow
+        self.dropped_samples = 0
+        self._data = np.zeros(self.capacity * 2, dtype=np.float32)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def free(self):
+        return self.capacity - len(self)
+
+    def append(self, chunk):
+        """Append samples; returns the number of samples actually stored"""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        n = chunk.shape[0]
+        if n == 0:
+            return 0
+
+        if n > self.free:
+            if self.overflow == 'error':
+                raise BufferError(
+                    f"Audio buffer overflow: {n} samples, {self.free} free"
+                )
+            if self.overflow == 'drop_newest':
+                self.dropped_samples += n - self.free
+                chunk = chunk[:self.free]
+                n = chunk.shape[0]
+                if n == 0:
+                    return 0
+            else:  # drop_oldest
+                if n >= self.capacity:
+                    self.dropped_samples += len(self) + n - self.capacity
+                    chunk = chunk[-self.capacity:]
+                    n = self.capacity
+                    self._start = self._end = 0
+                else:
+                    excess = n - self.free
+                    self.dropped_samples += excess
+                    self._start += excess
+
+        # Sona sığmıyorsa canlı bölümü başa kaydır
+        if self._end + n > self._data.shape[0]:
+            size = len(self)
+            self._data[:size] = self._data[self._start:self._end]
+            self._start, self._end = 0, size
+
+        self._data[self._end:self._end + n] = chunk
+        self._end += n
+        return n
+
+    def view(self):
+        """Zero-copy view of all buffered samples"""
+        return self._data[self._start:self._end]
+
+    def tail(self, n):
+        """Zero-copy view of the last n samples (or fewer if not buffered)"""
+        n = min(int(n), len(self))
+        return self._data[self._end - n:self._end]
+
+    def consume(self, n):
+        """Drop the oldest n samples (e.g. after they have been transcribed)"""
+        n = min(max(int(n), 0), len(self))
+        self._start += n
+        if self._start == self._end:
+            self._start = self._end = 0
+        return n
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def duration(self, sample_rate):
+        return len(self) / sample_rate
@@ -0,0 +1,121 @@
+"""
+WebSocket ses payload'larını float32 örneklere çevirir
+
+Desteklenen formatlar (session başına `config` mesajı ile seçilir):
+- pcm_s16le: 16-bit signed little-endian PCM (varsayılan)
+- pcm_f32le: 32-bit float little-endian PCM
+- opus: her binary frame tek bir Opus paketi (opuslib gerekir)
+"""
+
+import base64
+import functools
+
+import numpy as np
+
+PCM_ENCODINGS = {
+    'pcm_s16le': np.dtype('<i2'),
+    'pcm_f32le': np.dtype('<f4'),
+}
+DEFAULT_ENCODING = 'pcm_s16le'
+OPUS_ENCODING = 'opus'
+AUDIO_ENCODINGS = tuple(PCM_ENCODINGS) + (OPUS_ENCODING,)
+
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+@functools.lru_cache(maxsize=None)
+def available_encodings():
+    """Encodings this process can decode (opus needs opuslib and libopus)"""
+    try:
+        import opuslib  # noqa: F401
+    except Exception:
+        return tuple(PCM_ENCODINGS)
+    return AUDIO_ENCODINGS
+
+
+def decode_pcm(payload, encoding=DEFAULT_ENCODING):
+    """Decode raw PCM bytes into a float32 array in [-1, 1]"""
+    dtype = PCM_ENCODINGS.get(encoding)
+    if dtype is None:
+        raise ValueError(f"Unsupported audio encoding: {encoding}")
+
+    samples = np.frombuffer(payload, dtype=dtype)
+    if dtype.kind == 'f':
+        # Binary frame'ler doğrudan kullanılabilir (ring buffer zaten kopyalar)
+        return samples.astype(np.float32, copy=False)
+
+    audio = samples.astype(np.float32)
+    audio *= _INT16_SCALE
+    return audio
+
+
+def decode_base64_pcm(audio_b64, encoding=DEFAULT_ENCODING):
+    """Decode the legacy JSON `audio_base_64` field"""
+    return decode_pcm(base64.b64decode(audio_b64), encoding)
+
+
+class OpusStreamDecoder:
+    """
+    Per-session streaming Opus decoder.
+
+    Opus kendi içinde durumludur (paketler sırayla decode edilmeli) ve
+    encoder hangi hızda çalışırsa çalışsın doğrudan istenen hızda (16 kHz)
+    çıktı verir; bu yüzden resampler gerekmez.
+    """
+
+    # Bir Opus paketi en fazla 120 ms ses içerir
+    MAX_FRAME_MS = 120
+
+    def __init__(self, sample_rate=16000, channels=1):
+        try:
+            import opuslib
+        except ImportError:
+            raise RuntimeError("Opus desteği için opuslib gerekli: pip install opuslib")
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._decoder = opuslib.Decoder(sample_rate, channels)
+        self._max_frame = sample_rate * self.MAX_FRAME_MS // 1000
+
+    def decode(self, packet):
+        """Decode one Opus packet into float32 mono samples"""
+        pcm = self._decoder.decode(bytes(packet), self._max_frame)
+        audio = decode_pcm(pcm, 'pcm_s16le')
+        if self.channels > 1:
+            audio = audio.reshape(-1, self.channels).mean(axis=1)
+        return audio
+
+
+def iter_ogg_packets(fileobj):
+    """
+    Yield the packets of an Ogg stream (e.g. an .opus file from opusenc/ffmpeg).
+
+    Test fixture'larındaki paketleri /ws'e tek tek göndermek için kullanılır;
+    Opus dosyalarında ilk iki paket OpusHead/OpusTags başlıklarıdır.
+    """
+    packet = b''
+    while True:
+        header = fileobj.read(27)
+        if len(header) < 27:
+            return
+        if header[:4] != b'OggS':
+            raise ValueError("Invalid Ogg page")
+        segments = header[26]
+        lacing = fileobj.read(segments)
+        body = fileobj.read(sum(lacing))
+        position = 0
+        for size in lacing:
+            packet += body[position:position + size]
+            position += size
+            # 255'ten kısa segment paketi bitirir; 255 ise sonraki sayfada devam eder
+            if size < 255:
+                yield packet
+                packet = b''
+
+
+def iter_opus_packets(fileobj):
+    """Yield the audio packets of an Ogg Opus file (headers skipped)"""
+    for packet in iter_ogg_packets(fileobj):
+        if packet[:8] in (b'OpusHead', b'OpusTags'):
+            continue
+        yield packet
@@ -0,0 +1,437 @@
+"""
+Offline (dosya) transkripsiyon işleri
+
+POST /jobs ile yüklenen ses dosyası diske yazılır ve kuyruğa alınır; tek
+bir arka plan thread'i işleri sırayla çalıştırır:
+
+  1. decode   ses 16 kHz mono float32'ye çözülür (faster_whisper.decode_audio
+              / PyAV; faster-whisper yoksa yalnızca PCM16 WAV)
+  2. VAD      StreamingVAD ile konuşma bölgeleri bulunur; aralarındaki
+              sessizlik BATCH_MAX_GAP_SECONDS'ı aşmayan bölgeler
+              BATCH_MAX_UTTERANCE_SECONDS'a kadar birleştirilir
+              (VAD yoksa sabit pencereler)
+  3. ASR      utterance'lar canlı session'larla aynı paylaşılan scheduler'a
+              (runtime.model_registry) PRIORITY_BATCH ile gönderilir; aynı
+              seçenekli işler batch'lenir, canlı işler kuyrukta öne geçer
+  4. sonuç    utterance'lar ve mutlak segment zamanları result.json'a yazılır
+
+Dil 'auto' ise ilk utterance dili tespit eder, sonrakiler o dille
+gönderilir (dil belirtilmemiş işler batch'lenemez).
+
+İş dizini: BATCH_JOBS_DIR/<job_id>/{job.json, input, result.json}. Sunucu
+yeniden başlarsa yarım kalan işler baştan çalıştırılır.
+"""
+
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import wave
+from collections import deque
+
+import numpy as np
+
+import admission
+import runtime
+from asr_engine import SAMPLE_RATE
+from inference import PRIORITY_BATCH
+from model_registry import MODEL_SIZES_MB
+from resampler import StreamingResampler
+from vad import StreamingVAD
+
+# İşlerin (yüklenen ses + sonuç) saklandığı dizin
+BATCH_JOBS_DIR = os.environ.get(
+    "BATCH_JOBS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_jobs')
+)
+# Bir işin scheduler'da aynı anda bekleyen en fazla utterance sayısı
+BATCH_MAX_INFLIGHT = int(os.environ.get("BATCH_MAX_INFLIGHT", "8"))
+# Birleştirilmiş utterance üst sınırı (Whisper penceresi 30 sn)
+BATCH_MAX_UTTERANCE_SECONDS = float(os.environ.get("BATCH_MAX_UTTERANCE_SECONDS", "30"))
+# Birleştirilen iki bölge arasındaki en uzun sessizlik (daha uzunu decode edilmez)
+BATCH_MAX_GAP_SECONDS = float(os.environ.get("BATCH_MAX_GAP_SECONDS", "1.5"))
+# Yükleme boyutu sınırı (MB)
+BATCH_MAX_UPLOAD_MB = float(os.environ.get("BATCH_MAX_UPLOAD_MB", "500"))
+
+SPEECH_PAD_MS = 200
+VAD_CHUNK_SAMPLES = SAMPLE_RATE  # VAD'a 1 sn'lik parçalar halinde verilir
+
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeds BATCH_MAX_UPLOAD_MB (HTTP 413)"""
+
+
+def check_upload_size(size):
+    """Raise UploadTooLarge if size bytes exceed BATCH_MAX_UPLOAD_MB"""
+    if size > BATCH_MAX_UPLOAD_MB * 1024 * 1024:
+        raise UploadTooLarge(f"Dosya çok büyük (en fazla {BATCH_MAX_UPLOAD_MB:.0f} MB)")
+
+
+def parse_options(params):
+    """Job options from request parameters (ValueError on invalid values)"""
+    language = params.get('language') or 'auto'
+    model = params.get('model') or runtime.DEFAULT_MODEL
+    if model not in MODEL_SIZES_MB:
+        raise ValueError(f'Bilinmeyen model: {model}')
+    word_timestamps = str(params.get('word_timestamps', '')).lower() in ('1', 'true', 'yes')
+    return {
+        'language': None if language == 'auto' else language,
+        'model': model,
+        'word_timestamps': word_timestamps
+    }
+
+
+def load_audio(path):
+    """Decode an audio file to 16 kHz mono float32"""
+    try:
+        from faster_whisper import decode_audio
+    except ImportError:
+        return load_wav(path)
+    return decode_audio(path, sampling_rate=SAMPLE_RATE)
+
+
+def load_wav(path):
+    """PCM16 WAV -> 16 kHz mono float32 (without faster-whisper / PyAV)"""
+    try:
+        with wave.open(path, 'rb') as f:
+            if f.getsampwidth() != 2:
+                raise ValueError("Yalnızca 16-bit PCM WAV desteklenir (faster-whisper yüklü değil)")
+            channels, rate = f.getnchannels(), f.getframerate()
+            pcm = np.frombuffer(f.readframes(f.getnframes()), dtype='<i2')
+    except wave.Error as e:
+        raise ValueError(f"Ses dosyası çözülemedi (faster-whisper yüklü değil, yalnızca WAV): {e}")
+    audio = pcm.astype(np.float32).reshape(-1, channels).mean(axis=1) / 32768.0
+    if rate != SAMPLE_RATE:
+        audio = StreamingResampler(rate, SAMPLE_RATE).process(audio)
+    return audio
+
+
+def speech_regions(audio, vad_service):
+    """(start, end) sample ranges of speech (VAD) or fixed windows without VAD"""
+    max_samples = int(BATCH_MAX_UTTERANCE_SECONDS * SAMPLE_RATE)
+    max_gap = int(BATCH_MAX_GAP_SECONDS * SAMPLE_RATE)
+    if vad_service is None:
+        return [(start, min(start + max_samples, len(audio))) for start in range(0, len(audio), max_samples)]
+
+    stream = StreamingVAD(vad_service)
+    regions = []
+    for start in range(0, len(audio), VAD_CHUNK_SAMPLES):
+        events, _ = stream.process(audio[start:start + VAD_CHUNK_SAMPLES])
+        regions.extend((e['start'], e['end']) for e in events if e['type'] == 'speech_ended')
+    if stream.triggered:
+        # Dosya konuşma sırasında bitti
+        regions.append((stream.speech_start, stream.position))
+
+    pad = int(SAMPLE_RATE * SPEECH_PAD_MS / 1000)
+    merged = []
+    for start, end in regions:
+        start, end = max(0, start - pad), min(len(audio), end + pad)
+        if merged and start - merged[-1][1] <= max_gap and end - merged[-1][0] <= max_samples:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    # Tek başına pencereden uzun konuşma bölgeleri bölünür
+    utterances = []
+    for start, end in merged:
+        for piece in range(start, end, max_samples):
+            utterances.append((piece, min(piece + max_samples, end)))
+    return utterances
+
+
+def _absolute(segment, offset):
+    words = None
+    if segment['words']:
+        words = [
+            dict(word, start=round(word['start'] + offset, 3), end=round(word['end'] + offset, 3))
+            for word in segment['words']
+        ]
+    return {
+        'text': segment['text'],
+        'start': round(segment['start'] + offset, 3),
+        'end': round(segment['end'] + offset, 3),
+        'words': words
+    }
+
+
+class BatchJob:
+    """State of one file transcription job"""
+
+    def __init__(self, job_id, directory, options, filename=None):
+        self.id = job_id
+        self.directory = directory
+        self.options = options
+        self.filename = filename
+        self.status = 'queued'
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None  # Ses süresi (s)
+        self.language = options.get('language')
+        self.utterances_total = None
+        self.utterances = []  # Sırayla tamamlanan utterance sonuçları
+        self.decode_seconds = 0.0
+
+    @property
+    def input_path(self):
+        return os.path.join(self.directory, 'input')
+
+    @property
+    def result_path(self):
+        return os.path.join(self.directory, 'result.json')
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def summary(self):
+        """Payload of GET /jobs/<id>"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'filename': self.filename,
+            'options': self.options,
+            'language': self.language,
+            'duration': self.duration,
+            'progress': {
+                'utterances_done': len(self.utterances) if not self.finished else self.utterances_total,
+                'utterances_total': self.utterances_total
+            },
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'real_time_factor': self.real_time_factor()
+        }
+
+    def real_time_factor(self):
+        if not self.duration or self.started_at is None or self.finished_at is None:
+            return None
+        return round((self.finished_at - self.started_at) / self.duration, 4)
+
+    def to_record(self):
+        record = self.summary()
+        del record['progress'], record['real_time_factor']
+        record['utterances_total'] = self.utterances_total
+        return record
+
+    @classmethod
+    def from_record(cls, directory, record):
+        job = cls(record['job_id'], directory, record['options'], record.get('filename'))
+        for name in ('status', 'error', 'created_at', 'started_at', 'finished_at',
+                     'duration', 'language', 'utterances_total'):
+            setattr(job, name, record.get(name))
+        job.utterances = None  # Bitmiş işin sonuçları result.json'dan okunur
+        return job
+
+
+class BatchJobManager:
+    """Persists file jobs and runs them one at a time on a background thread"""
+
+    def __init__(self, directory=BATCH_JOBS_DIR, max_inflight=BATCH_MAX_INFLIGHT):
+        self.directory = directory
+        self.max_inflight = max(1, int(max_inflight))
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._thread = threading.Thread(target=self._run_loop, name="batch-jobs", daemon=True)
+        self._thread.start()
+
+    def submit(self, fileobj, options, filename=None):
+        """Store an uploaded file (file-like) and queue it; returns the BatchJob
+
+        Dosya 1 MB'lık parçalarla kopyalanır; sınır aşılınca okuma durur
+        (UploadTooLarge). Hata durumunda yarım kalan iş dizini silinir.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = BatchJob(job_id, os.path.join(self.directory, job_id), options, filename)
+        os.makedirs(job.directory)
+        size = 0
+        try:
+            with open(job.input_path, 'wb') as f:
+                while True:
+                    data = fileobj.read(1024 * 1024)
+                    if not data:
+                        break
+                    size += len(data)
+                    check_upload_size(size)
+                    f.write(data)
+            if size == 0:
+                raise ValueError("Boş dosya")
+        except BaseException:
+            shutil.rmtree(job.directory, ignore_errors=True)
+            raise
+
+        with self._condition:
+            self._jobs[job_id] = job
+            self._save(job)
+        self._queue.put(job)
+        print(f"📥 Batch job {job_id}: {filename or 'upload'} ({size / 1024 / 1024:.1f} MB)")
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def summary(self, job):
+        with self._condition:
+            return job.summary()
+
+    def queue_depth(self):
+        with self._condition:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def result(self, job):
+        """Full result of a finished job (None while it is still running)"""
+        with self._condition:
+            if job.status != 'done':
+                return None
+        with open(job.result_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def stream(self, job, poll=1.0):
+        """Yield utterance results in order as they finish, then the final job status"""
+        sent = 0
+        while True:
+            with self._condition:
+                while sent >= len(job.utterances or ()) and not job.finished:
+                    self._condition.wait(poll)
+                utterances = job.utterances
+                finished = job.finished
+                status = job.summary()
+            if utterances is None:
+                # Önceki çalışmada bitmiş iş
+                utterances = (self.result(job) or {}).get('utterances', [])
+            for utterance in utterances[sent:]:
+                yield dict(utterance, type='utterance')
+            sent = len(utterances)
+            if finished:
+                yield dict(status, type='status')
+                return
+
+    def _recover(self):
+        for job_id in sorted(os.listdir(self.directory)):
+            directory = os.path.join(self.directory, job_id)
+            try:
+                with open(os.path.join(directory, 'job.json'), encoding='utf-8') as f:
+                    job = BatchJob.from_record(directory, json.load(f))
+            except (OSError, ValueError, KeyError):
+                continue
+            if not job.finished:
+                # Yarım kalan iş baştan çalıştırılır
+                job.status, job.started_at, job.utterances = 'queued', None, []
+                self._queue.put(job)
+            self._jobs[job.id] = job
+
+    def _save(self, job):
+        path = os.path.join(job.directory, 'job.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job.to_record(), f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def _update(self, job, **fields):
+        with self._condition:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            self._save(job)
+            self._condition.notify_all()
+
+    def _run_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"❌ Batch job {job.id} başarısız: {e}")
+                self._update(job, status='failed', error=str(e), finished_at=time.time())
+
+    def _run(self, job):
+        self._update(job, status='running', started_at=time.time())
+        audio = load_audio(job.input_path)
+        regions = speech_regions(audio, runtime.get_vad_service())
+        self._update(job, duration=round(len(audio) / SAMPLE_RATE, 3), utterances_total=len(regions))
+
+        key = runtime.model_key(job.options['model'])
+        scheduler = runtime.model_registry.acquire(key)
+        try:
+            self._transcribe(job, scheduler, audio, regions)
+        finally:
+            runtime.model_registry.release(key)
+
+        result = {
+            'job_id': job.id,
+            'language': job.language,
+            'duration': job.duration,
+            'decode_seconds': round(job.decode_seconds, 3),
+            'text': ' '.join(u['text'] for u in job.utterances if u['text']),
+            'utterances': job.utterances
+        }
+        with open(job.result_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        self._update(job, status='done', finished_at=time.time())
+        print(f"✅ Batch job {job.id}: {job.duration:.1f}s ses, {len(regions)} utterance, "
+              f"RTF {job.real_time_factor()}")
+
+    def _transcribe(self, job, scheduler, audio, regions):
+        options = {
+            'word_timestamps': job.options['word_timestamps'],
+            # Bölgeler zaten VAD'dan geçti; VAD yoksa modelin filtresi kullanılır
+            'vad_filter': runtime.get_vad_service() is None
+        }
+        language = job.language
+        pending = deque()
+        index = 0
+        while index < len(regions) or pending:
+            # Dil bilinmiyorsa önce ilk utterance dili tespit eder
+            limit = self.max_inflight if language else 1
+            while index < len(regions) and len(pending) < limit:
+                start, end = regions[index]
+                future = scheduler.submit(
+                    audio[start:end], affinity=job.id, priority=PRIORITY_BATCH,
+                    language=language, **options
+                )
+                pending.append((start, end, future))
+                index += 1
+
+            start, end, future = pending.popleft()
+            result = future.result()
+            language = language or result.language
+            offset = start / SAMPLE_RATE
+            utterance = {
+                'index': len(job.utterances),
+                'start': round(offset, 3),
+                'end': round(end / SAMPLE_RATE, 3),
+                'text': result.text.strip(),
+                'language': result.language or language,
+                'segments': [_absolute(segment, offset) for segment in result.segments]
+            }
+            # Admission kullanımı /jobs decode'larını da sayar (gecikme SLO'suna girmez)
+            admission.controller.observe(
+                (end - start) / SAMPLE_RATE, result.decode_ms / 1000, result.batch_size, live=False
+            )
+            with self._condition:
+                job.language = language
+                job.decode_seconds += result.decode_ms / 1000 / max(1, result.batch_size)
+                job.utterances.append(utterance)
+                self._condition.notify_all()
+
+
+manager = None
+manager_lock = threading.Lock()
+
+
+def get_manager():
+    """Lazy create the batch job manager (recovers unfinished jobs on first use)"""
+    global manager
+    if manager is None:
+        with manager_lock:
+            if manager is None:
+                manager = BatchJobManager()
+    return manager
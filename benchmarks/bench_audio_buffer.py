@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: list tabanlı buffer vs AudioRingBuffer
+
+WebSocket handler'ının her chunk'ta yaptığı işi taklit eder:
+append + VAD tail (512 örnek) + her N chunk'ta tüm buffer'ı transcription'a ver.
+
+Kullanım:
+    python benchmarks/bench_audio_buffer.py [--chunks 2000] [--seconds 30]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from audio_buffer import AudioRingBuffer  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 4096
+VAD_WINDOW = 512
+
+
+def run_list(chunks, flush_every):
+    audio_buffer = []
+    for i, chunk in enumerate(chunks):
+        audio_buffer.extend(chunk)
+        recent = np.array(audio_buffer[-VAD_WINDOW:], dtype=np.float32)
+        if (i + 1) % flush_every == 0:
+            audio_np = np.array(audio_buffer, dtype=np.float32)
+            audio_buffer = []
+    return recent, audio_np
+
+
+def run_ring(chunks, flush_every, capacity):
+    audio_buffer = AudioRingBuffer(capacity)
+    for i, chunk in enumerate(chunks):
+        audio_buffer.append(chunk)
+        recent = audio_buffer.tail(VAD_WINDOW)
+        if (i + 1) % flush_every == 0:
+            audio_np = audio_buffer.view()
+            audio_buffer.clear()
+    return recent, audio_np
+
+
+def measure(name, fn, n_chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_chunk_us = elapsed / n_chunks * 1e6
+    print(f"{name:<14} {per_chunk_us:10.1f} µs/chunk   peak {peak / 1e6:8.2f} MB")
+    return per_chunk_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--chunks', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=30.0,
+                        help='audio buffered between flushes (and ring capacity)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    chunks = [
+        (rng.standard_normal(CHUNK_SIZE) * 0.1).astype(np.float32)
+        for _ in range(64)
+    ]
+    chunks = [chunks[i % len(chunks)] for i in range(args.chunks)]
+    flush_every = max(1, int(args.seconds * SAMPLE_RATE / CHUNK_SIZE))
+    capacity = int(args.seconds * SAMPLE_RATE) + CHUNK_SIZE
+
+    print(f"{args.chunks} chunks x {CHUNK_SIZE} samples, flush every {flush_every} chunks")
+    old = measure("list", lambda: run_list(chunks, flush_every), args.chunks)
+    new = measure("ring buffer", lambda: run_ring(chunks, flush_every, capacity), args.chunks)
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
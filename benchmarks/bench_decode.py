@@ -0,0 +1,72 @@
+"""
+Benchmark: JSON + base64 vs binary WebSocket ses frame'leri
+
+Sunucu tarafında bir saniyelik ses için harcanan decode süresini ve
+kablo üzerindeki byte sayısını karşılaştırır (4096 örneklik chunk'lar).
+
+Kullanım:
+    python benchmarks/bench_decode.py [--seconds 600]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from audio_codec import decode_pcm, decode_base64_pcm  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 4096
+
+
+def legacy_decode(message):
+    data = json.loads(message)
+    return decode_base64_pcm(data['audio_base_64'])
+
+
+def run(name, messages, decode, audio_seconds):
+    start = time.perf_counter()
+    for message in messages:
+        decode(message)
+    elapsed = time.perf_counter() - start
+    wire_bytes = sum(len(m) for m in messages)
+    print(f"{name:<18} {elapsed / audio_seconds * 1e6:8.1f} µs per audio second   "
+          f"{wire_bytes * 8 / audio_seconds / 1000:6.1f} kbit/s on the wire")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=600.0)
+    args = parser.parse_args()
+
+    n_chunks = int(args.seconds * SAMPLE_RATE / CHUNK_SIZE)
+    audio_seconds = n_chunks * CHUNK_SIZE / SAMPLE_RATE
+    rng = np.random.default_rng(0)
+    pcm = (rng.standard_normal(CHUNK_SIZE) * 3000).astype('<i2').tobytes()
+
+    legacy = [
+        json.dumps({
+            'type': 'audio',
+            'audio_base_64': base64.b64encode(pcm).decode('ascii'),
+            'sample_rate': SAMPLE_RATE
+        })
+        for _ in range(n_chunks)
+    ]
+    binary_s16 = [pcm] * n_chunks
+    binary_f32 = [decode_pcm(pcm).astype('<f4').tobytes()] * n_chunks
+
+    print(f"{audio_seconds:.0f}s of audio in {n_chunks} chunks")
+    old = run("json+base64 s16", legacy, legacy_decode, audio_seconds)
+    new = run("binary s16", binary_s16, lambda m: decode_pcm(m, 'pcm_s16le'), audio_seconds)
+    run("binary f32", binary_f32, lambda m: decode_pcm(m, 'pcm_f32le'), audio_seconds)
+    print(f"speedup (s16): {old / new:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: Opus vs PCM WebSocket trafiği ve sunucu decode maliyeti
+
+Bir Ogg Opus fixture dosyasındaki paketler /ws'e gönderilecekleri gibi tek
+tek OpusStreamDecoder ile decode edilir. Fixture verilmezse sentetik ses
+opuslib ile 20 ms'lik paketlere encode edilir.
+
+Fixture oluşturma (mono, 20 ms frame):
+    ffmpeg -i speech.wav -ac 1 -c:a libopus -b:a 24k -frame_duration 20 speech.opus
+
+Kullanım:
+    python benchmarks/bench_opus.py [--fixture speech.opus] [--bitrate 24000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from audio_codec import OpusStreamDecoder, iter_opus_packets  # noqa: E402
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+
+def synthetic_packets(seconds, bitrate):
+    import opuslib
+
+    encoder = opuslib.Encoder(SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
+    encoder.bitrate = bitrate
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    # Konuşmaya benzer: genliği modüle edilmiş harmonikler + gürültü
+    audio = np.sin(2 * np.pi * 150 * t) + 0.5 * np.sin(2 * np.pi * 450 * t)
+    audio *= 0.3 * (1 + np.sin(2 * np.pi * 3 * t))
+    audio += np.random.default_rng(0).standard_normal(len(t)) * 0.02
+    pcm = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    return [
+        encoder.encode(pcm[i:i + frame].tobytes(), frame)
+        for i in range(0, len(pcm) - frame + 1, frame)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--fixture', help='Ogg Opus file (.opus)')
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--bitrate', type=int, default=24000)
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, 'rb') as f:
+            packets = list(iter_opus_packets(f))
+    else:
+        packets = synthetic_packets(args.seconds, args.bitrate)
+
+    decoder = OpusStreamDecoder(SAMPLE_RATE)
+    start = time.perf_counter()
+    samples = sum(len(decoder.decode(packet)) for packet in packets)
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = samples / SAMPLE_RATE
+    opus_kbps = sum(len(p) for p in packets) * 8 / audio_seconds / 1000
+    pcm_kbps = SAMPLE_RATE * 16 / 1000
+    print(f"{audio_seconds:.1f}s of audio in {len(packets)} packets")
+    print(f"opus    {opus_kbps:6.1f} kbit/s on the wire   "
+          f"{elapsed / audio_seconds * 1e6:8.1f} µs decode per audio second")
+    print(f"pcm s16 {pcm_kbps:6.1f} kbit/s on the wire   ({pcm_kbps / opus_kbps:.1f}x more)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: utterances/sec vs ASR worker count (threads vs processes)
+
+Aynı yük, tek süreçte InferenceScheduler thread'leri ile ve
+ProcessPoolScheduler worker süreçleri ile çalıştırılır. Load generator
+`--concurrency` kadar utterance'ı sürekli kuyrukta tutar.
+
+Varsayılan stub model, utterance başına GIL tutan saf Python iş yapar
+(session/segment glue kodunu temsil eder). `--model tiny` gerçek bir
+faster-whisper modeli kullanır (CPU, int8).
+
+Kullanım:
+    python benchmarks/bench_process_pool.py [--workers 1,2,4] [--utterances 64]
+    python benchmarks/bench_process_pool.py --model tiny --utterances 32
+"""
+
+import argparse
+import functools
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from inference import InferenceScheduler  # noqa: E402
+from asr_engine import create_engine  # noqa: E402
+from process_pool import ProcessPoolScheduler  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+class StubModel:
+    """GIL-bound stand-in for WhisperModel: cost scales with utterance length"""
+
+    def __init__(self, work_per_second=200000):
+        self.work_per_second = work_per_second
+
+    def transcribe(self, audio, **options):
+        duration = len(audio) / SAMPLE_RATE
+        total = 0
+        for i in range(int(self.work_per_second * duration)):
+            total += i & 7
+        segment = SimpleNamespace(text=f" {total % 97}", start=0.0, end=duration, words=None)
+        return iter([segment]), SimpleNamespace(language=options.get('language') or 'en')
+
+
+def load_stub_model(key, cpu_threads, num_workers):
+    return StubModel()
+
+
+def run_load(scheduler, utterances, audio, concurrency):
+    """Closed-loop load generator; returns utterances/sec"""
+    slots = threading.Semaphore(concurrency)
+    done = threading.Event()
+    remaining = [utterances]
+    lock = threading.Lock()
+
+    def finished(future):
+        future.result()
+        slots.release()
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+
+    start = time.perf_counter()
+    for i in range(utterances):
+        slots.acquire()
+        scheduler.submit(audio, affinity=i, language='en').add_done_callback(finished)
+    done.wait()
+    return utterances / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--utterances', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=2.0, help='utterance length')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--model', default=None, help='faster-whisper model (default: stub)')
+    parser.add_argument('--routing', default='least_loaded')
+    args = parser.parse_args()
+
+    key = (args.model or 'stub', 'cpu', 'int8')
+    loader = functools.partial(create_engine, 'faster_whisper') if args.model else load_stub_model
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(int(args.seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+    print(f"{os.cpu_count()} CPU, model={key[0]}, {args.utterances} x {args.seconds}s utterances")
+    print(f"{'workers':>7}  {'threads utt/s':>14}  {'processes utt/s':>16}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+
+        engine = loader(key, cpu_threads * workers, workers)
+        threaded = InferenceScheduler(engine, num_workers=workers, max_batch_size=1)
+        run_load(threaded, min(4, args.utterances), audio, args.concurrency)  # warm-up
+        threads_rate = run_load(threaded, args.utterances, audio, args.concurrency)
+        threaded.close()
+
+        pool = ProcessPoolScheduler(
+            key, num_processes=workers, cpu_threads=cpu_threads,
+            routing=args.routing, max_audio_seconds=args.seconds, loader=loader
+        )
+        run_load(pool, min(4, args.utterances), audio, args.concurrency)
+        processes_rate = run_load(pool, args.utterances, audio, args.concurrency)
+        pool.close()
+        pool.join()
+
+        print(f"{workers:>7}  {threads_rate:>14.1f}  {processes_rate:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark: sunucu tarafı streaming resampler maliyeti
+
+Her giriş hızından 16 kHz'e, tarayıcının gönderdiği boyutta (4096 örnek)
+chunk'larla resampling yapılır; ses saniyesi başına CPU süresi ve tek
+çekirdekte aynı anda kaldırılabilecek session sayısı raporlanır.
+
+Kullanım:
+    python benchmarks/bench_resampler.py [--seconds 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from resampler import StreamingResampler  # noqa: E402
+
+CHUNK_SIZE = 4096
+RATES = (8000, 22050, 44100, 48000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=60.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'input rate':<12}{'L/M':>10}{'taps':>6}{'µs per audio s':>16}{'sessions/core':>15}")
+    for rate in RATES:
+        audio = (rng.standard_normal(int(args.seconds * rate)) * 0.1).astype(np.float32)
+        resampler = StreamingResampler(rate)
+        resampler.process(audio[:CHUNK_SIZE])  # warm-up
+        resampler.reset()
+
+        start = time.perf_counter()
+        for i in range(0, len(audio), CHUNK_SIZE):
+            resampler.process(audio[i:i + CHUNK_SIZE])
+        elapsed = time.perf_counter() - start
+
+        per_second = elapsed / args.seconds
+        ratio = f"{resampler.up}/{resampler.down}"
+        print(f"{rate:<12}{ratio:>10}{resampler.taps:>6}{per_second * 1e6:16.1f}{1 / per_second:15.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: Silero VAD torch vs ONNX Runtime backend
+
+Her backend ayrı bir process'te ölçülür (torch import'u diğerini
+etkilemesin): başlangıç süresi (import + model yükleme), RSS ve
+batch boyutuna göre pencere başına gecikme.
+
+Kullanım:
+    python benchmarks/bench_vad_backends.py \\
+        --torch-model silero_vad.jit --onnx-model silero_vad.onnx
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def measure(backend, model_path, frames, batch_sizes):
+    """Runs inside the child process; prints one JSON line"""
+    import resource
+    import time
+
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import numpy as np
+    from vad import VAD_FRAME_SIZE, load_vad_backend
+    model = load_vad_backend(backend, model_path)
+    startup = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    rng = np.random.default_rng(0)
+    latency = {}
+    for batch_size in batch_sizes:
+        states = [model.initial_state() for _ in range(batch_size)]
+        batch = (rng.standard_normal((batch_size, VAD_FRAME_SIZE)) * 0.1).astype(np.float32)
+        model(batch, states)  # warm-up
+        steps = max(1, frames // batch_size)
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, states = model(batch, states)
+        latency[batch_size] = (time.perf_counter() - start) / (steps * batch_size) * 1e6
+
+    print(json.dumps({'startup_s': startup, 'rss_mb': rss_mb, 'latency_us': latency}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--torch-model', help='local .jit file (default: torch.hub)')
+    parser.add_argument('--onnx-model', help='local .onnx file')
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--batch-sizes', default='1,8,32')
+    parser.add_argument('--child', nargs=2, metavar=('BACKEND', 'MODEL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+
+    if args.child:
+        backend, model_path = args.child
+        measure(backend, model_path or None, args.frames, batch_sizes)
+        return
+
+    runs = [('torch', args.torch_model or '')]
+    if args.onnx_model:
+        runs.append(('onnx', args.onnx_model))
+    else:
+        print("⚠️  --onnx-model verilmedi, yalnızca torch ölçülüyor")
+
+    header = ''.join(f"{f'b={b} µs/frame':>16}" for b in batch_sizes)
+    print(f"{'backend':<8}{'startup s':>11}{'RSS MB':>10}{header}")
+    for backend, model_path in runs:
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', backend, model_path,
+             '--frames', str(args.frames), '--batch-sizes', args.batch_sizes],
+            capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            print(f"{backend:<8} failed: {output.stderr.strip().splitlines()[-1]}")
+            continue
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        latency = ''.join(f"{result['latency_us'][str(b)]:16.1f}" for b in batch_sizes)
+        print(f"{backend:<8}{result['startup_s']:11.2f}{result['rss_mb']:10.0f}{latency}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: kelime zamanlarının maliyeti (decode + mesaj boyutu)
+
+1) Payload: bir committed_transcript mesajının JSON boyutu ve json.dumps
+   süresi, word_timing (off / segment / full) ve word_format (objects /
+   arrays) kombinasyonlarıyla (--seconds uzunlukta, 2.5 kelime/s).
+2) Decode (--model verilirse): aynı utterance word_timestamps=False ve True
+   ile decode edilir; fark cross-attention hizalamasının maliyetidir.
+   --wav 16 kHz PCM16 bir konuşma kaydı olmalıdır (yoksa sentetik ses).
+
+Kullanım:
+    python benchmarks/bench_word_timing.py [--seconds 10]
+    python benchmarks/bench_word_timing.py --model tiny --wav speech.wav --repeats 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from word_timing import encode_segments, encode_words  # noqa: E402
+
+SAMPLE_RATE = 16000
+WORDS_PER_SECOND = 2.5
+
+
+def synthetic_words(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    words = []
+    t = 0.0
+    for i in range(int(seconds * WORDS_PER_SECOND)):
+        duration = float(rng.uniform(0.15, 0.45))
+        words.append({
+            'text': f" kelime{i % 17}",
+            'start': round(t, 3),
+            'end': round(t + duration, 3),
+            'probability': float(rng.uniform(0.6, 1.0))
+        })
+        t += 1 / WORDS_PER_SECOND
+    return words
+
+
+def message(text, timing):
+    return {
+        'type': 'committed_transcript',
+        'message_type': 'committed_transcript',
+        'text': text,
+        'language_code': 'tr',
+        'latency_ms': 412,
+        'queue_ms': 3,
+        **timing,
+        'buffer_duration': 10.0,
+        'start_sample': 480000,
+        'end_sample': 640000,
+        'final': True
+    }
+
+
+def bench_payload(seconds, iterations):
+    words = synthetic_words(seconds)
+    text = ''.join(word['text'] for word in words).strip()
+    # ~5 saniyelik segment'ler
+    segments = []
+    for word in words:
+        if segments and word['end'] - segments[-1]['start'] <= 5.0:
+            segments[-1]['text'] += word['text']
+            segments[-1]['end'] = word['end']
+        else:
+            segments.append({'text': word['text'], 'start': word['start'], 'end': word['end']})
+
+    variants = [
+        ('off', {'words': None}),
+        ('segment objects', {'words': None, 'segments': encode_segments(segments)}),
+        ('segment arrays', {'words': None, 'segments': encode_segments(segments, 'arrays')}),
+        ('full objects', {'words': encode_words(words)}),
+        ('full arrays', {'words': encode_words(words, 'arrays')}),
+    ]
+    print(f"committed_transcript, {seconds:.0f}s utterance, {len(words)} kelime")
+    print(f"{'word_timing / format':<20} {'bytes':>7} {'json.dumps':>12}")
+    for name, timing in variants:
+        payload = message(text, timing)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            size = len(json.dumps(payload))
+        elapsed = (time.perf_counter() - start) / iterations
+        print(f"{name:<20} {size:>7} {elapsed * 1e6:>9.1f} µs")
+
+
+def bench_decode(model, wav, repeats):
+    from asr_engine import create_engine
+
+    if wav:
+        from load_test import load_wav
+        pcm, rate = load_wav(wav)
+        if rate != SAMPLE_RATE:
+            raise SystemExit(f"{wav}: 16 kHz WAV gerekli ({rate} Hz)")
+        audio = pcm.astype(np.float32) / 32768.0
+    else:
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(SAMPLE_RATE * 10) * 0.05).astype(np.float32)
+
+    engine = create_engine('faster_whisper', (model, 'cpu', 'int8'))
+    engine.transcribe(audio[:SAMPLE_RATE * 2], language='tr')  # warm-up
+
+    print(f"\ndecode: {model}, {len(audio) / SAMPLE_RATE:.1f}s ses, {repeats} tekrar")
+    results = {}
+    for word_timestamps in (False, True):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            segments, _ = engine.transcribe(audio, language='tr', word_timestamps=word_timestamps)
+            times.append(time.perf_counter() - start)
+        results[word_timestamps] = float(np.median(times))
+        words = sum(len(segment['words'] or []) for segment in segments)
+        print(f"word_timestamps={word_timestamps!s:<5} {results[word_timestamps] * 1000:8.1f} ms "
+              f"({len(segments)} segment, {words} kelime)")
+    print(f"kelime hizalaması: +{(results[True] / results[False] - 1) * 100:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=10.0, help='utterance uzunluğu (payload)')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--model', default=None, help='faster-whisper modeli (decode ölçümü)')
+    parser.add_argument('--wav', default=None)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    bench_payload(args.seconds, args.iterations)
+    if args.model:
+        bench_decode(args.model, args.wav, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""
+Load test: N simulated WebSocket clients replaying audio at real-time pace
+
+Her client templates/index.html ile aynı protokolü konuşur: session_started
+bekler, config gönderir, config_updated onayından sonra 4096 örneklik
+binary PCM s16le frame'lerini gerçek zamanlı hızda yollar. WAV fixture'ları
+kendi örnekleme hızlarında gönderilir (sunucu 16 kHz'e çevirir); fixture
+verilmezse sentetik konuşma/sessizlik dizisi kullanılır (Silero VAD'ın
+konuşma saydığı formant sentezi). Test hiç final transcript almadan biterse
+gecikme sonuçları anlamsızdır: hata mesajıyla exit code 1 döner.
+
+Ölçülenler:
+  - latency: konuşma sonu (speech_ended.end_sample, VAD yoksa kesim sonu)
+    ile final committed_transcript'in client'a ulaşması arasındaki süre;
+    streaming'de ayrıca kesinleşen son kelimenin sonu -> commit süresi;
+    first text: konuşma sonu -> utterance'ın ilk metni (uzun utterance'larda
+    decode edildikçe gelen segment'ler, --no-stream-segments ile kapatılır)
+  - throughput: saniyede final transcript ve işlenen ses saniyesi
+  - dropped (sunucunun overloaded mesajları), missing (transcript'i hiç
+    gelmeyen konuşmalar), late (--deadline-ms'ten geç gelenler), send lag
+  - giden trafik: client'ların aldığı byte / frame / mesaj (türe göre) ve
+    sunucunun /metrics'inden test süresince harcanan CPU (ana süreç)
+  - admission: sırada bekletilen (session_queued) ve reddedilen
+    (session_rejected) client'lar; --admission-slo-ms ile --serve edilen
+    sunucuda ADMISSION_P95_SLO_MS açılır
+
+Durum mesajı throttling'inin etkisi için önce/sonra:
+    python benchmarks/load_test.py --serve stub --status-interval-ms 0
+    python benchmarks/load_test.py --serve stub --batch-messages
+
+Sunucu ayrı bir süreçte başlatılabilir (--serve stub: ASR_ENGINE=stub ile
+model indirmeden; --stub-base-ms 0 --stub-per-second-ms 0 yalnızca sunucu
+overhead'ini ölçer; --serve tiny: gerçek model) veya --url ile çalışan bir
+sunucu hedeflenir. websockets paketi gerekir.
+
+Kullanım:
+    python benchmarks/load_test.py --serve stub --clients 20 --duration 30
+    python benchmarks/load_test.py --serve tiny --clients 4 --wav speech.wav
+    python benchmarks/load_test.py --url ws://localhost:5000/ws --clients 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import wave
+from collections import Counter
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 4096  # index.html ScriptProcessor buffer boyutu
+
+
+# --- Fixture'lar -------------------------------------------------------------
+
+def load_wav(path):
+    """Read a PCM16 WAV file as (int16 mono samples, sample_rate)"""
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: yalnızca 16-bit PCM WAV desteklenir")
+        rate = f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype='<i2')
+        if f.getnchannels() > 1:
+            pcm = pcm.reshape(-1, f.getnchannels()).mean(axis=1).astype('<i2')
+    return pcm, rate
+
+
+# Sesli harf formantları (F1, F2, F3 Hz): a, i, e, o, u, æ, ʌ
+VOWEL_FORMANTS = (
+    (730, 1090, 2440), (270, 2290, 3010), (530, 1840, 2480), (570, 840, 2410),
+    (300, 870, 2240), (660, 1720, 2410), (490, 1350, 1690)
+)
+FORMANT_BANDWIDTHS = (80, 100, 120)
+
+
+def _formant_gain(freqs, formants):
+    gain = np.full_like(freqs, 0.02)
+    for formant, bandwidth in zip(formants, FORMANT_BANDWIDTHS):
+        gain += 1 / (1 + ((freqs - formant) / bandwidth) ** 2)
+    return gain
+
+
+def synthetic_fixture(seconds, seed=0, lengths=(1.0, 3.0)):
+    """
+    Speech-like utterances (1-3 s by default) separated by 0.8 s silences
+
+    Kaynak-filtre sentezi: düşen, titreşen f0'lı glottal darbe dizisi
+    hecelere bölünür; her hece gürültülü bir ünsüz + formant filtreli bir
+    sesli harften oluşur. Saf harmonik tonları Silero VAD konuşma saymaz
+    (çerçevelerin ~%1'i), bu sentez ~%95'i geçer.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+    while total < seconds * SAMPLE_RATE:
+        n = int(rng.uniform(*lengths) * SAMPLE_RATE)
+        t = np.arange(n) / SAMPLE_RATE
+        # Cümle boyunca düşen tonlama + vibrato benzeri titreşim
+        f0 = rng.uniform(100, 220) * (1.1 - 0.2 * t / t[-1]) * (1 + 0.03 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        pulses = np.zeros(n)
+        pulses[np.nonzero(np.diff(np.floor(np.cumsum(f0) / SAMPLE_RATE)) > 0)[0]] = 1.0
+        source = np.convolve(pulses, np.exp(-np.arange(80) / 12.0), 'same')
+
+        burst = np.zeros(n)
+        pos = 0
+        while pos < n:
+            consonant = int(rng.uniform(0.03, 0.08) * SAMPLE_RATE)
+            end = min(n, pos + consonant + int(rng.uniform(0.1, 0.25) * SAMPLE_RATE))
+            m = end - pos
+            freqs = np.fft.rfftfreq(m, 1 / SAMPLE_RATE)
+            formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+            vowel = np.fft.irfft(np.fft.rfft(source[pos:end]) * _formant_gain(freqs, formants), m)
+            noise = np.fft.irfft(np.fft.rfft(rng.standard_normal(m)) * (freqs > 2500), m)
+            ramp = np.arange(m)
+            vowel *= np.clip((ramp - consonant) / (0.02 * SAMPLE_RATE), 0, 1) * np.clip((m - ramp) / (0.03 * SAMPLE_RATE), 0, 1)
+            noise[min(consonant, m):] = 0
+            burst[pos:end] = vowel / (np.abs(vowel).max() + 1e-9) + 0.3 * noise / (np.abs(noise).max() + 1e-9)
+            pos = end
+        parts.append(burst * 0.3)
+        parts.append(np.zeros(int(0.8 * SAMPLE_RATE)))
+        total += n + int(0.8 * SAMPLE_RATE)
+    audio = np.concatenate(parts)[:int(seconds * SAMPLE_RATE)]
+    return (audio * 32767).astype('<i2'), SAMPLE_RATE
+
+
+# --- Client -------------------------------------------------------------------
+
+class ClientStats:
+    def __init__(self):
+        self.latencies_ms = []
+        self.server_latencies_ms = []
+        self.word_latencies_ms = []  # Streaming: kelime sonu -> final olmayan commit
+        self.first_text_latencies_ms = []  # Konuşma sonu -> utterance'ın ilk metni
+        self.streamed_commits = 0
+        self.speech_ends = []  # speech_ended.end_sample (16 kHz eksen)
+        self.covered = 0  # Final transcript'i gelen konuşma sayısı
+        self.finals = 0
+        self.empty = 0  # Boş sonuçla biten utterance'lar
+        self.final_audio_s = 0.0
+        self.dropped = 0
+        self.dropped_audio_s = 0.0  # Sunucu ses buffer'ı taştı
+        self.errors = []
+        self.max_send_lag_ms = 0.0
+        self.audio_sent_s = 0.0
+        self.vad_enabled = None
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.message_types = Counter()
+        self.queued = False
+        self.rejected = None  # session_rejected.reason
+
+
+async def run_client(index, url, pcm, rate, args, stats):
+    import websockets
+
+    await asyncio.sleep(index * args.ramp / max(1, args.clients))
+    loop = asyncio.get_running_loop()
+
+    async with websockets.connect(url, max_size=None) as ws:
+        started = json.loads(await ws.recv())
+        if started.get('type') == 'session_queued':
+            # Admission control: kapasite açılınca session_started gelir
+            stats.queued = True
+            started = json.loads(await ws.recv())
+        if started.get('type') == 'session_rejected':
+            stats.rejected = started.get('reason')
+            return
+        if started.get('type') != 'session_started':
+            stats.errors.append(started.get('error', str(started)))
+            return
+        stats.vad_enabled = started.get('vad_enabled')
+
+        # index.html sendConfig() ile aynı alanlar (model verilmezse sunucunun varsayılanı)
+        config = {
+            'language': args.language,
+            'silence_threshold': 0.5,
+            'min_speech_duration': 0.5,
+            'vad_threshold': 0.5,
+            'audio_encoding': 'pcm_s16le',
+            'sample_rate': rate,
+            'streaming': args.streaming,
+            'chunk_length_s': 3,
+            'partial_interval_ms': 500
+        }
+        if args.model:
+            config['model'] = args.model
+        if args.status_interval_ms is not None:
+            config['status_interval_ms'] = args.status_interval_ms
+        if args.batch_messages:
+            config['batch_messages'] = True
+        if not args.stream_segments:
+            config['stream_segments'] = False
+        if args.word_timing:
+            config['word_timing'] = args.word_timing
+        if args.word_format:
+            config['word_format'] = args.word_format
+        await ws.send(json.dumps({'type': 'config', 'config': config}))
+
+        configured = asyncio.Event()
+        pending_ends = []  # Transcript'i beklenen speech_ended'lar
+        awaiting_text = []  # İlk metni beklenen speech_ended'lar
+        t0 = None  # Session'ın 0. örneğinin "konuşulduğu" an (loop.time)
+
+        async def receiver():
+            async for raw in ws:
+                stats.bytes_received += len(raw)
+                stats.frames_received += 1
+                frame = json.loads(raw)
+                now = loop.time()
+                messages = frame['messages'] if frame.get('type') == 'batch' else [frame]
+                for message in messages:
+                    stats.message_types[message.get('type')] += 1
+                    handle(message, now)
+
+        def handle(message, now):
+            msg_type = message.get('type')
+            if msg_type == 'committed_transcript' and 'start_sample' in message and t0 is not None:
+                # Segment commit'leri ve final: utterance içindeki konuşma sonları ilk metnini aldı
+                start, end = message['start_sample'], message.get('end_sample', float('inf'))
+                for e in [e for e in awaiting_text if start <= e <= end]:
+                    awaiting_text.remove(e)
+                    stats.first_text_latencies_ms.append((now - (t0 + e / SAMPLE_RATE)) * 1000)
+
+            if msg_type == 'config_updated':
+                configured.set()
+            elif msg_type == 'speech_ended':
+                if message['speech_duration'] >= 0.5:
+                    stats.speech_ends.append(message['end_sample'])
+                    pending_ends.append(message['end_sample'])
+                    awaiting_text.append(message['end_sample'])
+            elif msg_type == 'partial_transcript' and 'end_sample' in message:
+                # Boş sonuçla biten utterance: transcript yok ama kayıp da değil
+                start, end = message['start_sample'], message['end_sample']
+                ends = [e for e in pending_ends if start <= e <= end]
+                for e in ends:
+                    pending_ends.remove(e)
+                stats.covered += len(ends)
+                stats.empty += 1
+            elif msg_type == 'committed_transcript' and not message.get('final'):
+                stats.streamed_commits += 1
+                if message.get('words') and t0 is not None:
+                    # Kelime zamanları session başından (segment commit'lerinde utterance başından) saniye
+                    words = message['words']
+                    last_end = words['end'][-1] if isinstance(words, dict) else words[-1]['end']
+                    word_end = last_end + message.get('start_sample', 0) / SAMPLE_RATE
+                    stats.word_latencies_ms.append((now - (t0 + word_end)) * 1000)
+            elif msg_type == 'committed_transcript':
+                stats.finals += 1
+                if 'latency_ms' in message:
+                    stats.server_latencies_ms.append(message['latency_ms'])
+                if 'end_sample' not in message or t0 is None:
+                    return
+                start, end = message['start_sample'], message['end_sample']
+                stats.final_audio_s += (end - start) / SAMPLE_RATE
+                # VAD'lı utterance: konuşma sonu, utterance içindeki son speech_ended
+                ends = [e for e in pending_ends if start <= e <= end]
+                for e in ends:
+                    pending_ends.remove(e)
+                stats.covered += len(ends)
+                speech_end = max(ends) if ends else end
+                stats.latencies_ms.append((now - (t0 + speech_end / SAMPLE_RATE)) * 1000)
+            elif msg_type == 'overloaded':
+                stats.dropped = message.get('dropped_utterances', stats.dropped)
+                stats.dropped_audio_s = message.get('dropped_audio_s', stats.dropped_audio_s)
+            elif msg_type == 'error':
+                stats.errors.append(message.get('error'))
+
+        receive_task = asyncio.create_task(receiver())
+        try:
+            await asyncio.wait_for(configured.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            stats.errors.append('config_updated gelmedi')
+            receive_task.cancel()
+            return
+
+        # Döngülü fixture + sondaki sessizlik (son konuşma da kapanabilsin)
+        total = int(args.duration * rate)
+        audio = np.resize(pcm, total)
+        audio = np.concatenate([audio, np.zeros(int(args.tail_silence * rate), dtype='<i2')])
+        chunk_s = CHUNK_SIZE / rate
+        t0 = loop.time()
+        for i, offset in enumerate(range(0, len(audio), CHUNK_SIZE)):
+            # Frame, içindeki son örnek "kaydedildiğinde" gönderilir
+            target = t0 + (i + 1) * chunk_s
+            delay = target - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                stats.max_send_lag_ms = max(stats.max_send_lag_ms, -delay * 1000)
+            await ws.send(audio[offset:offset + CHUNK_SIZE].tobytes())
+        stats.audio_sent_s = len(audio) / rate
+
+        # Bekleyen transcript'ler için drain süresi
+        deadline = loop.time() + args.drain_timeout
+        while pending_ends and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        receive_task.cancel()
+
+
+# --- Sunucu --------------------------------------------------------------------
+
+def start_server(args):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+
+    env = dict(os.environ, PORT=str(port))
+    if args.serve == 'stub':
+        # Stub engine: model indirmeden, yalnızca sunucu overhead'i + sabit gecikme
+        env.update(
+            ASR_ENGINE='stub',
+            STUB_BASE_MS=str(args.stub_base_ms),
+            STUB_PER_SECOND_MS=str(args.stub_per_second_ms)
+        )
+    else:
+        env['WHISPER_MODEL'] = args.serve
+    if args.admission_slo_ms is not None:
+        env['ADMISSION_P95_SLO_MS'] = str(args.admission_slo_ms)
+    script = 'asgi_app.py' if args.server == 'asgi' else 'app.py'
+    process = subprocess.Popen([sys.executable, script], cwd=ROOT, env=env)
+
+    # /ready: modeller yüklenip ısınana kadar 503 döner
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Sunucu başlatılamadı (exit code {process.returncode})")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=2):
+                return process, f'ws://127.0.0.1:{port}/ws'
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Sunucu /ready olmadı")
+
+
+def scrape_metrics(url, names=('process_cpu_seconds_total',)):
+    """Read unlabelled samples from the server's /metrics (None if unavailable)"""
+    http_url = url.replace('ws://', 'http://', 1).replace('wss://', 'https://', 1)
+    http_url = http_url.rsplit('/', 1)[0] + '/metrics'
+    try:
+        with urllib.request.urlopen(http_url, timeout=5) as response:
+            text = response.read().decode('utf-8')
+    except (urllib.error.URLError, OSError):
+        return None
+    samples = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(' ')
+        if name in names:
+            samples[name] = float(value)
+    return samples
+
+
+# --- Rapor ---------------------------------------------------------------------
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values)
+    return {f'p{p}': round(float(np.percentile(values, p)), 1) for p in (50, 90, 95, 99)} | {
+        'max': round(float(values.max()), 1)
+    }
+
+
+def report(all_stats, wall_s, args, server=None):
+    latencies = [v for s in all_stats for v in s.latencies_ms]
+    speech = sum(len(s.speech_ends) for s in all_stats)
+    covered = sum(s.covered for s in all_stats)
+    finals = sum(s.finals for s in all_stats)
+    summary = {
+        'clients': args.clients,
+        'vad_enabled': all_stats[0].vad_enabled if all_stats else None,
+        'wall_s': round(wall_s, 1),
+        'audio_sent_s': round(sum(s.audio_sent_s for s in all_stats), 1),
+        'finals': finals,
+        'streamed_commits': sum(s.streamed_commits for s in all_stats),
+        'empty': sum(s.empty for s in all_stats),
+        'throughput_finals_per_s': round(finals / wall_s, 2),
+        'throughput_audio_s_per_s': round(sum(s.final_audio_s for s in all_stats) / wall_s, 2),
+        'latency_ms': percentiles(latencies),
+        'word_latency_ms': percentiles([v for s in all_stats for v in s.word_latencies_ms]),
+        'first_text_ms': percentiles([v for s in all_stats for v in s.first_text_latencies_ms]),
+        'server_latency_ms': percentiles([v for s in all_stats for v in s.server_latencies_ms]),
+        'late': sum(1 for v in latencies if v > args.deadline_ms),
+        'dropped': sum(s.dropped for s in all_stats),
+        'dropped_audio_s': round(sum(s.dropped_audio_s for s in all_stats), 2),
+        'speech_detected': speech,
+        'missing': speech - covered if speech else 0,
+        'max_send_lag_ms': round(max((s.max_send_lag_ms for s in all_stats), default=0.0), 1),
+        'received_bytes': sum(s.bytes_received for s in all_stats),
+        'received_frames': sum(s.frames_received for s in all_stats),
+        'messages': dict(sum((s.message_types for s in all_stats), Counter()).most_common()),
+        'server_cpu_s': round(server['process_cpu_seconds_total'], 2) if server else None,
+        'queued_sessions': sum(1 for s in all_stats if s.queued),
+        'rejected_sessions': dict(Counter(s.rejected for s in all_stats if s.rejected)),
+        'errors': sorted({str(e) for s in all_stats for e in s.errors})
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return summary
+    print(f"{summary['clients']} clients, {summary['audio_sent_s']}s audio in {summary['wall_s']}s "
+          f"(VAD: {summary['vad_enabled']})")
+    print(f"finals: {finals}  ({summary['throughput_finals_per_s']}/s, "
+          f"{summary['throughput_audio_s_per_s']} audio s/s), empty: {summary['empty']}")
+    print(f"speech end -> committed (ms): {summary['latency_ms']}")
+    print(f"speech end -> first text:     {summary['first_text_ms']}")
+    if summary['streamed_commits']:
+        print(f"word end -> streamed commit:  {summary['word_latency_ms']} "
+              f"({summary['streamed_commits']} commits)")
+    print(f"server latency_ms:            {summary['server_latency_ms']}")
+    print(f"late (>{args.deadline_ms}ms): {summary['late']}  dropped: {summary['dropped']} "
+          f"(+{summary['dropped_audio_s']}s audio)  "
+          f"missing: {summary['missing']}  max send lag: {summary['max_send_lag_ms']}ms")
+    audio_s = summary['audio_sent_s'] or 1.0
+    print(f"outbound: {summary['received_bytes']} bytes ({summary['received_bytes'] / audio_s:.0f} B/audio s), "
+          f"{summary['received_frames']} frames, messages: {summary['messages']}")
+    if server:
+        print(f"server CPU: {summary['server_cpu_s']}s "
+              f"({summary['server_cpu_s'] / audio_s * 1000:.2f} ms/audio s, ana süreç)")
+    if summary['queued_sessions'] or summary['rejected_sessions']:
+        print(f"admission: queued {summary['queued_sessions']}, rejected {summary['rejected_sessions']}")
+    if summary['errors']:
+        print(f"errors: {summary['errors']}")
+    return summary
+
+
+async def run_clients(url, fixtures, args):
+    all_stats = [ClientStats() for _ in range(args.clients)]
+    tasks = []
+    for i, stats in enumerate(all_stats):
+        pcm, rate = fixtures[i % len(fixtures)]
+        tasks.append(run_client(i, url, pcm, rate, args, stats))
+    started = time.monotonic()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    wall_s = time.monotonic() - started
+    for stats, result in zip(all_stats, results):
+        if isinstance(result, BaseException):
+            stats.errors.append(f"{type(result).__name__}: {result}")
+    return all_stats, wall_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='Çalışan sunucunun /ws adresi')
+    parser.add_argument('--serve', help="Sunucuyu başlat: 'stub' veya model adı (tiny, small, ...)")
+    parser.add_argument('--server', choices=('asgi', 'flask'), default='asgi')
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30.0, help='client başına ses (saniye)')
+    parser.add_argument('--wav', action='append', default=[], help='PCM16 WAV fixture (tekrarlanabilir)')
+    parser.add_argument('--word-timing', choices=('auto', 'off', 'segment', 'full'), default=None,
+                        help='config.word_timing (full: kelime hizalaması maliyeti)')
+    parser.add_argument('--word-format', choices=('objects', 'arrays'), default=None)
+    parser.add_argument('--burst-seconds', default='1,3', help='sentetik konuşma uzunluğu aralığı (min,max)')
+    parser.add_argument('--language', default='en')
+    parser.add_argument('--model', default=None, help='config.model (varsayılan: sunucunun modeli)')
+    parser.add_argument('--no-streaming', dest='streaming', action='store_false')
+    parser.add_argument('--no-stream-segments', dest='stream_segments', action='store_false',
+                        help='config.stream_segments: false (final metin tek parça)')
+    parser.add_argument('--ramp', type=float, default=2.0, help='client başlangıçlarının yayıldığı süre')
+    parser.add_argument('--tail-silence', type=float, default=1.5)
+    parser.add_argument('--drain-timeout', type=float, default=15.0)
+    parser.add_argument('--deadline-ms', type=float, default=2000.0)
+    parser.add_argument('--stub-base-ms', type=float, default=30.0)
+    parser.add_argument('--stub-per-second-ms', type=float, default=20.0)
+    parser.add_argument('--status-interval-ms', type=float, default=None,
+                        help='config.status_interval_ms (0: her chunk, varsayılan: sunucunun)')
+    parser.add_argument('--batch-messages', action='store_true', help='config.batch_messages')
+    parser.add_argument('--admission-slo-ms', type=float, default=None,
+                        help='--serve: ADMISSION_P95_SLO_MS (admission control)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    if not args.url and not args.serve:
+        parser.error('--url veya --serve gerekli')
+
+    lengths = tuple(float(value) for value in args.burst_seconds.split(','))
+    fixtures = [load_wav(path) for path in args.wav] or [synthetic_fixture(min(args.duration, 60), lengths=lengths)]
+
+    process = None
+    url = args.url
+    if args.serve:
+        process, url = start_server(args)
+    try:
+        before = scrape_metrics(url)
+        all_stats, wall_s = asyncio.run(run_clients(url, fixtures, args))
+        after = scrape_metrics(url)
+        # Test süresince sunucu tarafı farkları (sunucu /metrics sunmuyorsa None)
+        server = None
+        if before and after and 'process_cpu_seconds_total' in before:
+            server = {name: after[name] - before[name] for name in before if name in after}
+        summary = report(all_stats, wall_s, args, server)
+    finally:
+        if process is not None:
+            # SIGINT: sunucu normal kapanır (process pool shared memory'si temizlenir)
+            process.send_signal(signal.SIGINT)
+            process.wait()
+
+    # Hiç final yoksa gecikme/missing sayıları anlamsızdır: sessizce geçme
+    if not summary['finals']:
+        if summary['vad_enabled'] and not summary['speech_detected']:
+            reason = "VAD fixture'da konuşma algılamadı (speech_ended yok); gerçek konuşma içeren bir --wav verin"
+        else:
+            reason = 'sunucu hiç final transcript göndermedi'
+        print(f"\n!!! HATA: 0 final - {reason}. Sonuçlar geçersiz.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
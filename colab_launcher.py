@@ -724,26 +724,34 @@ def start_flask_server(port=5000):
         stderr=subprocess.DEVNULL
     )
 
-    # Sunucunun gerçekten hazır olmasını bekle - HTTP request ile
-    print("🔍 Flask hazır olması bekleniyor...")
-    max_attempts = 60  # 60 saniye = yeterli süre
+    # Sunucunun gerçekten hazır olmasını bekle - /ready modeller yüklenip
+    # ısıtılana kadar 503 döner (/health yalnızca process'in ayakta olduğunu gösterir)
+    print("🔍 Flask ve modellerin hazır olması bekleniyor...")
+    max_attempts = 300  # Model indirme + warm-up için 5 dakika
 
+    endpoint = 'ready'
     for attempt in range(max_attempts):
         try:
             import urllib.request
             # HTTP GET request gönder
-            response = urllib.request.urlopen(f'http://localhost:{port}/health', timeout=2)
+            response = urllib.request.urlopen(f'http://localhost:{port}/{endpoint}', timeout=2)
 
             if response.status == 200:
                 print(f"✅ Flask sunucusu hazır! (attempt {attempt + 1})")
-                # Ekstra güvenlik için 2 saniye daha bekle
-                time.sleep(2)
                 return flask_process
 
         except Exception as e:
             # Henüz hazır değil, bekle
             if attempt % 10 == 0 and attempt > 0:
                 print(f"   Bekleniyor... ({attempt}/{max_attempts})")
+            if getattr(e, 'code', None) == 404:
+                # /ready olmayan eski app.py
+                endpoint = 'health'
+            if getattr(e, 'code', None) == 503:
+                status = json.loads(e.read() or b'{}')
+                if status.get('phase') == 'failed':
+                    print(f"❌ Model yüklenemedi: {status.get('error')}")
+                    return flask_process
             time.sleep(1)
 
     print("⚠️  Flask başladı ama health check başarısız (timeout)")
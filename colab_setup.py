@@ -110,6 +110,9 @@ def start_flask_app(host='0.0.0.0', port=5000):
         spec.loader.exec_module(app_module)
         app = app_module.app
 
+        # Modelleri arka planda yükle ve ısıt (/ready hazır olunca 200 döner)
+        app_module.start_warmup()
+
         print("\n" + "="*60)
         print("🚀 Flask sunucusu başlatılıyor...")
         print(f"   Host: {host}")
@@ -0,0 +1,321 @@
+"""
+Paylaşılan inference scheduler
+
+Tüm WebSocket session'ları bitmiş utterance'larını tek bir kuyruğa gönderir.
+Worker thread'leri kuyruğu boşaltır; aynı dil/ayarlarla gelen utterance'lar
+batching destekleyen motorlarda (faster-whisper BatchedInferencePipeline)
+tek encoder/decoder geçişinde işlenir ve sonuçlar Future'lar üzerinden doğru
+session'a döner.
+
+Batch anahtarı BATCH_IGNORED_OPTIONS dışındaki seçeneklerdir; prompt
+carry-over'ı (initial_prompt) da anahtara girer. Bir geçiş tek seçenek
+kümesiyle decode edildiğinden yalnızca prompt'u ve seçenekleri aynı olan
+utterance'lar birlikte batch'lenir; farklı prompt'lu session'ların
+utterance'ları kendi prompt'larıyla ayrı geçişlerde decode edilir.
+
+İşler öncelik sınıflarına ayrılır (öncelik sırasıyla):
+
+  live     canlı session'ın biten utterance'ı (final transcript)
+  partial  streaming modunda büyüyen utterance'ın yeniden decode'u
+  batch    offline dosya işlerinin (/jobs) utterance'ları
+
+Boşalan worker her zaman en yüksek öncelikli bekleyen sınıftan iş alır;
+çalışan bir decode kesilmez, öncelik utterance sınırlarında uygulanır.
+Sınıf başına eşzamanlı decode sınırı (class_limits) verilebilir: ör. batch
+en fazla 1 worker kullanır, diğerleri canlı session'lara boş kalır. Birden
+çok worker varsa batch varsayılan olarak en fazla num_workers - 1 worker
+kullanır. Batch sınıfının bir geçişi en fazla batch_pass_seconds ses toplar
+(tek motor çağrısı kesilemez): tek worker'da canlı iş en fazla bu kadar
+sesin decode'unu bekler.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from asr_engine import SAMPLE_RATE, BATCH_IGNORED_OPTIONS, as_engine
+
+PRIORITY_LIVE = 'live'
+PRIORITY_PARTIAL = 'partial'
+PRIORITY_BATCH = 'batch'
+# Öncelik sırasıyla
+PRIORITY_CLASSES = (PRIORITY_LIVE, PRIORITY_PARTIAL, PRIORITY_BATCH)
+PRIORITY_RANK = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+
+
+def class_limits_for(limits, num_workers):
+    """Per-class concurrency limits (0 / missing: all workers, batch: all but one)"""
+    limits = limits or {}
+    # Birden çok worker varsa biri her zaman canlı işlere ayrılır
+    defaults = {PRIORITY_BATCH: max(1, num_workers - 1)}
+    return {
+        name: min(int(limits.get(name) or defaults.get(name, num_workers)), num_workers)
+        for name in PRIORITY_CLASSES
+    }
+
+
+class TranscriptionResult:
+    """Segments and timing of one transcribed utterance"""
+
+    def __init__(self, segments, language, queue_ms, decode_ms, batch_size=1):
+        self.segments = segments
+        self.language = language
+        self.queue_ms = queue_ms
+        self.decode_ms = decode_ms
+        self.batch_size = batch_size
+
+    @property
+    def text(self):
+        return ''.join(segment['text'] for segment in self.segments)
+
+    @property
+    def words(self):
+        words = []
+        for segment in self.segments:
+            if segment['words']:
+                words.extend(segment['words'])
+        return words
+
+
+class TranscriptionJob:
+    """One utterance waiting in the scheduler queue"""
+
+    def __init__(self, audio, options, on_segment=None, priority=PRIORITY_LIVE):
+        self.audio = audio
+        self.options = options
+        self.on_segment = on_segment
+        self.priority = priority
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+
+    @property
+    def duration(self):
+        return len(self.audio) / SAMPLE_RATE
+
+    def batch_key(self):
+        """Jobs with equal keys can share one batched pass (None: run alone)"""
+        if self.on_segment is not None:
+            # Batched geçiş segment'leri utterance sonunda toplu verir
+            return None
+        if not self.options.get('language'):
+            # Batched pipeline dili tüm batch için bir kez tespit eder
+            return None
+        return tuple(sorted(
+            (k, repr(v)) for k, v in self.options.items()
+            if k not in BATCH_IGNORED_OPTIONS
+        ))
+
+
+class InferenceScheduler:
+    """
+    Queue + worker pool in front of a single ASR engine.
+
+    engine bir ASREngine veya WhisperModel benzeri bir modeldir (ikincisi
+    FasterWhisperEngine ile sarılır). num_workers thread'i motora paralel
+    çağrı yapar (modelin de num_workers ile oluşturulmuş olması gerekir).
+    Her worker en yüksek öncelikli (ve sınırı dolmamış) sınıftan bir iş
+    aldıktan sonra batch_wait_ms kadar bekleyip aynı sınıftan
+    max_batch_size'a kadar iş toplar. class_limits: sınıf -> en fazla kaç
+    worker'ın aynı anda o sınıfı decode edebileceği (0: sınırsız, batch için
+    num_workers - 1). batch_pass_seconds: batch sınıfının bir geçişinde
+    toplanan en fazla ses (ilk iş her zaman alınır).
+    """
+
+    def __init__(self, engine, num_workers=1, max_batch_size=8, batch_wait_ms=20, class_limits=None,
+                 batch_pass_seconds=30.0):
+        self.engine = as_engine(engine)
+        self.model = getattr(self.engine, 'model', self.engine)
+        self.supports_streaming = self.engine.supports_streaming
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.batch_pass_seconds = float(batch_pass_seconds)
+        self.num_workers = max(1, int(num_workers))
+        self.class_limits = class_limits_for(class_limits, self.num_workers)
+        self._queues = {name: deque() for name in PRIORITY_CLASSES}
+        self._running = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._batching = self.max_batch_size > 1 and self.engine.supports_batching
+
+        if self.max_batch_size > 1 and not self.engine.supports_batching:
+            print(f"⚠️  {self.engine.name} engine batching desteklemiyor, batch'siz devam edilecek")
+
+        self._workers = []
+        for i in range(self.num_workers):
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"asr-worker-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, audio, affinity=None, on_segment=None, priority=PRIORITY_LIVE, **options):
+        """Queue an utterance (float32, 16 kHz); returns a Future[TranscriptionResult]
+
+        affinity yalnızca ProcessPoolScheduler'da routing için kullanılır.
+        on_segment(segment, language) verilirse her segment decode edildikçe
+        worker thread'inden çağrılır (iş batch'lenmez); Future yine tüm sonucu verir.
+        priority: PRIORITY_CLASSES'tan biri.
+        """
+        if priority not in PRIORITY_RANK:
+            raise ValueError(f"Bilinmeyen öncelik sınıfı: {priority}")
+        job = TranscriptionJob(np.asarray(audio, dtype=np.float32), options, on_segment, priority)
+        with self._cond:
+            self._queues[priority].append(job)
+            self._cond.notify_all()
+        return job.future
+
+    def qsize(self):
+        with self._cond:
+            return sum(len(jobs) for jobs in self._queues.values())
+
+    def queue_depths(self):
+        """Per-class queued jobs and running decodes (GET /health)"""
+        with self._cond:
+            return {
+                name: {
+                    'queued': len(self._queues[name]),
+                    'running': self._running[name],
+                    'limit': self.class_limits[name]
+                }
+                for name in PRIORITY_CLASSES
+            }
+
+    def close(self):
+        """Stop the worker threads once the queue is drained"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _next_class(self):
+        """Highest-priority class with queued jobs and a free slot (under lock)"""
+        for name in PRIORITY_CLASSES:
+            if self._queues[name] and self._running[name] < self.class_limits[name]:
+                return name
+        return None
+
+    def _collect_batch(self):
+        """(class, jobs) of the next pass; (None, None) once closed and drained"""
+        with self._cond:
+            while True:
+                name = self._next_class()
+                if name is not None:
+                    break
+                if self._closed and not any(self._queues.values()):
+                    return None, None
+                self._cond.wait()
+
+            self._running[name] += 1
+            waiting = self._queues[name]
+            batch = [waiting.popleft()]
+            # Batch sınıfı: geçiş kesilemez, toplanan ses sınırlanır
+            budget = self.batch_pass_seconds - batch[0].duration if name == PRIORITY_BATCH else None
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch_size:
+                if waiting:
+                    if budget is not None:
+                        if waiting[0].duration > budget:
+                            break
+                        budget -= waiting[0].duration
+                    batch.append(waiting.popleft())
+                    continue
+                # Daha öncelikli bir iş geldiyse batch için beklenmez
+                if PRIORITY_RANK[self._next_class() or name] < PRIORITY_RANK[name]:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return name, batch
+
+    def _finish_pass(self, name):
+        with self._cond:
+            self._running[name] -= 1
+            self._cond.notify_all()
+
+    def _worker_loop(self):
+        while True:
+            name, batch = self._collect_batch()
+            if batch is None:
+                return
+            try:
+                self._run_pass(name, batch)
+            finally:
+                self._finish_pass(name)
+
+    def _run_pass(self, name, batch):
+        groups = {}
+        for job in batch:
+            key = job.batch_key() if self._batching else None
+            if key is None:
+                groups[id(job)] = [job]
+            else:
+                groups.setdefault(key, []).append(job)
+        groups = list(groups.values())
+
+        for index, group in enumerate(groups):
+            if index and self._preempted(name):
+                # Utterance sınırı: kalan gruplar sınıf kuyruğunun başına döner
+                self._requeue(name, [job for rest in groups[index:] for job in rest])
+                return
+            group = [job for job in group if job.future.set_running_or_notify_cancel()]
+            if not group:
+                continue
+            try:
+                if len(group) == 1:
+                    self._transcribe_one(group[0])
+                else:
+                    self._transcribe_batch(group)
+            except Exception as e:
+                for job in group:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+    def _preempted(self, name):
+        """A higher-priority job waits and no other worker is free to take it"""
+        with self._cond:
+            if sum(self._running.values()) < self.num_workers:
+                return False
+            nearest = self._next_class()
+            return nearest is not None and PRIORITY_RANK[nearest] < PRIORITY_RANK[name]
+
+    def _requeue(self, name, jobs):
+        with self._cond:
+            self._queues[name].extendleft(reversed(jobs))
+            self._cond.notify_all()
+
+    def _transcribe_one(self, job):
+        started = time.monotonic()
+        if job.on_segment is None:
+            segments, language = self.engine.transcribe(job.audio, **job.options)
+        else:
+            stream, language = self.engine.transcribe_stream(job.audio, **job.options)
+            segments = []
+            for segment in stream:
+                segments.append(segment)
+                job.on_segment(segment, language or job.options.get('language'))
+        finished = time.monotonic()
+
+        job.future.set_result(TranscriptionResult(
+            segments,
+            language or job.options.get('language'),
+            queue_ms=(started - job.submitted_at) * 1000,
+            decode_ms=(finished - started) * 1000
+        ))
+
+    def _transcribe_batch(self, jobs):
+        """Decode utterances with equal options in one engine call"""
+        started = time.monotonic()
+        results = self.engine.transcribe_batch([job.audio for job in jobs], **jobs[0].options)
+        finished = time.monotonic()
+
+        for job, (segments, language) in zip(jobs, results):
+            job.future.set_result(TranscriptionResult(
+                segments,
+                language,
+                queue_ms=(started - job.submitted_at) * 1000,
+                decode_ms=(finished - started) * 1000,
+                batch_size=len(jobs)
+            ))
@@ -0,0 +1,180 @@
+"""
+Prometheus metrikleri
+
+Bağımlılıksız küçük bir Counter / Gauge / Histogram uygulaması ve text
+exposition formatı (GET /metrics). Metrikler modül seviyesinde tanımlıdır;
+session ve runtime kodu doğrudan observe()/inc() çağırır.
+"""
+
+import threading
+from bisect import bisect_left
+
+# Saniye cinsinden gecikme histogramları için varsayılan bucket'lar
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.function = function  # Scrape anında değeri hesaplar (etiketsiz)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self):
+        if self.function is not None:
+            try:
+                value = self.function()
+                with self._lock:
+                    self._values[()] = value
+            except Exception:
+                pass
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """Incremented by inc(), or read at scrape time from function() (no labels)"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels, function)
+        if not self.labels and function is None:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time by function() (no labels)"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Bucket başına (kümülatif olmayan) sayaç, toplam, adet
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def render():
+    """Text exposition (version 0.0.4) of all metrics"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# --- Pipeline metrikleri ---------------------------------------------------
+
+DECODE_SECONDS = Histogram(
+    'whisper_decode_seconds', 'ASR decode time per utterance (batch time for batched decodes)',
+    labels=('model', 'kind')
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'whisper_queue_wait_seconds', 'Time an utterance waited in the session and scheduler queues',
+    labels=('model',)
+)
+SPEECH_END_TO_COMMIT_SECONDS = Histogram(
+    'whisper_speech_end_to_commit_seconds',
+    'Time from the end of speech (audio time) to the final committed_transcript',
+    labels=('model',)
+)
+REAL_TIME_FACTOR = Histogram(
+    'whisper_real_time_factor', 'Decode time divided by audio duration (per utterance share of a batch)',
+    labels=('model',), buckets=(0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+)
+VAD_SECONDS = Histogram(
+    'whisper_vad_seconds', 'VAD evaluation time per received audio chunk',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+RECEIVED_BYTES = Counter(
+    'whisper_received_bytes_total', 'WebSocket payload bytes received', labels=('type',)
+)
+SENT_BYTES = Counter(
+    'whisper_sent_bytes_total', 'WebSocket payload bytes sent'
+)
+SENT_FRAMES = Counter(
+    'whisper_sent_frames_total', 'WebSocket frames sent (a batch frame carries several messages)'
+)
+SENT_MESSAGES = Counter(
+    'whisper_sent_messages_total', 'Messages sent to clients', labels=('type',)
+)
+DROPPED_UTTERANCES = Counter(
+    'whisper_dropped_utterances_total', 'Utterances dropped because a session queue was full'
+)
+LONG_SPEECH_CUTS = Counter(
+    'whisper_long_speech_cuts_total', 'VAD utterances cut mid-speech before the session buffer overflowed'
+)
+DROPPED_AUDIO_SECONDS = Counter(
+    'whisper_dropped_audio_seconds_total', 'Audio dropped because a session buffer overflowed'
+)
@@ -0,0 +1,191 @@
+"""
+Whisper model registry
+
+Modeller (size, device, compute_type) anahtarıyla isteğe bağlı yüklenir,
+session'lar arasında paylaşılır ve bellek bütçesi aşıldığında en uzun
+süredir kullanılmayan (LRU), hiçbir session'ın kullanmadığı modeller
+boşaltılır.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Yaklaşık model boyutları (MB) - ölçüm yapılamazsa kullanılır
+MODEL_SIZES_MB = {
+    'tiny': 75,
+    'base': 150,
+    'small': 500,
+    'medium': 1500,
+    'large-v3': 3000,
+}
+
+
+def current_rss_mb(pid='self'):
+    """Resident set size of a process (default: this one) in MB (None if unavailable)"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RegistryEntry:
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+        self.pins = 0
+        self.memory_mb = 0.0
+        self.last_used = time.monotonic()
+
+    @property
+    def value(self):
+        return self.future.result()
+
+
+class ModelRegistry:
+    """
+    LRU model cache with a memory budget.
+
+    loader(key) modeli (veya modeli saran nesneyi) oluşturur. acquire() ile
+    alınan modeller release() edilene kadar pinlenir ve boşaltılmaz.
+    Boşaltılan nesnenin close() metodu varsa çağrılır.
+    """
+
+    def __init__(self, loader, memory_budget_mb=0):
+        self.loader = loader
+        self.memory_budget_mb = memory_budget_mb
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """Return the loaded object for key, loading it if needed, and pin it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = RegistryEntry(key)
+                self._entries[key] = entry
+                self._make_room(key, self._estimate_mb(key))
+            entry.pins += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+
+        if owner:
+            self._load(entry)
+
+        try:
+            return entry.value
+        except Exception:
+            self.release(key)
+            raise
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.pins > 0:
+                entry.pins -= 1
+                entry.last_used = time.monotonic()
+
+    def get(self, key):
+        """Return the object for key without pinning it"""
+        value = self.acquire(key)
+        self.release(key)
+        return value
+
+    def is_loaded(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and entry.future.done() and entry.future.exception() is None
+
+    def loaded(self):
+        """(key, object) pairs of the loaded models"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [
+            (entry.key, entry.future.result()) for entry in entries
+            if entry.future.done() and entry.future.exception() is None
+        ]
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'memory_budget_mb': self.memory_budget_mb,
+            'memory_used_mb': round(sum(self._entry_mb(e) for e in entries)),
+            'models': [
+                {
+                    'model': entry.key[0],
+                    'device': entry.key[1],
+                    'compute_type': entry.key[2],
+                    'memory_mb': round(entry.memory_mb),
+                    'sessions': entry.pins,
+                    'loaded': entry.future.done()
+                }
+                for entry in entries
+            ]
+        }
+
+    def _estimate_mb(self, key):
+        return MODEL_SIZES_MB.get(key[0], 0)
+
+    def _entry_mb(self, entry):
+        # Yüklenmekte olan modeller için tahmin
+        return entry.memory_mb if entry.future.done() else self._estimate_mb(entry.key)
+
+    def _load(self, entry):
+        rss_before = current_rss_mb()
+        try:
+            value = self.loader(entry.key)
+        except Exception as e:
+            with self._lock:
+                self._entries.pop(entry.key, None)
+            entry.future.set_exception(e)
+            return
+
+        # CPU'da RSS farkı ölçülür; GPU modelleri ve eşzamanlı yüklemelerden
+        # bozulmuş ölçümler için tahmin kullanılır. Modeli başka süreçlerde
+        # tutan nesneler (process pool) kendi ölçümünü memory_mb ile bildirir.
+        rss_after = current_rss_mb()
+        estimate = self._estimate_mb(entry.key)
+        measured = 0
+        if rss_before is not None and rss_after is not None and entry.key[1] == 'cpu':
+            measured = rss_after - rss_before
+        reported = getattr(value, 'memory_mb', None)
+        if reported:
+            entry.memory_mb = reported
+        else:
+            entry.memory_mb = measured if measured >= estimate * 0.25 else estimate
+        entry.future.set_result(value)
+        print(f"📦 Model registry: {entry.key[0]} yüklendi (~{round(entry.memory_mb)}MB)")
+
+    def _make_room(self, key, needed_mb):
+        """Evict LRU unpinned entries until needed_mb fits (called under lock)"""
+        if not self.memory_budget_mb:
+            return
+
+        used = sum(self._entry_mb(e) for k, e in self._entries.items() if k != key)
+        for other_key, entry in list(self._entries.items()):
+            if used + needed_mb <= self.memory_budget_mb:
+                break
+            if other_key == key or entry.pins > 0 or not entry.future.done():
+                continue
+            del self._entries[other_key]
+            used -= self._entry_mb(entry)
+            print(f"🗑️  Model registry: {other_key[0]} boşaltıldı (LRU)")
+            try:
+                close = getattr(entry.value, 'close', None)
+                if close is not None:
+                    close()
+            except Exception:
+                pass
+
+        if used + needed_mb > self.memory_budget_mb:
+            del self._entries[key]
+            raise MemoryError(
+                f"Model bellek bütçesi aşıldı ({round(used + needed_mb)}MB > "
+                f"{self.memory_budget_mb}MB); kullanımda olan modeller boşaltılamıyor"
+            )
@@ -0,0 +1,71 @@
+"""
+Session başına giden mesaj planlayıcısı
+
+Receiver thread'inin ürettiği mesajlar (VAD olayları, vad_status, buffer
+durumu) bir chunk işlenene kadar burada toplanır ve flush() ile gönderilir:
+
+  - Durum mesajları (status) tür başına birleştirilir: aynısı tekrar
+    gönderilmez, durum (state) değişince hemen, aksi halde en fazla
+    `interval` saniyede bir gönderilir; bekletilen son durum sonraki
+    flush'ta aralık dolmuşsa gider.
+  - Olaylar (post) sırayla ve kayıpsız gönderilir.
+  - `batch` açıksa bir flush'taki tüm mesajlar tek frame'de gider:
+    {"type": "batch", "messages": [...]}
+
+interval 0: eski davranış, her durum mesajı olduğu gibi gönderilir.
+Yalnızca tek thread'den (session receiver'ı) kullanılmalıdır.
+"""
+
+import time
+
+
+class Outbox:
+    """Coalesces status updates and batches outbound messages of one session"""
+
+    def __init__(self, send, interval=0.5, batch=False):
+        self._send = send
+        self.interval = interval
+        self.batch = batch
+        self._queue = []
+        self._held = {}  # kind -> gönderilmeyi bekleyen son durum mesajı
+        self._last = {}  # kind -> (mesaj, state, gönderim zamanı)
+
+    def post(self, message):
+        """Queue an event message (always delivered, in order)"""
+        self._queue.append(message)
+
+    def status(self, kind, message, state=None):
+        """Offer the latest status of a kind; sent on state change or at most every interval"""
+        if self.interval <= 0:
+            self._queue.append(message)
+            return
+        last = self._last.get(kind)
+        if last is not None and last[0] == message:
+            self._held.pop(kind, None)
+            return
+        now = time.monotonic()
+        if last is None or state != last[1] or now - last[2] >= self.interval:
+            self._queue.append(message)
+            self._last[kind] = (message, state, now)
+            self._held.pop(kind, None)
+        else:
+            self._held[kind] = message
+
+    def flush(self):
+        """Send queued messages (and held statuses whose interval has passed)"""
+        if self._held:
+            now = time.monotonic()
+            for kind, message in list(self._held.items()):
+                _, state, sent_at = self._last[kind]
+                if now - sent_at >= self.interval:
+                    self._queue.append(message)
+                    self._last[kind] = (message, state, now)
+                    del self._held[kind]
+        if not self._queue:
+            return
+        messages, self._queue = self._queue, []
+        if self.batch and len(messages) > 1:
+            self._send({'type': 'batch', 'message_type': 'batch', 'messages': messages})
+        else:
+            for message in messages:
+                self._send(message)
@@ -0,0 +1,441 @@
+"""
+Çok süreçli ASR worker havuzu (CPU)
+
+CPU'da tek süreç, Python tarafındaki GIL yüzünden tüm çekirdekleri
+dolduramaz. ProcessPoolScheduler N worker süreci başlatır; her biri kendi
+WhisperModel'ini (cpu_threads / num_workers ayarlı) yükler. Ses pickle
+edilmez: her worker'ın shared memory'de sabit boyutlu slot'ları vardır, ana
+süreç utterance'ı boş bir slot'a yazar ve pipe üzerinden yalnızca
+(iş id, slot, uzunluk, seçenekler) gönderir. InferenceScheduler ile aynı
+submit() -> Future[TranscriptionResult] arayüzünü sunar; on_segment
+verilen işlerin segment'leri decode edildikçe ayrı mesajlarla gelir.
+
+loader(key, cpu_threads, num_workers) worker'da bir ASREngine (veya
+WhisperModel benzeri bir model) döndürür; picklable olmalıdır.
+"""
+
+import atexit
+import functools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from asr_engine import SAMPLE_RATE, as_engine, create_engine
+from inference import PRIORITY_CLASSES, PRIORITY_LIVE, PRIORITY_RANK, TranscriptionResult, class_limits_for
+from model_registry import current_rss_mb
+
+ROUTING_POLICIES = ('least_loaded', 'sticky')
+
+# Çıkışta kapatılacak havuzlar (shared memory segmentleri sızmasın)
+_pools = weakref.WeakSet()
+
+
+def _worker_main(key, loader, cpu_threads, num_workers, shm_name, slot_count, slot_samples, warmup, conn):
+    """Worker process: load the engine, then transcribe jobs read from shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((slot_count, slot_samples), dtype=np.float32, buffer=shm.buf)
+
+    try:
+        engine = as_engine(loader(key, cpu_threads, num_workers))
+        if warmup:
+            audio = (np.random.default_rng(0).standard_normal(SAMPLE_RATE * 2) * 0.01).astype(np.float32)
+            engine.transcribe(audio, language=None)
+            engine.transcribe(audio, language='en', word_timestamps=True)
+    except Exception as e:
+        conn.send(('failed', f"{type(e).__name__}: {e}"))
+        del slots
+        shm.close()
+        return
+    conn.send(('ready', {'supports_streaming': engine.supports_streaming}))
+
+    requests = queue.Queue()
+    send_lock = threading.Lock()
+
+    def run():
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            job_id, slot, length, audio, options, stream = request
+            if audio is None:
+                # Kopyasız görünüm: ana süreç slot'u sonuç gelene kadar yeniden kullanmaz
+                audio = slots[slot, :length]
+            started = time.monotonic()
+            try:
+                if stream:
+                    segments = []
+                    iterator, language = engine.transcribe_stream(audio, **options)
+                    for segment in iterator:
+                        segments.append(segment)
+                        with send_lock:
+                            conn.send(('segment', job_id, segment, language or options.get('language')))
+                else:
+                    segments, language = engine.transcribe(audio, **options)
+                reply = (
+                    'result', job_id, segments,
+                    language or options.get('language'),
+                    (time.monotonic() - started) * 1000
+                )
+            except Exception as e:
+                reply = ('error', job_id, f"{type(e).__name__}: {e}")
+            with send_lock:
+                conn.send(reply)
+
+    threads = [
+        threading.Thread(target=run, name=f"asr-worker-{i}", daemon=True)
+        for i in range(num_workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            requests.put(request)
+    except (EOFError, OSError):
+        pass
+
+    # Sıradaki işler bitirilip kapatılır
+    for _ in threads:
+        requests.put(None)
+    for thread in threads:
+        thread.join()
+    del slots
+    shm.close()
+
+
+class _PoolJob:
+    """One utterance waiting for (or running in) a worker process"""
+
+    def __init__(self, audio, options, affinity, on_segment=None, priority=PRIORITY_LIVE):
+        self.audio = audio
+        self.options = options
+        self.affinity = affinity
+        self.on_segment = on_segment
+        self.priority = priority
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.id = None
+        self.slot = None
+
+    @property
+    def duration(self):
+        return len(self.audio) / SAMPLE_RATE
+
+
+class _Worker:
+    """Parent-side handle of one worker process"""
+
+    def __init__(self, index, process, conn, shm, slot_count, slot_samples):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.shm = shm
+        self.slots = np.ndarray((slot_count, slot_samples), dtype=np.float32, buffer=shm.buf)
+        self.free_slots = list(range(slot_count))
+        self.inflight = {}
+        self.busy_seconds = 0.0  # Bekleyen/işlenen ses süresi (least_loaded için)
+        self.alive = True
+
+    def release_shm(self):
+        self.slots = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except (BufferError, FileNotFoundError):
+            pass
+
+
+class ProcessPoolScheduler:
+    """
+    submit() -> Future front for N worker processes that each own a model.
+
+    routing='least_loaded' işi en az ses bekleyen worker'a, 'sticky' aynı
+    affinity anahtarını (ör. session) hep aynı worker'a gönderir. Worker
+    başına num_workers + 1 slot vardır; tüm slot'lar doluysa iş ana süreçte
+    öncelik sırasıyla bekler. Fazladan (worker içinde sıraya giren) slot
+    yalnızca live sınıfına açıktır: partial / batch işleri yalnızca boşta
+    decode thread'i olan worker'a gider, böylece live iş en fazla bir
+    utterance bekler. class_limits: sınıf başına eşzamanlı decode sınırı
+    (toplam num_processes × num_workers). Constructor tüm worker'lar modeli
+    yükleyene kadar bekler.
+    """
+
+    # Model worker süreçlerinde yaşar
+    model = None
+    supports_streaming = True
+
+    def __init__(self, key, num_processes=2, cpu_threads=0, num_workers=1,
+                 routing='least_loaded', max_audio_seconds=30.0,
+                 loader=functools.partial(create_engine, 'faster_whisper'), warmup=False,
+                 class_limits=None):
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"Bilinmeyen routing: {routing} ({', '.join(ROUTING_POLICIES)})")
+        num_processes = max(1, int(num_processes))
+        self.key = key
+        self.routing = routing
+        self.num_workers = max(1, int(num_workers))
+        self.class_limits = class_limits_for(class_limits, num_processes * self.num_workers)
+        # Çekirdekler süreçler arasında paylaştırılır
+        self.cpu_threads = int(cpu_threads) or max(1, (os.cpu_count() or 1) // num_processes)
+        self.slot_samples = int(max_audio_seconds * SAMPLE_RATE)
+        self.memory_mb = None
+
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._next_id = 0
+        self._closed = False
+        self._workers = []
+
+        # fork, thread'li/yüklü modelli bir süreçte güvenli değil
+        context = multiprocessing.get_context('spawn')
+        slot_count = self.num_workers + 1
+        try:
+            for index in range(num_processes):
+                shm = shared_memory.SharedMemory(create=True, size=slot_count * self.slot_samples * 4)
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(
+                    target=_worker_main,
+                    args=(key, loader, self.cpu_threads, self.num_workers, shm.name,
+                          slot_count, self.slot_samples, warmup, child_conn),
+                    name=f"asr-process-{index}",
+                    daemon=True
+                )
+                process.start()
+                child_conn.close()
+                self._workers.append(_Worker(index, process, parent_conn, shm, slot_count, self.slot_samples))
+
+            for worker in self._workers:
+                try:
+                    status, detail = worker.conn.recv()
+                except EOFError:
+                    status, detail = 'failed', f"süreç çıktı (exit code {worker.process.exitcode})"
+                if status != 'ready':
+                    raise RuntimeError(f"ASR worker {worker.index} başlatılamadı: {detail}")
+                self.supports_streaming = detail['supports_streaming']
+        except BaseException:
+            for worker in self._workers:
+                worker.process.terminate()
+                worker.process.join()
+                worker.release_shm()
+            raise
+
+        # Modeller worker'larda olduğundan registry bu süreçlerin RSS'ini kullanır
+        rss = [current_rss_mb(worker.process.pid) for worker in self._workers]
+        if all(value is not None for value in rss):
+            self.memory_mb = sum(rss)
+
+        self._receiver = threading.Thread(target=self._receive_loop, name="asr-pool-receiver", daemon=True)
+        self._receiver.start()
+        _pools.add(self)
+
+    def submit(self, audio, affinity=None, on_segment=None, priority=PRIORITY_LIVE, **options):
+        """Queue an utterance (float32, 16 kHz); returns a Future[TranscriptionResult]"""
+        if priority not in PRIORITY_RANK:
+            raise ValueError(f"Bilinmeyen öncelik sınıfı: {priority}")
+        job = _PoolJob(np.asarray(audio, dtype=np.float32).reshape(-1), options, affinity, on_segment, priority)
+        with self._lock:
+            if self._closed or not any(worker.alive for worker in self._workers):
+                raise RuntimeError("ASR process pool kapalı")
+            # Öncelik sırası korunur (aynı öncelikte FIFO)
+            index = len(self._pending)
+            while index and PRIORITY_RANK[self._pending[index - 1].priority] > PRIORITY_RANK[priority]:
+                index -= 1
+            self._pending.insert(index, job)
+            failed = self._dispatch()
+        self._fail(failed, "ASR worker süreci yanıt vermiyor")
+        return job.future
+
+    def qsize(self):
+        """Jobs not yet being decoded (parent queue + queued in workers)"""
+        with self._lock:
+            queued = sum(max(0, len(w.inflight) - self.num_workers) for w in self._workers)
+            return len(self._pending) + queued
+
+    def queue_depths(self):
+        """Per-class jobs waiting in the parent and sent to workers (GET /health)"""
+        with self._lock:
+            running = self._running_counts()
+            return {
+                name: {
+                    'queued': sum(1 for job in self._pending if job.priority == name),
+                    'running': running[name],
+                    'limit': self.class_limits[name]
+                }
+                for name in PRIORITY_CLASSES
+            }
+
+    def close(self):
+        """Stop the worker processes once their queued jobs finish (non-blocking)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending = list(self._pending)
+            self._pending.clear()
+            for worker in self._workers:
+                if worker.alive:
+                    try:
+                        worker.conn.send(None)
+                    except (OSError, ValueError):
+                        pass
+        self._fail(pending, "ASR process pool kapatıldı")
+
+    def join(self, timeout=None):
+        """Wait until the worker processes exited and shared memory is released"""
+        self._receiver.join(timeout)
+
+    def _accepts(self, worker, job):
+        if job.priority == PRIORITY_LIVE:
+            return bool(worker.free_slots)
+        # Düşük öncelikli iş worker içinde sıraya girmez
+        return len(worker.inflight) < self.num_workers
+
+    def _route(self, job):
+        """Pick a worker with a free slot for job (None: keep waiting)"""
+        alive = [worker for worker in self._workers if worker.alive]
+        if self.routing == 'sticky' and job.affinity is not None:
+            worker = alive[hash(job.affinity) % len(alive)]
+            return worker if self._accepts(worker, job) else None
+        free = [worker for worker in alive if self._accepts(worker, job)]
+        return min(free, key=lambda worker: worker.busy_seconds) if free else None
+
+    def _running_counts(self):
+        running = dict.fromkeys(PRIORITY_CLASSES, 0)
+        for worker in self._workers:
+            for job in worker.inflight.values():
+                running[job.priority] += 1
+        return running
+
+    def _dispatch(self):
+        """Send pending jobs to workers with free slots (called under lock)"""
+        failed = []
+        waiting = deque()
+        running = self._running_counts()
+        while self._pending:
+            if not any(worker.alive for worker in self._workers):
+                failed.extend(self._pending)
+                self._pending.clear()
+                break
+            job = self._pending.popleft()
+            if running[job.priority] >= self.class_limits[job.priority]:
+                waiting.append(job)
+                continue
+            worker = self._route(job)
+            if worker is None:
+                waiting.append(job)
+                if self.routing != 'sticky' and not any(w.alive and w.free_slots for w in self._workers):
+                    # Hiçbir worker'da boş slot yok
+                    break
+                continue
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            running[job.priority] += 1
+
+            job.id = self._next_id
+            self._next_id += 1
+            job.slot = worker.free_slots.pop()
+            audio = None
+            if len(job.audio) <= self.slot_samples:
+                worker.slots[job.slot, :len(job.audio)] = job.audio
+            else:
+                # Slot'tan uzun ses (ör. uzun dosyalar) pipe üzerinden kopyalanır
+                audio = job.audio
+            worker.inflight[job.id] = job
+            worker.busy_seconds += job.duration
+            try:
+                worker.conn.send((job.id, job.slot, len(job.audio), audio, job.options, job.on_segment is not None))
+            except (OSError, ValueError):
+                # Süreç ölmüş; kalan işleri receiver başarısız sayar
+                worker.alive = False
+                failed.append(job)
+        waiting.extend(self._pending)
+        self._pending = waiting
+        return failed
+
+    def _fail(self, jobs, message):
+        for job in jobs:
+            if job.future.done():
+                continue
+            if not job.future.running() and not job.future.set_running_or_notify_cancel():
+                continue
+            job.future.set_exception(RuntimeError(message))
+
+    def _receive_loop(self):
+        workers = {worker.conn: worker for worker in self._workers}
+        while workers:
+            for conn in wait(list(workers)):
+                worker = workers[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    del workers[conn]
+                    self._worker_exited(worker)
+                    continue
+                self._on_message(worker, message)
+
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        self._fail(pending, "ASR process pool kapatıldı")
+
+    def _on_message(self, worker, message):
+        kind, job_id = message[0], message[1]
+        if kind == 'segment':
+            job = worker.inflight.get(job_id)
+            if job is not None:
+                job.on_segment(message[2], message[3])
+            return
+        with self._lock:
+            job = worker.inflight.pop(job_id, None)
+            if job is None:
+                return
+            worker.free_slots.append(job.slot)
+            worker.busy_seconds = max(0.0, worker.busy_seconds - job.duration)
+            failed = self._dispatch()
+        self._fail(failed, "ASR worker süreci yanıt vermiyor")
+
+        if kind == 'result':
+            _, _, segments, language, decode_ms = message
+            total_ms = (time.monotonic() - job.submitted_at) * 1000
+            job.future.set_result(TranscriptionResult(
+                segments,
+                language,
+                queue_ms=max(0.0, total_ms - decode_ms),
+                decode_ms=decode_ms
+            ))
+        else:
+            job.future.set_exception(RuntimeError(message[2]))
+
+    def _worker_exited(self, worker):
+        with self._lock:
+            worker.alive = False
+            inflight = list(worker.inflight.values())
+            worker.inflight.clear()
+            closed = self._closed
+            failed = self._dispatch()
+        worker.process.join()
+        if not closed:
+            print(f"❌ ASR worker {worker.index} beklenmedik şekilde çıktı (exit code {worker.process.exitcode})")
+        self._fail(inflight + failed, f"ASR worker {worker.index} çıktı")
+        worker.conn.close()
+        worker.release_shm()
+
+
+@atexit.register
+def _close_pools():
+    for pool in list(_pools):
+        pool.close()
+    for pool in list(_pools):
+        pool.join(timeout=5)
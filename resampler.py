@@ -0,0 +1,84 @@
+"""
+Streaming polyphase resampler
+
+Client'ın gönderdiği ses (8/22.05/44.1/48 kHz ...) session başına 16 kHz'e
+çevrilir. Oran L/M (gcd ile sadeleştirilmiş) olarak uygulanır: prototip
+alçak geçiren FIR filtresi L faza bölünür ve her çıkış örneği tek bir fazın
+K katsayısıyla hesaplanır. Son K-1 giriş örneği chunk'lar arasında
+saklandığından çıktı, sesin tek seferde işlenmesiyle aynıdır.
+"""
+
+from math import gcd
+
+import numpy as np
+
+
+def design_polyphase_filter(up, down, taps_per_phase=32, rolloff=0.9, beta=8.0):
+    """Kaiser-windowed sinc low-pass, reshaped to (up, taps_per_phase)"""
+    length = up * taps_per_phase
+    # Kesim frekansı upsample edilmiş örnekleme hızına göre (cycles/sample)
+    cutoff = rolloff * 0.5 / max(up, down)
+    n = np.arange(length) - (length - 1) / 2.0
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+    h *= up / h.sum()
+
+    # phases[p, k] = h[p + k * up]: faz p'nin k. katsayısı
+    return np.ascontiguousarray(h.reshape(taps_per_phase, up).T, dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    Stateful rational resampler (in_rate -> out_rate) for chunked audio.
+
+    process() istenen boyutta chunk alır ve o ana kadar hesaplanabilen tüm
+    çıkış örneklerini döndürür; filtre gecikmesi ~taps / 2 giriş örneğidir.
+    """
+
+    def __init__(self, in_rate, out_rate=16000, zero_crossings=16):
+        in_rate, out_rate = int(in_rate), int(out_rate)
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError("sample rates must be positive")
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        # Downsampling'de kesim frekansı düştükçe sinc genişler: aynı geçiş
+        # bandı için faz başına katsayı oranla artar
+        taps_per_phase = 2 * zero_crossings * -(-self.down // self.up)
+        self.taps = taps_per_phase
+        self.phases = design_polyphase_filter(self.up, self.down, taps_per_phase)
+        self._offsets = np.arange(taps_per_phase)
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._inputs = 0  # Şimdiye kadar alınan giriş örnekleri
+        self._outputs = 0  # Şimdiye kadar üretilen çıkış örnekleri
+
+    def process(self, chunk):
+        """Resample one chunk (float32); returns the new output samples"""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if chunk.shape[0] == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        buffer = np.concatenate((self._history, chunk))
+        first_input = self._inputs - self._history.shape[0]
+        self._inputs += chunk.shape[0]
+
+        # Çıkış n, upsample edilmiş eksende n * down konumundadır; en yeni
+        # giriş örneğine kadar olan tüm çıkışlar hesaplanabilir
+        end = -(-self._inputs * self.up // self.down)
+        n = np.arange(self._outputs, end, dtype=np.int64)
+        self._outputs = end
+        self._history = buffer[-(self.taps - 1):] if self.taps > 1 else buffer[:0]
+
+        if n.shape[0] == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        position = n * self.down
+        base = position // self.up - first_input
+        phase = position % self.up
+        # Geçmiş sıfırla başladığı için indeksler hiçbir zaman negatif olmaz
+        window = buffer[base[:, None] - self._offsets[None, :]]
+        return np.einsum('ij,ij->i', window, self.phases[phase]).astype(np.float32, copy=False)
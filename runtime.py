@@ -0,0 +1,351 @@
+"""
+Paylaşılan sunucu runtime'ı
+
+Flask (app.py) ve ASGI (asgi_app.py) sunucularının ortak kullandığı
+parçalar: environment ayarları, cihaz seçimi, model registry, batched VAD
+servisi, başlangıç warm-up'ı ve /health, /ready, /config yanıtları.
+"""
+
+import functools
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from asr_engine import create_engine
+from inference import PRIORITY_CLASSES, InferenceScheduler
+from model_registry import ModelRegistry, MODEL_SIZES_MB, current_rss_mb
+from process_pool import ProcessPoolScheduler
+from vad import VADService, StreamingVAD, load_vad_backend
+
+# Load environment variables from .env file (for local development)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv not installed, will use system environment variables
+
+# Per-session audio buffer kapasitesi (Whisper tek seferde en fazla 30s işler)
+MAX_BUFFER_SECONDS = float(os.environ.get("MAX_BUFFER_SECONDS", "30"))
+
+# Model registry: varsayılan model ve bellek bütçesi (0: sınırsız)
+DEFAULT_MODEL = os.environ.get("WHISPER_MODEL", "small")
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0"))
+
+# ASR motoru: faster_whisper veya stub (model indirmeden, sabit gecikmeli
+# deterministik çıktı; sunucu overhead'ini model maliyetinden ayrı ölçmek için)
+ASR_ENGINE = os.environ.get("ASR_ENGINE", "faster_whisper")
+STUB_OPTIONS = {
+    'base_ms': float(os.environ.get("STUB_BASE_MS", "50")),
+    'per_second_ms': float(os.environ.get("STUB_PER_SECOND_MS", "10"))
+}
+
+# Paylaşılan inference scheduler ayarları
+ASR_WORKERS = int(os.environ.get("ASR_WORKERS", "1"))
+ASR_BATCH_SIZE = int(os.environ.get("ASR_BATCH_SIZE", "8"))
+ASR_BATCH_WAIT_MS = float(os.environ.get("ASR_BATCH_WAIT_MS", "20"))
+
+# Öncelik sınıfı başına aynı anda decode edebilecek en fazla worker
+# (live, partial, batch; 0: sınırsız, batch için worker sayısı - 1). Ör.
+# ASR_WORKERS=4 ve ASR_BATCH_CONCURRENCY=1: dosya işleri en fazla bir worker kullanır.
+ASR_CLASS_LIMITS = {
+    name: int(os.environ.get(f"ASR_{name.upper()}_CONCURRENCY", "0"))
+    for name in PRIORITY_CLASSES
+}
+# Batch sınıfının tek (kesilemeyen) geçişinde decode edilen en fazla ses (s)
+ASR_BATCH_PASS_SECONDS = float(os.environ.get("ASR_BATCH_PASS_SECONDS", "30"))
+
+# CPU'da çok süreçli ASR: her süreç kendi modelini tutar (0: tek süreç)
+ASR_PROCESSES = int(os.environ.get("ASR_PROCESSES", "0"))
+ASR_CPU_THREADS = int(os.environ.get("ASR_CPU_THREADS", "0"))  # Süreç başına (0: çekirdek / süreç)
+ASR_ROUTING = os.environ.get("ASR_ROUTING", "least_loaded")  # least_loaded, sticky
+
+# Batched VAD servisi ayarları
+VAD_BACKEND = os.environ.get("VAD_BACKEND", "torch")  # torch, onnx
+VAD_MODEL_PATH = os.environ.get("VAD_MODEL_PATH")  # Yerel .jit / .onnx dosyası
+VAD_BATCH_SIZE = int(os.environ.get("VAD_BATCH_SIZE", "64"))
+VAD_BATCH_WAIT_MS = float(os.environ.get("VAD_BATCH_WAIT_MS", "2"))
+
+# Başlangıçta yüklenip ısıtılacak modeller (virgülle ayrılmış, boş: yalnızca varsayılan)
+PRELOAD_MODELS = [m.strip() for m in os.environ.get("PRELOAD_MODELS", "").split(',') if m.strip()]
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+
+# Global models (lazy loading)
+device_info = None
+vad_model = None
+vad_service = None
+model_lock = threading.Lock()
+vad_lock = threading.Lock()
+
+def get_vad_model():
+    """Lazy load Silero VAD backend (VAD_BACKEND: torch or onnx)"""
+    global vad_model
+    if vad_model is None:
+        with vad_lock:
+            if vad_model is None:
+                try:
+                    print(f"🔄 Loading Silero VAD model ({VAD_BACKEND})...")
+                    vad_model = load_vad_backend(VAD_BACKEND, VAD_MODEL_PATH)
+                    print("✅ VAD model loaded")
+                except Exception as e:
+                    print(f"⚠️  VAD model yüklenemedi: {e}")
+                    print("   VAD olmadan devam edilecek")
+                    return None
+    return vad_model
+
+def get_vad_service():
+    """Lazy create the batched VAD service (None if VAD is unavailable)"""
+    global vad_service
+    if vad_service is None:
+        model = get_vad_model()
+        if model is None:
+            return None
+        with vad_lock:
+            if vad_service is None:
+                vad_service = VADService(
+                    model,
+                    max_batch_size=VAD_BATCH_SIZE,
+                    batch_wait_ms=VAD_BATCH_WAIT_MS
+                )
+    return vad_service
+
+def get_device():
+    """Resolve (device, compute_type) once"""
+    global device_info
+    if device_info is None:
+        with model_lock:
+            if device_info is None:
+                # Colab'dan gelen DEVICE_TYPE'ı veya yerel için USE_GPU'yu kullan
+                # Varsayılan olarak 'cuda' denenir, bulunamazsa 'cpu'ya düşer
+                device = os.environ.get("DEVICE_TYPE", "cuda")
+
+                # GPU kontrolü (CPU modunda torch import edilmez)
+                try:
+                    if device == "cuda":
+                        import torch
+                        if not torch.cuda.is_available():
+                            print("⚠️  CUDA seçildi ancak kullanılamıyor, CPU'ya geçiliyor...")
+                            device = "cpu"
+                        else:
+                            print(f"✅ GPU bulundu: {torch.cuda.get_device_name(0)}")
+                except ImportError:
+                    print("⚠️  PyTorch yüklü değil, CPU kullanılacak.")
+                    device = "cpu"
+
+                compute_type = "float16" if device == "cuda" else "int8"
+                device_info = (device, compute_type)
+    return device_info
+
+def load_engine(key):
+    """Load the ASR engine (ASR_ENGINE) for a (size, device, compute_type) key"""
+    model_size, device, compute_type = key
+    if ASR_ENGINE == 'stub':
+        print(f"🧪 Stub ASR engine: {STUB_OPTIONS['base_ms']}ms + {STUB_OPTIONS['per_second_ms']}ms/s")
+        return create_engine('stub', key, stub_options=STUB_OPTIONS)
+
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        print("❌ faster-whisper yüklü değil!")
+        print("   Yüklemek için: pip install faster-whisper")
+        raise
+
+    print(f"🔄 Loading Whisper model: {model_size} on {device} ({compute_type})...")
+
+    try:
+        engine = create_engine(ASR_ENGINE, key, num_workers=ASR_WORKERS)
+        print(f"✅ Model loaded: {model_size}")
+    except Exception as e:
+        print(f"❌ Model yükleme hatası: {e}")
+        print("   Daha küçük bir model deneyin (tiny, base, small)")
+        raise
+
+    return engine
+
+def create_scheduler(key):
+    """Registry loader: load an engine and put a shared scheduler in front of it"""
+    if ASR_PROCESSES > 0 and key[1] == 'cpu':
+        print(f"🔄 Loading Whisper model: {key[0]} in {ASR_PROCESSES} worker processes...")
+        scheduler = ProcessPoolScheduler(
+            key,
+            num_processes=ASR_PROCESSES,
+            cpu_threads=ASR_CPU_THREADS,
+            num_workers=ASR_WORKERS,
+            routing=ASR_ROUTING,
+            loader=functools.partial(create_engine, ASR_ENGINE, stub_options=STUB_OPTIONS),
+            # Session buffer'ı + pad; daha uzun ses pipe üzerinden gider
+            max_audio_seconds=MAX_BUFFER_SECONDS + 1,
+            warmup=WARMUP,
+            class_limits=ASR_CLASS_LIMITS
+        )
+        print(f"✅ ASR process pool: {ASR_PROCESSES} süreç × {scheduler.cpu_threads} thread, {ASR_ROUTING}")
+        return scheduler
+
+    scheduler = InferenceScheduler(
+        load_engine(key),
+        num_workers=ASR_WORKERS,
+        max_batch_size=ASR_BATCH_SIZE,
+        batch_wait_ms=ASR_BATCH_WAIT_MS,
+        class_limits=ASR_CLASS_LIMITS,
+        batch_pass_seconds=ASR_BATCH_PASS_SECONDS
+    )
+    print(f"✅ Inference scheduler: {ASR_WORKERS} worker, batch {ASR_BATCH_SIZE}")
+    return scheduler
+
+# Modeller (size, device, compute_type) anahtarıyla paylaşılır, LRU ile boşaltılır
+model_registry = ModelRegistry(create_scheduler, memory_budget_mb=MODEL_MEMORY_BUDGET_MB)
+
+metrics.Gauge(
+    'whisper_model_memory_megabytes', 'Estimated memory of models held by the model registry',
+    function=lambda: model_registry.stats()['memory_used_mb']
+)
+metrics.Gauge(
+    'process_resident_memory_bytes', 'Resident memory size of the server process',
+    function=lambda: (current_rss_mb() or 0) * 1024 * 1024
+)
+metrics.Counter(
+    'process_cpu_seconds_total', 'User and system CPU time of the server process',
+    function=time.process_time
+)
+
+def model_key(model_size=None):
+    device, compute_type = get_device()
+    return (model_size or DEFAULT_MODEL, device, compute_type)
+
+def get_scheduler(model_size=None):
+    """Shared inference scheduler of a model (loaded on demand)"""
+    return model_registry.get(model_key(model_size))
+
+def get_model(model_size=None):
+    """Lazy load Whisper model (via the model registry; None with ASR_PROCESSES)"""
+    return get_scheduler(model_size).model
+
+# Başlangıç durumu: starting -> loading -> warming -> ready (veya failed)
+startup_state = {'phase': 'starting', 'timings': {}, 'error': None}
+
+def warm_up():
+    """Load VAD and configured models, then run synthetic decodes through them"""
+    timings = startup_state['timings']
+    started = time.perf_counter()
+    try:
+        startup_state['phase'] = 'loading'
+        t = time.perf_counter()
+        vad = get_vad_service()
+        timings['vad_load_s'] = round(time.perf_counter() - t, 3)
+
+        keys = []
+        for model_size in PRELOAD_MODELS or [DEFAULT_MODEL]:
+            if model_size not in MODEL_SIZES_MB:
+                print(f"⚠️  PRELOAD_MODELS: bilinmeyen model atlandı: {model_size}")
+                continue
+            key = model_key(model_size)
+            t = time.perf_counter()
+            model_registry.get(key)
+            timings[f'{model_size}_load_s'] = round(time.perf_counter() - t, 3)
+            keys.append(key)
+
+        if WARMUP:
+            startup_state['phase'] = 'warming'
+            # Düşük genlikli gürültü: encoder/decoder ve kelime hizalama yolları
+            # ilk gerçek utterance'tan önce bir kez çalışsın
+            audio = (np.random.default_rng(0).standard_normal(16000 * 2) * 0.01).astype(np.float32)
+
+            if vad is not None:
+                t = time.perf_counter()
+                stream = StreamingVAD(vad)
+                stream.process(audio)
+                timings['vad_warmup_s'] = round(time.perf_counter() - t, 3)
+
+            for key in keys:
+                scheduler = model_registry.get(key)
+                t = time.perf_counter()
+                scheduler.submit(audio, language=None).result()
+                scheduler.submit(audio, language='en', word_timestamps=True).result()
+                timings[f'{key[0]}_warmup_s'] = round(time.perf_counter() - t, 3)
+
+        timings['total_s'] = round(time.perf_counter() - started, 3)
+        startup_state['phase'] = 'ready'
+        breakdown = ', '.join(f"{k}={v}" for k, v in timings.items())
+        print(f"✅ Sunucu hazır ({breakdown})")
+    except Exception as e:
+        startup_state['phase'] = 'failed'
+        startup_state['error'] = str(e)
+        print(f"❌ Başlangıç yüklemesi başarısız: {e}")
+
+def start_warmup():
+    """Run warm_up() in the background so /health answers while models load"""
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def health_status():
+    """Payload of GET /health (liveness)"""
+    try:
+        import torch
+        gpu_available = torch.cuda.is_available()
+        gpu_name = torch.cuda.get_device_name(0) if gpu_available else None
+    except:
+        gpu_available = False
+        gpu_name = None
+
+    import admission  # admission runtime'ı import eder
+
+    registry = model_registry.stats()
+    return {
+        'status': 'ok',
+        'startup_phase': startup_state['phase'],
+        'model': DEFAULT_MODEL,
+        'asr_engine': ASR_ENGINE,
+        'gpu': os.environ.get("USE_GPU", "1") == "1",
+        'gpu_available': gpu_available,
+        'gpu_name': gpu_name,
+        'model_loaded': any(m['model'] == DEFAULT_MODEL and m['loaded'] for m in registry['models']),
+        'model_registry': registry,
+        'asr_queues': {
+            key[0]: scheduler.queue_depths()
+            for key, scheduler in model_registry.loaded()
+            if hasattr(scheduler, 'queue_depths')
+        },
+        'admission': admission.controller.status()
+    }
+
+def ready_status():
+    """Payload and HTTP status of GET /ready (readiness)"""
+    return {
+        'ready': startup_state['phase'] == 'ready',
+        'phase': startup_state['phase'],
+        'timings': startup_state['timings'],
+        'error': startup_state['error']
+    }, 200 if startup_state['phase'] == 'ready' else 503
+
+# GET /config yanıtı
+CONFIG_INFO = {
+    'models': [
+        {'value': 'tiny', 'name': 'Tiny (~75MB)', 'speed': 'fastest', 'quality': 'low'},
+        {'value': 'base', 'name': 'Base (~150MB)', 'speed': 'fast', 'quality': 'medium'},
+        {'value': 'small', 'name': 'Small (~500MB)', 'speed': 'balanced', 'quality': 'good', 'recommended': True},
+        {'value': 'medium', 'name': 'Medium (~1.5GB)', 'speed': 'slow', 'quality': 'high'},
+        {'value': 'large-v3', 'name': 'Large-v3 (~3GB)', 'speed': 'slowest', 'quality': 'highest'}
+    ],
+    'languages': [
+        {'code': 'auto', 'name': 'Auto-detect'},
+        {'code': 'tr', 'name': 'Türkçe'},
+        {'code': 'en', 'name': 'English'},
+        {'code': 'de', 'name': 'Deutsch'},
+        {'code': 'fr', 'name': 'Français'},
+        {'code': 'es', 'name': 'Español'},
+        {'code': 'pt', 'name': 'Português'},
+        {'code': 'it', 'name': 'Italiano'},
+        {'code': 'ar', 'name': 'العربية'},
+        {'code': 'zh', 'name': '中文'},
+        {'code': 'ja', 'name': '日本語'}
+    ],
+    'default_config': {
+        'chunk_length_s': 3,
+        'vad_filter': True,
+        'sample_rate': 16000
+    }
+}
@@ -0,0 +1,980 @@
+"""
+Transport'tan bağımsız transcription session'ı
+
+Bir WebSocket bağlantısının tüm durumu (ses buffer'ı, VAD, resampler,
+Opus decoder, decoding context, config) burada tutulur. Flask-Sock ve ASGI
+sunucuları yalnızca gelen mesajları handle_message()'a verir ve send
+callback'i ile dönen dict'leri client'a yazar.
+
+Session iki aşamalı bir pipeline'dır: handle_message() (receiver + VAD)
+hiçbir zaman ASR'ı beklemez; biten/büyüyen utterance'lar sınırlı bir
+kuyruğa konur ve ASR aşaması bunları paylaşılan scheduler'da sırayla
+işler. Kuyruk dolarsa eski işler atılır ve client'a `overloaded` gönderilir;
+ASR gerisinde kalırken ses buffer'ı taşarsa atılan ses de bildirilir.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import admission
+import metrics
+import runtime
+import tracing
+from audio_buffer import AudioRingBuffer
+from audio_codec import (
+    AUDIO_ENCODINGS, OPUS_ENCODING, DEFAULT_ENCODING,
+    OpusStreamDecoder, available_encodings, decode_pcm, decode_base64_pcm
+)
+from inference import PRIORITY_LIVE, PRIORITY_PARTIAL
+from model_registry import MODEL_SIZES_MB
+from outbox import Outbox
+from resampler import StreamingResampler
+from streaming import DecodingContext, words_text
+from vad import StreamingVAD
+from word_timing import WORD_FORMATS, WORD_TIMING_MODES, timing_fields, words_span
+
+SAMPLE_RATE = 16000
+
+# Utterance sınırlarına eklenen pay (VAD zaman damgaları etrafında)
+SPEECH_PAD_MS = 200
+
+# Client'ın gönderebileceği giriş örnekleme hızları (sunucuda 16 kHz'e çevrilir)
+MIN_INPUT_SAMPLE_RATE = 8000
+MAX_INPUT_SAMPLE_RATE = 96000
+
+# Zaman tabanlı kesimlerde bir sonraki chunk'a taşınan ses (yarım kelime olmasın)
+CHUNK_OVERLAP_MS = 1000
+
+# Bu süreden uzun utterance'ların segment'leri decode edildikçe gönderilir
+STREAM_SEGMENTS_MIN_SECONDS = 5.0
+
+# VAD: bitmeyen konuşma buffer'ın (MAX_BUFFER_SECONDS) bu oranını doldurursa
+# son LONG_SPEECH_SEARCH_SECONDS (en fazla buffer'ın son üçte biri) içindeki en
+# sessiz noktadan kesilir; aksi halde buffer taşar ve utterance'ın başı atılır
+LONG_SPEECH_CUT_FRACTION = 0.9
+LONG_SPEECH_SEARCH_SECONDS = 3.0
+
+# Session başına ASR'ı bekleyen en fazla utterance (işlenmekte olan hariç)
+SESSION_QUEUE_SIZE = int(os.environ.get("SESSION_QUEUE_SIZE", "4"))
+
+# ASR sonuçları scheduler worker'larında değil burada uygulanır: yavaş bir
+# client'a yazmak veya session kilidi paylaşılan decode'u bekletmesin
+_result_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="asr-result")
+
+# Açık session'lar (/metrics gauge'ları scrape anında hesaplanır)
+_sessions = weakref.WeakSet()
+
+
+def quietest_cut(audio, sample_rate, search_seconds=LONG_SPEECH_SEARCH_SECONDS):
+    """Sample index in the middle of the latest quietest 20 ms frame of the last search_seconds"""
+    frame = sample_rate // 50
+    # Kısa buffer'da pencere son üçte birle sınırlı: kesim en az 2/3'ü commit eder
+    start = len(audio) - int(min(search_seconds * sample_rate, len(audio) / 3))
+    n = (len(audio) - start) // frame
+    if n == 0:
+        return len(audio)
+    energy = np.square(audio[start:start + n * frame]).reshape(n, frame).mean(axis=1)
+    # Eşit sessizlikte en sondaki seçilir (ilk boşluktan kesip buffer'ı doldurmamak için)
+    return start + (n - 1 - int(np.argmin(energy[::-1]))) * frame + frame // 2
+
+
+def _buffered_audio_seconds():
+    return sum(len(s.audio_buffer) / s.sample_rate for s in list(_sessions) if not s.closed)
+
+
+metrics.Gauge('whisper_active_sessions', 'Open transcription sessions', function=lambda: len(_sessions))
+metrics.Gauge(
+    'whisper_buffered_audio_seconds', 'Audio held in session buffers, not yet cut into utterances',
+    function=_buffered_audio_seconds
+)
+
+
+class UtteranceJob:
+    """One unit of ASR work queued by the receiver stage"""
+
+    FINAL = 'final'  # VAD ile biten utterance veya zaman tabanlı kesim
+    PARTIAL = 'partial'  # Streaming: büyüyen utterance'ın yeniden decode'u
+    MARKER = 'marker'  # Streaming: decode edilecek ses kalmadı, yalnızca utterance sonu
+
+    def __init__(self, kind, audio=None, start=0, time_based=False, end=None, speech_end_lag=0.0, trace=None,
+                 forced=False):
+        self.kind = kind
+        self.audio = audio
+        self.start = start  # Sesin session başından itibaren ilk örneği
+        self.end = end if end is not None else start + (len(audio) if audio is not None else 0)
+        # İş oluşturulduğunda konuşma sonundan beri gelen ses (VAD sessizlik süresi)
+        self.speech_end_lag = speech_end_lag
+        self.trace = trace  # tracing.UtteranceTrace (MARKER işlerinde None)
+        self.postprocess_started = None
+        # Decode edildikçe gelen segment'ler ve client'a gönderilenlerin sayısı
+        self.segments = []
+        self.segments_sent = 0
+        self.time_based = time_based
+        # VAD: konuşma bitmeden buffer sınırında kesildi (final: false, utterance sürüyor)
+        self.forced = forced
+        self.created_at = time.time()
+
+
+class TranscriptionSession:
+    """
+    State and message handling of one realtime transcription connection.
+
+    send(str) client'a JSON text frame gönderir; handle_message() aynı session için
+    sırayla (tek thread'den) çağrılmalıdır.
+    """
+
+    def __init__(self, send, queue_size=SESSION_QUEUE_SIZE):
+        self._send = send
+        self.session_id = uuid.uuid4().hex[:12]
+        self.sample_rate = SAMPLE_RATE
+        self.asr_key = None
+        self.asr = None
+        self.vad = None
+        self.closed = False
+        self.admitted = False  # admission.controller'da yer tutuyor
+
+        # ASR aşaması: bekleyen işler, işlenmekte olan iş ve overload durumu
+        self.queue_size = max(1, int(queue_size))
+        self._jobs = deque()
+        self._inflight = None
+        self._lock = threading.RLock()
+        self._send_lock = threading.Lock()
+        self.overloaded = False
+        self.dropped_utterances = 0
+        self.dropped_audio_samples = 0  # Ses buffer'ı taşınca atılan örnekler
+        self._buffer_overflowing = False
+
+        # Tracing: utterance sayacı ve son işten beri chunk aşamaları
+        self._utterances = 0
+        self._chunk_stages = {}
+
+        # Receiver'ın durum/olay mesajları (throttle + batch)
+        self.outbox = Outbox(self.send)
+
+    def send(self, payload):
+        # Receiver ve ASR aşamaları farklı thread'lerden gönderir
+        if self.closed:
+            return
+        text = json.dumps(payload)
+        with self._send_lock:
+            self._send(text)
+        metrics.SENT_BYTES.inc(len(text))  # ensure_ascii: karakter = byte
+        metrics.SENT_FRAMES.inc()
+        for message in payload['messages'] if payload.get('type') == 'batch' else (payload,):
+            metrics.SENT_MESSAGES.inc(type=message.get('type', ''))
+
+    def start(self):
+        """Admit (unless admit() already did), acquire models and announce the session; False on failure"""
+        if not self.admitted and not self.admit():
+            return False
+
+        # Get models (session'ın modeli kullanımda kaldıkça registry'de pinli)
+        try:
+            self.asr_key = runtime.model_key()
+            self.asr = runtime.model_registry.acquire(self.asr_key)
+            self.vad = runtime.get_vad_service()
+        except Exception as e:
+            self.asr_key = None
+            self.release_admission()
+            self.send({
+                'type': 'error',
+                'error': f'Model yüklenemedi: {str(e)}'
+            })
+            return False
+
+        sample_rate = self.sample_rate
+
+        # Audio buffer (preallocated float32 ring buffer)
+        self.audio_buffer = AudioRingBuffer(int(sample_rate * runtime.MAX_BUFFER_SECONDS))
+
+        # Session başından beri alınan örnek sayısı (VAD zaman damgaları bu eksende)
+        self.samples_received = 0
+        self.speech_pad = int(sample_rate * SPEECH_PAD_MS / 1000)
+
+        # VAD state tracking (recurrent state is per session)
+        self.vad_stream = StreamingVAD(self.vad) if self.vad is not None else None
+        self.is_speaking = False
+
+        # Config from client
+        self.config = {
+            'language': 'tr',  # Default Turkish
+            'silence_threshold': 0.5,  # Silence duration in seconds to trigger processing
+            'min_speech_duration': 0.5,  # Minimum speech duration to process
+            'vad_threshold': 0.5,  # VAD confidence threshold (0-1)
+            'audio_encoding': DEFAULT_ENCODING,  # Binary frame format (pcm_s16le, pcm_f32le, opus)
+            'sample_rate': sample_rate,  # Client input rate (resampled to 16 kHz)
+            'streaming': False,  # Re-decode growing utterance and commit stable prefix
+            'partial_interval_ms': 500,  # Streaming re-decode interval
+            'chunk_length_s': 3,  # Time-based commit interval (no VAD)
+            'prompt_carry': True,  # Feed previously committed text as initial_prompt
+            'model': self.asr_key[0],  # Whisper model size (tiny, base, small, medium, large-v3)
+            'trace': False,  # Transcript mesajlarına aşama süreleri (trace) ekle
+            'status_interval_ms': 500,  # vad_status / buffer durumu en sık bu aralıkta (0: her chunk)
+            'batch_messages': False,  # Bir chunk'ın mesajlarını tek 'batch' frame'inde gönder
+            'stream_segments': True,  # Uzun utterance'ların segment'lerini decode edildikçe gönder
+            'word_timing': 'auto',  # Kelime zamanları: auto, off, segment, full
+            'word_format': 'objects'  # words/segments: objects veya arrays (paralel diziler)
+        }
+
+        # Decoding context: prompt carry-over + streaming (LocalAgreement) state
+        self.context = DecodingContext()
+        self.hypothesis = self.context.hypothesis
+        self.last_partial_at = 0
+        self.utterance_streamed = False
+        self.overlap = int(sample_rate * CHUNK_OVERLAP_MS / 1000)
+
+        # Giriş 16 kHz değilse session başına streaming resampler
+        self.resampler = None
+        # audio_encoding 'opus' ise session başına streaming decoder
+        self.opus_decoder = None
+
+        _sessions.add(self)
+
+        # Send ready message
+        self.send({
+            'type': 'session_started',
+            'message_type': 'session_started',
+            'session_id': self.session_id,
+            'config': self.config,
+            'vad_enabled': self.vad is not None,
+            'audio_encodings': list(available_encodings())
+        })
+        return True
+
+    def admit(self):
+        """Admission control: wait for ASR capacity or send session_rejected"""
+        controller = admission.controller
+        if not controller.enabled:
+            return True
+
+        def on_queued(position):
+            self.send({
+                'type': 'session_queued',
+                'message_type': 'session_queued',
+                'position': position,
+                'max_wait_s': controller.queue_seconds
+            })
+
+        decision = controller.admit(on_queued)
+        if decision.admitted:
+            self.admitted = True
+            return True
+        print(f"⛔ Session reddedildi ({decision.reason}): {decision.estimate}")
+        self.send({
+            'type': 'session_rejected',
+            'message_type': 'session_rejected',
+            'error': 'Sunucu kapasitesi dolu, daha sonra tekrar deneyin',
+            'reason': decision.reason,
+            'waited_ms': round(decision.waited * 1000),
+            'admission': decision.estimate
+        })
+        return False
+
+    def release_admission(self):
+        if self.admitted:
+            self.admitted = False
+            admission.controller.release()
+
+    def close(self):
+        """Drop pending ASR work and release the session's model"""
+        with self._lock:
+            self.closed = True
+            _sessions.discard(self)
+            self._jobs.clear()
+            if self.asr_key is not None:
+                runtime.model_registry.release(self.asr_key)
+                self.asr_key = None
+            self.release_admission()
+
+    def input_resampler(self, rate):
+        """Resampler for the client input rate (None: already 16 kHz)"""
+        rate = int(rate)
+        if not MIN_INPUT_SAMPLE_RATE <= rate <= MAX_INPUT_SAMPLE_RATE:
+            raise ValueError(f'Desteklenmeyen sample_rate: {rate}')
+        if rate == self.sample_rate:
+            return None
+        if self.resampler is not None and self.resampler.in_rate == rate:
+            return self.resampler
+        return StreamingResampler(rate, self.sample_rate)
+
+    def asr_options(self):
+        """Transcription options derived from the session config"""
+        options = {
+            'language': self.config['language'] if self.config['language'] != 'auto' else None,
+            'vad_filter': self.config.get('vad_filter', True),
+            'vad_parameters': {
+                "min_silence_duration_ms": 500,
+                "speech_pad_ms": 200
+            }
+        }
+        if self.config.get('prompt_carry', True) and self.context.prompt:
+            options['initial_prompt'] = self.context.prompt
+        return options
+
+    def handle_message(self, message):
+        """Process one WebSocket message (str: JSON, bytes: audio frame)"""
+        # Binary frame: raw PCM / Opus in the session's negotiated encoding
+        if isinstance(message, (bytes, bytearray)):
+            metrics.RECEIVED_BYTES.inc(len(message), type='binary')
+            data = {}
+            msg_type = 'audio'
+        else:
+            metrics.RECEIVED_BYTES.inc(len(message.encode('utf-8')), type='text')
+            try:
+                data = json.loads(message)
+            except:
+                return
+
+            msg_type = data.get('type', data.get('message_type', ''))
+
+        # Config update
+        if msg_type == 'config':
+            self.update_config(data.get('config', {}), data.get('config_id'))
+
+        # Audio chunk
+        elif msg_type == 'audio' or msg_type == 'input_audio_chunk':
+            started = time.perf_counter()
+            try:
+                audio_chunk = self.decode_audio(message, data)
+            except Exception as e:
+                print(f"Audio decode error: {e}")
+                return
+            if audio_chunk is None:
+                return
+            self.note_chunk_stage('receive.decode', time.perf_counter() - started)
+            # VAD kilit dışında: bu sırada ASR sonuçları uygulanabilir
+            vad_result = self.run_vad(audio_chunk)
+            with self._lock:
+                dropped = self.audio_buffer.dropped_samples
+                self.audio_buffer.append(audio_chunk)
+                self.note_buffer_overflow(self.audio_buffer.dropped_samples - dropped)
+                self.samples_received += len(audio_chunk)
+                self.process_audio(audio_chunk, data, vad_result)
+                self.outbox.flush()
+
+        # Manual commit
+        elif msg_type == 'commit':
+            if len(self.audio_buffer) > self.sample_rate * 0.3:
+                # Force process - will be handled on next iteration
+                pass
+
+    def update_config(self, new_config, config_id=None):
+        """Apply a config message; config_updated echoes config_id so the client can match its ack"""
+        config = self.config
+        encoding = new_config.get('audio_encoding', config['audio_encoding'])
+        try:
+            if encoding not in AUDIO_ENCODINGS:
+                raise ValueError(f'Desteklenmeyen audio_encoding: {encoding}')
+            if encoding == OPUS_ENCODING and self.opus_decoder is None:
+                self.opus_decoder = OpusStreamDecoder(self.sample_rate)
+            elif encoding != OPUS_ENCODING:
+                self.opus_decoder = None
+        except (ValueError, RuntimeError) as e:
+            self.send({
+                'type': 'error',
+                'error': str(e)
+            })
+            new_config = {k: v for k, v in new_config.items() if k != 'audio_encoding'}
+
+        if 'sample_rate' in new_config:
+            try:
+                self.resampler = self.input_resampler(new_config['sample_rate'])
+                new_config['sample_rate'] = int(new_config['sample_rate'])
+            except (TypeError, ValueError) as e:
+                self.send({
+                    'type': 'error',
+                    'error': str(e)
+                })
+                new_config = {k: v for k, v in new_config.items() if k != 'sample_rate'}
+
+        # Model seçimi: registry'den yükle/paylaş, eskisini bırak
+        requested_model = new_config.get('model', config['model'])
+        if requested_model != config['model']:
+            try:
+                if requested_model not in MODEL_SIZES_MB:
+                    raise ValueError(f'Bilinmeyen model: {requested_model}')
+                new_key = runtime.model_key(requested_model)
+                asr = runtime.model_registry.acquire(new_key)
+                with self._lock:
+                    runtime.model_registry.release(self.asr_key)
+                    self.asr, self.asr_key = asr, new_key
+            except Exception as e:
+                self.send({
+                    'type': 'error',
+                    'error': f'Model yüklenemedi: {str(e)}'
+                })
+                new_config = {k: v for k, v in new_config.items() if k != 'model'}
+
+        # Streaming partial'ları kelime zamanı döndüren bir motor gerektirir
+        if new_config.get('streaming') and not getattr(self.asr, 'supports_streaming', True):
+            self.send({
+                'type': 'error',
+                'error': 'ASR engine streaming desteklemiyor'
+            })
+            new_config = {k: v for k, v in new_config.items() if k != 'streaming'}
+
+        for key, allowed in (('word_timing', WORD_TIMING_MODES), ('word_format', WORD_FORMATS)):
+            if key in new_config and new_config[key] not in allowed:
+                self.send({
+                    'type': 'error',
+                    'error': f"Desteklenmeyen {key}: {new_config[key]} ({', '.join(allowed)})"
+                })
+                new_config = {k: v for k, v in new_config.items() if k != key}
+        if new_config.get('word_timing') == 'full' and not getattr(self.asr, 'supports_streaming', True):
+            self.send({
+                'type': 'error',
+                'error': 'ASR engine kelime zamanları desteklemiyor'
+            })
+            new_config = {k: v for k, v in new_config.items() if k != 'word_timing'}
+        config.update(new_config)
+        self.outbox.interval = float(config['status_interval_ms']) / 1000
+        self.outbox.batch = bool(config['batch_messages'])
+        print(f"📝 Config updated: {config}")
+        message = {
+            'type': 'config_updated',
+            'config': config
+        }
+        if config_id is not None:
+            message['config_id'] = config_id
+        self.send(message)
+
+    def decode_audio(self, message, data):
+        """Decode one audio message into 16 kHz float32 samples (None: no audio)"""
+        if isinstance(message, (bytes, bytearray)) and self.opus_decoder is not None:
+            # Opus decoder doğrudan 16 kHz verir, resampler gerekmez
+            return self.opus_decoder.decode(message)
+
+        if isinstance(message, (bytes, bytearray)):
+            audio_chunk = decode_pcm(message, self.config['audio_encoding'])
+        else:
+            # Legacy JSON: base64-encoded 16-bit PCM
+            audio_b64 = data.get('audio_base_64') or data.get('audio')
+            if not audio_b64:
+                return None
+            audio_chunk = decode_base64_pcm(audio_b64, data.get('encoding', DEFAULT_ENCODING))
+            if data.get('sample_rate', self.config['sample_rate']) != self.config['sample_rate']:
+                self.resampler = self.input_resampler(data['sample_rate'])
+                self.config['sample_rate'] = int(data['sample_rate'])
+        if self.resampler is not None:
+            audio_chunk = self.resampler.process(audio_chunk)
+        return audio_chunk
+
+    def run_vad(self, audio_chunk):
+        """Evaluate VAD on a chunk: (events, probs), or None if VAD is off or failed"""
+        if self.vad is None:
+            return None
+        try:
+            # Chunk'taki tüm 512 örneklik pencereler değerlendirilir
+            self.vad_stream.threshold = self.config['vad_threshold']
+            self.vad_stream.min_silence_ms = self.config['silence_threshold'] * 1000
+            started = time.perf_counter()
+            result = self.vad_stream.process(audio_chunk)
+            elapsed = time.perf_counter() - started
+            metrics.VAD_SECONDS.observe(elapsed)
+            self.note_chunk_stage('vad', elapsed)
+            return result
+        except Exception as e:
+            print(f"VAD error: {e}")
+            return None
+
+    def process_audio(self, audio_chunk, data, vad_result):
+        """Act on VAD events of a new chunk and queue finished/growing utterances for ASR"""
+        config = self.config
+        sample_rate = self.sample_rate
+        audio_buffer = self.audio_buffer
+
+        # VAD-based speech detection
+        buffer_duration = len(audio_buffer) / sample_rate
+        should_process = False
+
+        # Utterance sınırları (mutlak örnek); None: tüm buffer
+        commit_range = None
+        speech_end = None
+        forced = False
+
+        if self.vad is not None and vad_result is not None:
+            events, probs = vad_result
+
+            for event in events:
+                if event['type'] == 'speech_started':
+                    self.is_speaking = True
+                    # Konuşma öncesi sessizliği buffer'dan at
+                    self.consume_until(event['start'] - self.speech_pad)
+                    self.outbox.post({
+                        'type': 'speech_started',
+                        'message_type': 'speech_started',
+                        'start_sample': event['start']
+                    })
+                else:
+                    self.is_speaking = False
+                    speech_duration = (event['end'] - event['start']) / sample_rate
+                    if speech_duration >= config['min_speech_duration']:
+                        should_process = True
+                        commit_range = (event['start'] - self.speech_pad, event['end'] + self.speech_pad)
+                        speech_end = event['end']
+
+                    self.outbox.post({
+                        'type': 'speech_ended',
+                        'message_type': 'speech_ended',
+                        'speech_duration': round(speech_duration, 2),
+                        'start_sample': event['start'],
+                        'end_sample': event['end']
+                    })
+
+            if (self.is_speaking and not should_process
+                    and len(audio_buffer) >= audio_buffer.capacity * LONG_SPEECH_CUT_FRACTION):
+                # Konuşma buffer'dan uzun: baştaki ses taşmadan utterance ortasından kesilir
+                origin = self.samples_received - len(audio_buffer)
+                should_process = forced = True
+                commit_range = (origin, origin + quietest_cut(audio_buffer.view(), sample_rate))
+                metrics.LONG_SPEECH_CUTS.inc()
+
+            speech_prob = float(probs.max()) if len(probs) else self.vad_stream.last_prob
+
+            # VAD status update (konuşma durumu değişince hemen, yoksa throttle)
+            self.outbox.status('vad', {
+                'type': 'vad_status',
+                'message_type': 'vad_status',
+                'is_speaking': self.is_speaking,
+                'speech_prob': round(speech_prob, 2),
+                'buffer_duration': round(buffer_duration, 2)
+            }, state=self.is_speaking)
+        elif self.vad is not None:
+            # VAD hatası - fallback to time-based processing
+            should_process = buffer_duration >= config['chunk_length_s']
+        else:
+            # No VAD - fallback to time-based
+            should_process = buffer_duration >= config['chunk_length_s'] or data.get('commit', False)
+
+        # Utterance'ın buffer içindeki konumu
+        origin = self.samples_received - len(audio_buffer)
+        utterance_start, utterance_end = 0, len(audio_buffer)
+        if commit_range is not None:
+            utterance_start = min(max(commit_range[0] - origin, 0), len(audio_buffer))
+            utterance_end = min(max(commit_range[1] - origin, 0), len(audio_buffer))
+
+        if should_process and utterance_end - utterance_start > sample_rate * 0.3:  # At least 0.3s
+            time_based = commit_range is None
+            if time_based and self._has_pending_cut():
+                # Önceki kesimin sonucu (ve buffer'dan atılacak kısım) bekleniyor
+                return
+            # Scheduler'a kopya gönderilir; buffer hemen yeniden kullanılabilir
+            started = time.perf_counter()
+            audio_np = audio_buffer.view()[utterance_start:utterance_end].copy()
+            trace = self.new_trace(UtteranceJob.FINAL, time.perf_counter() - started)
+            lag = (self.samples_received - speech_end) / sample_rate if speech_end is not None else 0.0
+            self.enqueue(UtteranceJob(
+                UtteranceJob.FINAL, audio_np, origin + utterance_start, time_based,
+                speech_end_lag=lag, trace=trace, forced=forced
+            ))
+            if not time_based:
+                # Utterance sonuna kadar olan sesi at; sonrası (yeni konuşma) kalır
+                audio_buffer.consume(utterance_end)
+
+        # Streaming: kalan ses çok kısa, yalnızca utterance sonunu bildir
+        elif should_process and config.get('streaming'):
+            self.enqueue(UtteranceJob(
+                UtteranceJob.MARKER, start=origin + utterance_start, end=origin + utterance_end
+            ))
+            audio_buffer.consume(utterance_end)
+
+        # Streaming: büyüyen utterance'ı periyodik olarak yeniden decode et
+        elif (config.get('streaming') and (self.is_speaking or self.vad is None)
+                and self.samples_received - self.last_partial_at >= sample_rate * config['partial_interval_ms'] / 1000
+                and len(audio_buffer) > sample_rate * 0.3):
+            self.last_partial_at = self.samples_received
+            started = time.perf_counter()
+            audio_np = audio_buffer.view().copy()
+            trace = self.new_trace(UtteranceJob.PARTIAL, time.perf_counter() - started)
+            self.enqueue(UtteranceJob(UtteranceJob.PARTIAL, audio_np, origin, trace=trace))
+
+        # VAD: konuşma yokken yalnızca speech_started öncesi pay (speech_pad) tutulur;
+        # sessizlik buffer'ı doldurup taşma (overload) olarak sayılmaz
+        elif self.vad is not None and vad_result is not None and not self.is_speaking:
+            self.consume_until(self.samples_received - self.speech_pad)
+
+        # Send partial update (buffer status)
+        elif len(audio_buffer) > sample_rate * 0.3 and not self.is_speaking:
+            self.outbox.status('buffer', {
+                'type': 'partial_transcript',
+                'message_type': 'partial_transcript',
+                'text': f"[{buffer_duration:.1f}s audio buffered...]",
+                'buffer_duration': buffer_duration
+            })
+
+    def note_chunk_stage(self, name, seconds):
+        """Accumulate a per-chunk stage until the next ASR job takes it (receiver thread)"""
+        stage = self._chunk_stages.get(name)
+        if stage is None:
+            self._chunk_stages[name] = [seconds, 1, time.time() - seconds]
+        else:
+            stage[0] += seconds
+            stage[1] += 1
+
+    def new_trace(self, kind, copy_seconds):
+        """Trace of a new ASR job, carrying the chunk stages since the previous job"""
+        self._utterances += 1
+        trace = tracing.UtteranceTrace(self.session_id, f"{self.session_id}-{self._utterances}", kind)
+        for name, (seconds, chunks, start) in self._chunk_stages.items():
+            trace.add(name, seconds, start=start, chunks=chunks)
+        self._chunk_stages = {}
+        trace.add('buffer.copy', copy_seconds)
+        return trace
+
+    def consume_until(self, sample):
+        """Drop buffered audio before an absolute sample position"""
+        origin = self.samples_received - len(self.audio_buffer)
+        self.audio_buffer.consume(sample - origin)
+
+    # --- ASR aşaması -----------------------------------------------------
+
+    def _pending_utterances(self):
+        """Queued jobs that need a decode (MARKERs do not)"""
+        return sum(1 for job in self._jobs if job.kind != UtteranceJob.MARKER)
+
+    def _has_pending_cut(self):
+        jobs = list(self._jobs) + ([self._inflight] if self._inflight else [])
+        return any(job.kind == UtteranceJob.FINAL and job.time_based for job in jobs)
+
+    def enqueue(self, job):
+        """Queue ASR work; applies the drop policy and starts the ASR stage if idle"""
+        with self._lock:
+            if self.closed:
+                return
+            # speech_ended vb. bu işin transcript'inden önce client'a ulaşmalı
+            self.outbox.flush()
+            if job.kind != UtteranceJob.PARTIAL:
+                # Biten utterance bekleyen partial'ları geçersiz kılar
+                self._jobs = deque(j for j in self._jobs if j.kind != UtteranceJob.PARTIAL)
+            elif any(j.kind == UtteranceJob.PARTIAL for j in self._jobs):
+                # Yalnızca en yeni partial anlamlı
+                self._jobs = deque(j for j in self._jobs if j.kind != UtteranceJob.PARTIAL)
+
+            dropped = 0
+            while job.kind != UtteranceJob.MARKER and self._pending_utterances() >= self.queue_size:
+                # En eski bekleyen utterance atılır (ASR ses akışının gerisinde kalıyor).
+                # MARKER'lar decode gerektirmez ve kuyrukta kalır: utterance'ın final: true'su kaybolmaz
+                index = next(i for i, j in enumerate(self._jobs) if j.kind != UtteranceJob.MARKER)
+                old = self._jobs[index]
+                if old.kind == UtteranceJob.FINAL:
+                    dropped += 1
+                    if self.config.get('streaming') and not old.time_based:
+                        # Streaming: kesinleşmiş kelimeler yine final: true ile kapanır
+                        self._jobs[index] = UtteranceJob(UtteranceJob.MARKER, start=old.start, end=old.end)
+                        continue
+                del self._jobs[index]
+            self._jobs.append(job)
+            self.dropped_utterances += dropped
+            if dropped:
+                metrics.DROPPED_UTTERANCES.inc(dropped)
+
+            if self._inflight is None:
+                self._run_next()
+            elif dropped or self._pending_utterances() >= self.queue_size:
+                self._set_overloaded(True, force=bool(dropped))
+
+    def note_buffer_overflow(self, samples):
+        """Count audio the ring buffer dropped; tells the client once per overflow episode"""
+        if not samples:
+            if self._buffer_overflowing and self._inflight is None and not self._jobs:
+                # Taşma bitti ve ASR boşta: overload durumu kapanır
+                self._set_overloaded(False)
+            self._buffer_overflowing = False
+            return
+        self.dropped_audio_samples += samples
+        metrics.DROPPED_AUDIO_SECONDS.inc(samples / self.sample_rate)
+        self._set_overloaded(True, force=not self._buffer_overflowing)
+        self._buffer_overflowing = True
+
+    def _set_overloaded(self, overloaded, force=False):
+        """Tell the client when ASR falls behind (and on every dropped utterance)"""
+        if overloaded == self.overloaded and not force:
+            return
+        self.overloaded = overloaded
+        self.send({
+            'type': 'overloaded',
+            'message_type': 'overloaded',
+            'overloaded': overloaded,
+            'pending_utterances': self._pending_utterances(),
+            'dropped_utterances': self.dropped_utterances,
+            'dropped_audio_s': round(self.dropped_audio_samples / self.sample_rate, 2)
+        })
+
+    def _run_next(self):
+        """Submit the next queued job to the shared scheduler (called under lock)"""
+        while self._jobs and not self.closed:
+            job = self._jobs.popleft()
+            if job.kind == UtteranceJob.MARKER:
+                self.finish_streamed_utterance(job)
+                continue
+
+            job.submitted_at = time.time()
+            if job.trace is not None:
+                job.trace.add('queue.session', job.submitted_at - job.created_at, start=job.created_at)
+            on_segment = None
+            if self.streams_segments(job):
+                on_segment = functools.partial(self._on_segment, job)
+            try:
+                future = self.asr.submit(
+                    job.audio,
+                    affinity=id(self),
+                    on_segment=on_segment,
+                    priority=PRIORITY_PARTIAL if job.kind == UtteranceJob.PARTIAL else PRIORITY_LIVE,
+                    word_timestamps=(
+                        job.kind == UtteranceJob.PARTIAL or job.time_based
+                        or self.config.get('streaming', False)
+                        or self.config.get('word_timing') == 'full'
+                    ),
+                    **self.asr_options()
+                )
+            except Exception as e:
+                print(f"Transcription error: {e}")
+                self.send({
+                    'type': 'error',
+                    'error': str(e)
+                })
+                continue
+
+            self._inflight = job
+            future.add_done_callback(
+                lambda f, job=job: _result_executor.submit(self._on_result, job, f)
+            )
+            return
+
+        self._inflight = None
+        if self.overloaded:
+            self._set_overloaded(False)
+
+    def streams_segments(self, job):
+        """Whether job's segments are sent as they decode (long VAD utterances, non-streaming mode)"""
+        config = self.config
+        return (
+            job.kind == UtteranceJob.FINAL and not job.time_based
+            and config.get('stream_segments', True) and not config.get('streaming', False)
+            and len(job.audio) >= STREAM_SEGMENTS_MIN_SECONDS * self.sample_rate
+        )
+
+    def _on_segment(self, job, segment, language):
+        # Scheduler worker'ından: gönderim sırası session kilidi altında korunur
+        job.segments.append((segment, language))
+        _result_executor.submit(self.send_segments, job)
+
+    def send_segments(self, job):
+        """Send the decoded segments of job not yet sent, as non-final commits"""
+        with self._lock:
+            while not self.closed and job.segments_sent < len(job.segments):
+                segment, language = job.segments[job.segments_sent]
+                job.segments_sent += 1
+                if not segment['text'].strip():
+                    continue
+                self.send({
+                    'type': 'committed_transcript',
+                    'message_type': 'committed_transcript',
+                    'text': segment['text'].strip(),
+                    'language_code': language or self.config['language'],
+                    'latency_ms': round((time.time() - job.created_at) * 1000),
+                    **timing_fields(self.config, segment['words'], [segment]),
+                    'start_sample': job.start,  # Kelime zamanları utterance başından itibaren
+                    'final': False
+                })
+                self.utterance_streamed = True
+
+    def _on_result(self, job, future):
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                result = future.result()
+                self.observe_result(job, result)
+                if job.kind == UtteranceJob.PARTIAL:
+                    self.apply_partial(job, result)
+                else:
+                    self.apply_final(job, result)
+            except Exception as e:
+                if job.trace is not None:
+                    job.trace.attributes['error'] = str(e)
+                print(f"Transcription error: {e}")
+                self.send({
+                    'type': 'error',
+                    'error': str(e)
+                })
+                if job.time_based:
+                    # Kesim yine de ilerlesin, aynı ses tekrar tekrar gönderilmesin
+                    self.consume_until(job.start + len(job.audio) - self.overlap)
+            tracing.export(job.trace)
+            self._inflight = None
+            self._run_next()
+
+    def observe_result(self, job, result):
+        """Record decode, queue wait and real-time factor of one ASR result"""
+        model = self.asr_key[0] if self.asr_key else ''
+        decode_s = result.decode_ms / 1000
+        if job.trace is not None:
+            queued_at = job.submitted_at + result.queue_ms / 1000
+            job.trace.add('queue.scheduler', result.queue_ms / 1000, start=job.submitted_at)
+            job.trace.add('asr.transcribe', decode_s, start=queued_at, batch_size=result.batch_size, model=model)
+            job.trace.attributes['audio.seconds'] = round(len(job.audio) / self.sample_rate, 3)
+            job.postprocess_started = time.perf_counter()
+        metrics.DECODE_SECONDS.observe(decode_s, model=model, kind=job.kind)
+        metrics.QUEUE_WAIT_SECONDS.observe(
+            result.queue_ms / 1000 + (job.submitted_at - job.created_at), model=model
+        )
+        if len(job.audio):
+            # Batch'te decode süresi utterance'lar arasında paylaştırılır
+            audio_s = len(job.audio) / self.sample_rate
+            metrics.REAL_TIME_FACTOR.observe(decode_s / result.batch_size / audio_s, model=model)
+            admission.controller.observe(
+                audio_s, decode_s, result.batch_size,
+                latency_seconds=(
+                    time.time() - job.created_at if job.kind == UtteranceJob.FINAL and not job.forced else None
+                )
+            )
+
+    def send_traced(self, job, message):
+        """Send a transcript message, adding the job's stage breakdown if requested"""
+        trace = job.trace
+        if trace is not None:
+            if job.postprocess_started is not None:
+                trace.add('postprocess', time.perf_counter() - job.postprocess_started)
+            if self.config.get('trace'):
+                message['trace'] = {
+                    'session_id': self.session_id,
+                    'utterance_id': trace.utterance_id,
+                    'stages_ms': trace.stage_ms()
+                }
+        started = time.perf_counter()
+        self.send(message)
+        if trace is not None:
+            trace.add('send', time.perf_counter() - started)
+
+    def finish_streamed_utterance(self, job):
+        """End of an utterance whose words were all streamed already"""
+        if not self.utterance_streamed:
+            return
+        self.hypothesis.finalize()
+        self.send({
+            'type': 'committed_transcript',
+            'message_type': 'committed_transcript',
+            'text': '',
+            'language_code': self.config['language'],
+            'words': None,
+            'start_sample': job.start,
+            'end_sample': job.end,
+            'final': True
+        })
+        self.utterance_streamed = False
+
+    def apply_final(self, job, result):
+        """Send the transcript of a finished utterance (or time-based chunk) as final"""
+        config = self.config
+        sample_rate = self.sample_rate
+        hypothesis = self.hypothesis
+        start = job.start / sample_rate
+
+        if job.time_based:
+            # Zaman tabanlı kesim: sınırdaki kelimeler bir sonraki chunk'ta çözülür
+            hypothesis.insert(result.words, start)
+            cut = job.start + len(job.audio) - self.overlap
+            words = hypothesis.commit_until(cut / sample_rate)
+            if hypothesis.buffer:
+                cut = min(cut, int(hypothesis.buffer[0]['start'] * sample_rate))
+            self.consume_until(cut)
+            full_text = words_text(words)
+            segments = words_span(words, full_text.strip())
+        elif config.get('streaming', False):
+            # Daha önce kesinleşmemiş kelimelerin hepsini kesinleştir
+            hypothesis.insert(result.words, start)
+            words = hypothesis.finalize()
+            full_text = words_text(words)
+            segments = words_span(words, full_text.strip())
+        else:
+            full_text = result.text
+            words = result.words
+            segments = result.segments
+        self.context.remember(full_text)
+        text = full_text.strip()
+        if job.segments:
+            # Segment'ler decode edildikçe gönderildi; final utterance sonunu işaretler
+            self.send_segments(job)
+            text, words, segments = '', None, None
+
+        latency = (time.time() - job.created_at) * 1000
+
+        if job.forced and not text:
+            # Konuşma sürüyor: segment'ler gönderildi (veya boş), kapanış konuşma sonunda
+            return
+        if full_text.strip() or self.utterance_streamed:
+            # Send committed transcript
+            self.send_traced(job, {
+                'type': 'committed_transcript',
+                'message_type': 'committed_transcript',
+                'text': text,
+                'language_code': result.language or config['language'],
+                'latency_ms': round(latency),
+                'queue_ms': round(result.queue_ms + (job.submitted_at - job.created_at) * 1000),
+                **timing_fields(config, words, segments),
+                'buffer_duration': round(len(job.audio) / sample_rate, 2),
+                'start_sample': job.start,
+                'end_sample': job.end,
+                'final': not job.forced
+            })
+            if full_text.strip():
+                # Streaming'de kelimeler partial'larla kesinleşmiş olabilir: boş satır basılmaz
+                print(f"📝 [{round(latency)}ms] {full_text.strip()}")
+            if not job.forced:
+                metrics.SPEECH_END_TO_COMMIT_SECONDS.observe(
+                    latency / 1000 + job.speech_end_lag, model=self.asr_key[0] if self.asr_key else ''
+                )
+        else:
+            # Empty result
+            self.send_traced(job, {
+                'type': 'partial_transcript',
+                'message_type': 'partial_transcript',
+                'text': '',
+                'start_sample': job.start,
+                'end_sample': job.end
+            })
+        # Zorunlu kesimden sonra utterance'ın sonu final: true ile kapanır
+        self.utterance_streamed = job.forced
+
+    def apply_partial(self, job, result):
+        """Commit the prefix agreed with the previous hypothesis, send the rest as partial"""
+        config = self.config
+        hypothesis = self.hypothesis
+
+        hypothesis.insert(result.words, job.start / self.sample_rate)
+        committed = hypothesis.flush()
+        if committed:
+            self.utterance_streamed = True
+            self.context.remember(words_text(committed))
+            self.send_traced(job, {
+                'type': 'committed_transcript',
+                'message_type': 'committed_transcript',
+                'text': words_text(committed),
+                'language_code': result.language or config['language'],
+                'latency_ms': round((time.time() - job.created_at) * 1000),
+                'queue_ms': round(result.queue_ms + (job.submitted_at - job.created_at) * 1000),
+                **timing_fields(config, committed, words_span(committed, words_text(committed))),
+                'final': False
+            })
+            # Kesinleşen sesi buffer'dan at
+            self.consume_until(int(hypothesis.last_committed_time * self.sample_rate))
+
+        message = {
+            'type': 'partial_transcript',
+            'message_type': 'partial_transcript',
+            'text': hypothesis.pending_text
+        }
+        if committed:
+            self.send(message)
+        else:
+            self.send_traced(job, message)
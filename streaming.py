@@ -0,0 +1,137 @@
+"""
+Streaming transcription yardımcıları (LocalAgreement-2)
+
+Büyüyen utterance her N ms'de yeniden decode edilir. Art arda iki
+hipotezin uzlaştığı (aynı kelimelerle başlayan) ön ek kesinleşmiş kabul
+edilir ve client'a gönderilir; kalan kısım partial olarak gösterilir.
+Kelime zamanları session başından itibaren saniye cinsindendir.
+"""
+
+import string
+
+_STRIP_CHARS = string.punctuation + string.whitespace + '“”‘’«»¿¡…'
+
+
+def normalize_word(text):
+    """Case/punctuation-insensitive form used to compare hypotheses"""
+    return text.strip(_STRIP_CHARS).lower()
+
+
+def shift_words(words, offset):
+    """Return copies of word dicts with start/end shifted by offset seconds"""
+    return [
+        dict(word, start=round(word['start'] + offset, 3), end=round(word['end'] + offset, 3))
+        for word in words
+    ]
+
+
+class HypothesisBuffer:
+    """
+    LocalAgreement-2 hipotez tamponu.
+
+    insert() yeni hipotezi alır: zaten kesinleşmiş zamandan önce başlayan
+    kelimeler ve örtüşen sesten gelen, kesinleşmiş kuyruğu tekrar eden
+    kelimeler atılır. flush() önceki hipotezle ortak ön eki kesinleştirir.
+    """
+
+    def __init__(self, max_committed_words=20):
+        self.buffer = []  # Önceki hipotezin kesinleşmemiş kısmı
+        self.new = []
+        self.committed = []  # Son kesinleşen kelimeler (tekrar tespiti için)
+        self.max_committed_words = max_committed_words
+        self.last_committed_time = 0.0
+
+    def insert(self, words, offset=0.0):
+        """Add a new hypothesis; words are relative to offset (seconds)"""
+        words = shift_words(words, offset)
+        self.new = [w for w in words if w['start'] > self.last_committed_time - 0.1]
+        self._drop_repeated_prefix()
+
+    def _drop_repeated_prefix(self):
+        """Drop leading words that repeat the committed tail (1-5 word n-gram)"""
+        if not self.new or not self.committed:
+            return
+        if abs(self.new[0]['start'] - self.last_committed_time) >= 1.0:
+            return
+        for n in range(min(len(self.committed), len(self.new), 5), 0, -1):
+            tail = [normalize_word(w['text']) for w in self.committed[-n:]]
+            head = [normalize_word(w['text']) for w in self.new[:n]]
+            if tail == head:
+                del self.new[:n]
+                return
+
+    def _commit(self, words):
+        if words:
+            self.committed = (self.committed + words)[-self.max_committed_words:]
+            self.last_committed_time = words[-1]['end']
+        return words
+
+    def flush(self):
+        """Commit the prefix shared by the previous and the new hypothesis"""
+        committed = []
+        while self.new and self.buffer:
+            if normalize_word(self.new[0]['text']) != normalize_word(self.buffer[0]['text']):
+                break
+            committed.append(self.new.pop(0))
+            self.buffer.pop(0)
+
+        self.buffer = self.new
+        self.new = []
+        return self._commit(committed)
+
+    def commit_until(self, cut_time):
+        """Commit words of the latest hypothesis that end before cut_time"""
+        committed = []
+        while self.new and self.new[0]['end'] <= cut_time:
+            committed.append(self.new.pop(0))
+
+        # Sınırı aşan kelimeler bir sonraki (örtüşen) decode'da tekrar çözülür
+        self.buffer = self.new
+        self.new = []
+        return self._commit(committed)
+
+    def finalize(self):
+        """Commit everything in the latest hypothesis (end of utterance)"""
+        committed = self.new
+        self.buffer = []
+        self.new = []
+        return self._commit(committed)
+
+    @property
+    def pending_text(self):
+        return ''.join(word['text'] for word in self.buffer).strip()
+
+
+def words_text(words):
+    return ''.join(word['text'] for word in words).strip()
+
+
+class DecodingContext:
+    """
+    Per-session decoding context.
+
+    Kesinleşen metnin son kısmını bir sonraki decode'a initial_prompt
+    olarak verir ve örtüşen sesteki kelimeleri ayıklayan HypothesisBuffer'ı
+    tutar.
+    """
+
+    def __init__(self, max_prompt_chars=200):
+        self.hypothesis = HypothesisBuffer()
+        self.max_prompt_chars = max_prompt_chars
+        self._text = ''
+
+    def remember(self, text):
+        """Record committed text for future prompts"""
+        text = text.strip()
+        if text:
+            self._text = f"{self._text} {text}".strip()[-self.max_prompt_chars * 2:]
+
+    @property
+    def prompt(self):
+        if not self._text:
+            return None
+        prompt = self._text[-self.max_prompt_chars:]
+        if len(self._text) > self.max_prompt_chars and ' ' in prompt:
+            # Yarım kelimeyle başlamasın
+            prompt = prompt.split(' ', 1)[1]
+        return prompt
@@ -0,0 +1,74 @@
+"""
+Ortak test fixture'ları: model indirmeden session (stub ASR + enerji VAD'ı)
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import model_registry  # noqa: E402
+import runtime  # noqa: E402
+import vad  # noqa: E402
+from asr_engine import SAMPLE_RATE, StubEngine  # noqa: E402
+from inference import InferenceScheduler  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class EnergyVAD(vad.VADBackend):
+    """Speech probability 1 for 512-sample frames louder than 0.05 (mean abs)"""
+
+    def initial_state(self):
+        return None
+
+    def __call__(self, frames, states):
+        return (np.abs(frames).mean(axis=1) > 0.05).astype(np.float32), states
+
+
+@pytest.fixture
+def stub_runtime(monkeypatch):
+    """runtime with a stub ASR scheduler per model; set engines['vad'] = False for no VAD"""
+    engines = {'vad': True}
+    registry = model_registry.ModelRegistry(
+        lambda key: InferenceScheduler(StubEngine(base_ms=0, per_second_ms=0), max_batch_size=1)
+    )
+    service = vad.VADService(EnergyVAD())
+    monkeypatch.setattr(runtime, 'device_info', ('cpu', 'int8'))
+    monkeypatch.setattr(runtime, 'model_registry', registry)
+    monkeypatch.setattr(runtime, 'get_vad_service', lambda: service if engines['vad'] else None)
+    return engines
+
+
+class Client:
+    """Messages a TranscriptionSession sent, decoded"""
+
+    def __init__(self):
+        self.messages = []
+
+    def __call__(self, text):
+        self.messages.append(json.loads(text))
+
+    def of_type(self, kind):
+        found = []
+        for message in self.messages:
+            if message.get('type') == 'batch':
+                found.extend(inner for inner in message['messages'] if inner.get('type') == kind)
+            elif message.get('type') == kind:
+                found.append(message)
+        return found
+
+
+def pcm_frames(audio, chunk=4096):
+    """float32 audio as binary pcm_s16le WebSocket frames"""
+    pcm = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    return [pcm[i:i + chunk].tobytes() for i in range(0, len(pcm), chunk)]
+
+
+def noise(seconds, level=0.01, seed=0):
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE)) * level).astype(np.float32)
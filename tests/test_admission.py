@@ -0,0 +1,59 @@
+"""
+Admission kullanımı: /jobs decode'ları sayılır, yeni session yalnızca canlı payı büyütür
+"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+import admission
+import batch_jobs
+from asr_engine import SAMPLE_RATE
+
+
+def test_batch_decodes_count_toward_utilization():
+    controller = admission.AdmissionController(slo_ms=1000, window_seconds=60)
+    controller.active = 2
+    for _ in range(5):
+        controller.observe(2.0, 0.2, latency_seconds=0.3)  # Canlı: 1 s decode
+        controller.observe(4.0, 0.4, batch_size=2, live=False)  # /jobs: 1 s decode payı
+    estimate = controller.estimate()
+    span = admission.MIN_SPAN_SECONDS
+    assert estimate['utilization'] == pytest.approx(2.0 / span, abs=1e-3)
+    assert estimate['batch_utilization'] == pytest.approx(1.0 / span, abs=1e-3)
+    # 2 session'a bir tane daha: yalnızca canlı pay 3/2 büyür
+    assert estimate['predicted_utilization'] == pytest.approx((1.0 + 1.0 * 3 / 2) / span, abs=1e-3)
+    assert estimate['samples'] == 5  # /jobs gecikmesi p95'e girmez
+
+
+def wav_bytes(audio):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((audio * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+def test_job_decodes_are_recorded(stub_runtime, tmp_path, monkeypatch):
+    controller = admission.AdmissionController(slo_ms=1000)
+    monkeypatch.setattr(admission, 'controller', controller)
+    audio = np.zeros(SAMPLE_RATE * 8, dtype=np.float32)
+    for start in (1, 5):
+        audio[start * SAMPLE_RATE:(start + 1) * SAMPLE_RATE] = 0.3
+
+    manager = batch_jobs.BatchJobManager(directory=str(tmp_path))
+    job = manager.submit(io.BytesIO(wav_bytes(audio)), {'language': 'en', 'model': 'tiny', 'word_timestamps': False})
+    status = list(manager.stream(job, poll=0.05))[-1]
+    assert status['status'] == 'done'
+
+    decodes = list(controller._decodes)
+    assert len(decodes) == status['progress']['utterances_total'] == 2
+    assert all(not live for *_, live in decodes)
+    assert sum(sample[1] for sample in decodes) == pytest.approx(
+        sum(u['end'] - u['start'] for u in manager.result(job)['utterances']), abs=1e-3
+    )
+    assert not controller._finals
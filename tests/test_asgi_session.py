@@ -0,0 +1,90 @@
+"""
+ASGI /ws: sınırlı gönderim kuyruğu ve admission beklemesinin session worker'ı tutmaması
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import admission
+import asgi_app
+from asgi_app import SendQueue
+
+
+def frame(kind, **fields):
+    return json.dumps({'type': kind, **fields})
+
+
+def drain(queue):
+    async def frames():
+        queue.put(None)
+        items = []
+        while (text := await queue.get()) is not None:
+            items.append(json.loads(text))
+        return items
+    return asyncio.run(frames())
+
+
+def test_status_frames_merge_when_the_queue_is_full():
+    queue = SendQueue(maxsize=3)
+    queue.put(frame('vad_status', n=1))
+    queue.put(frame('speech_started'))
+    queue.put(frame('partial_transcript', n=1))
+    queue.put(frame('vad_status', n=2))  # Bekleyen vad_status'un yerine geçer
+    assert len(queue) == 3
+    assert drain(queue) == [
+        {'type': 'speech_started'}, {'type': 'partial_transcript', 'n': 1}, {'type': 'vad_status', 'n': 2}
+    ]
+
+
+def test_status_without_a_queued_peer_is_dropped():
+    queue = SendQueue(maxsize=2)
+    queue.put(frame('speech_started'))
+    queue.put(frame('partial_transcript', n=1))
+    queue.put(frame('vad_status'))
+    assert [message['type'] for message in drain(queue)] == ['speech_started', 'partial_transcript']
+
+
+def test_events_evict_status_frames_then_overflow():
+    queue = SendQueue(maxsize=2)
+    queue.put(frame('vad_status'))
+    queue.put(frame('committed_transcript', text='a'))
+    queue.put(frame('committed_transcript', text='b'))  # vad_status atılır
+    assert not queue.overflowed
+    assert [message.get('text') for message in drain(queue)] == ['a', 'b']
+
+    queue = SendQueue(maxsize=2)
+    for text in 'abc':
+        queue.put(frame('committed_transcript', text=text))
+    # Yalnızca olaylarla dolu kuyruk: gönderici durur, bağlantı kapatılır
+    assert queue.overflowed
+    assert drain(queue) == []
+
+
+@pytest.fixture
+def one_session_worker(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(asgi_app, 'session_executor', executor)
+    monkeypatch.setattr(admission, 'controller', admission.AdmissionController(
+        slo_ms=0, max_sessions=1, queue_seconds=3.0
+    ))
+    yield
+    executor.shutdown(wait=False)
+
+
+def test_queued_session_does_not_hold_a_session_worker(stub_runtime, one_session_worker):
+    from starlette.testclient import TestClient
+
+    client = TestClient(asgi_app.app)
+    with client.websocket_connect('/ws') as first:
+        assert first.receive_json()['type'] == 'session_started'
+        with client.websocket_connect('/ws') as second:
+            assert second.receive_json()['type'] == 'session_queued'
+            # İkinci session kapasite beklerken ilkinin mesajları işlenmeye devam eder
+            started = time.monotonic()
+            first.send_text(json.dumps({'type': 'config', 'config_id': 1, 'config': {}}))
+            assert first.receive_json()['config_id'] == 1
+            assert time.monotonic() - started < 1.0
@@ -0,0 +1,76 @@
+"""
+AudioRingBuffer: taşma politikaları ve kapasite sarması (wraparound)
+"""
+
+import numpy as np
+import pytest
+
+from audio_buffer import AudioRingBuffer
+
+
+def ramp(start, n):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def test_drop_oldest_keeps_the_newest_samples():
+    buffer = AudioRingBuffer(10)
+    assert buffer.append(ramp(0, 8)) == 8
+    assert buffer.append(ramp(8, 5)) == 5
+    np.testing.assert_array_equal(buffer.view(), ramp(3, 10))
+    assert buffer.dropped_samples == 3
+
+
+def test_drop_oldest_chunk_longer_than_capacity():
+    buffer = AudioRingBuffer(10)
+    buffer.append(ramp(0, 4))
+    assert buffer.append(ramp(4, 25)) == 10
+    np.testing.assert_array_equal(buffer.view(), ramp(19, 10))
+    assert buffer.dropped_samples == 19
+
+
+def test_drop_newest_keeps_the_buffered_samples():
+    buffer = AudioRingBuffer(10, overflow='drop_newest')
+    buffer.append(ramp(0, 8))
+    assert buffer.append(ramp(8, 5)) == 2
+    assert buffer.append(ramp(13, 1)) == 0
+    np.testing.assert_array_equal(buffer.view(), ramp(0, 10))
+    assert buffer.dropped_samples == 4
+
+
+def test_error_policy_raises_without_changing_the_buffer():
+    buffer = AudioRingBuffer(10, overflow='error')
+    buffer.append(ramp(0, 8))
+    with pytest.raises(BufferError):
+        buffer.append(ramp(8, 5))
+    np.testing.assert_array_equal(buffer.view(), ramp(0, 8))
+    assert buffer.dropped_samples == 0
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        AudioRingBuffer(0)
+    with pytest.raises(ValueError):
+        AudioRingBuffer(10, overflow='wrap')
+
+
+def test_wraparound_keeps_samples_contiguous_and_in_order():
+    rng = np.random.default_rng(0)
+    buffer = AudioRingBuffer(100)
+    expected = np.zeros(0, dtype=np.float32)
+    position = consumed_total = 0
+    for _ in range(500):
+        chunk = ramp(position, int(rng.integers(1, 60)))
+        position += len(chunk)
+        buffer.append(chunk)
+        expected = np.concatenate([expected, chunk])[-100:]
+        consumed = buffer.consume(int(rng.integers(0, 50)))
+        consumed_total += consumed
+        expected = expected[consumed:]
+
+        view = buffer.view()
+        np.testing.assert_array_equal(view, expected)
+        # view ve tail depolamanın kopyasız slice'larıdır
+        assert len(view) == 0 or np.shares_memory(view, buffer._data)
+        np.testing.assert_array_equal(buffer.tail(7), expected[-7:])
+        assert len(buffer) + buffer.free == buffer.capacity
+    assert buffer.dropped_samples == position - consumed_total - len(buffer) > 0
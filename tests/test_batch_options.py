@@ -0,0 +1,56 @@
+"""
+Batched geçişte her işin kendi seçenekleriyle (initial_prompt dahil) decode edilmesi
+"""
+
+import threading
+
+import numpy as np
+
+from asr_engine import SAMPLE_RATE, StubEngine
+from inference import PRIORITY_LIVE, InferenceScheduler
+
+
+class RecordingEngine(StubEngine):
+    """StubEngine that records (batch size, options) for every engine call"""
+
+    def __init__(self):
+        super().__init__(base_ms=0, per_second_ms=0)
+        self.calls = []
+        self.release = threading.Event()
+
+    def transcribe(self, audio, **options):
+        self.release.wait(5)
+        self.calls.append((1, options))
+        return super().transcribe(audio, **options)
+
+    def transcribe_batch(self, audios, **options):
+        self.release.wait(5)
+        self.calls.append((len(audios), options))
+        return super().transcribe_batch(audios, **options)
+
+
+def test_batched_jobs_keep_their_prompts():
+    engine = RecordingEngine()
+    scheduler = InferenceScheduler(engine, max_batch_size=8, batch_wait_ms=50)
+    audio = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    prompts = ['first session', 'second session', 'first session', None]
+    try:
+        futures = []
+        for prompt in prompts:
+            options = {'language': 'en'}
+            if prompt:
+                options['initial_prompt'] = prompt
+            futures.append(scheduler.submit(audio, priority=PRIORITY_LIVE, **options))
+        engine.release.set()
+        for future in futures:
+            future.result(timeout=10)
+    finally:
+        scheduler.close()
+
+    decoded = {}
+    for size, options in engine.calls:
+        prompt = options.get('initial_prompt')
+        decoded[prompt] = decoded.get(prompt, 0) + size
+    # Her prompt engine'e ulaşır; yalnızca aynı prompt'lu işler birlikte decode edilir
+    assert decoded == {'first session': 2, 'second session': 1, None: 1}
+    assert (2, {'language': 'en', 'initial_prompt': 'first session'}) in engine.calls
@@ -0,0 +1,45 @@
+"""
+/jobs VAD bölgelerinin utterance'lara birleştirilmesi
+"""
+
+import numpy as np
+import pytest
+
+import batch_jobs
+import vad
+from asr_engine import SAMPLE_RATE
+from conftest import EnergyVAD
+
+
+def speech_at(total_seconds, *spans):
+    """Silence with a loud tone over each (start, end) span in seconds"""
+    audio = np.zeros(int(total_seconds * SAMPLE_RATE), dtype=np.float32)
+    t = np.arange(len(audio)) / SAMPLE_RATE
+    for start, end in spans:
+        span = slice(int(start * SAMPLE_RATE), int(end * SAMPLE_RATE))
+        audio[span] = 0.3 * np.sin(2 * np.pi * 220 * t[span])
+    return audio
+
+
+@pytest.fixture
+def vad_service():
+    return vad.VADService(EnergyVAD())
+
+
+def test_regions_far_apart_are_not_merged(vad_service):
+    regions = batch_jobs.speech_regions(speech_at(20, (1, 3), (15, 17)), vad_service)
+    assert len(regions) == 2
+    # Aradaki 12 sn'lik sessizlik hiçbir utterance'a girmez
+    assert regions[0][1] < 5 * SAMPLE_RATE
+    assert regions[1][0] > 13 * SAMPLE_RATE
+
+
+def test_close_regions_are_merged(vad_service):
+    regions = batch_jobs.speech_regions(speech_at(10, (1, 3), (4, 6)), vad_service)
+    assert len(regions) == 1
+
+
+def test_gap_limit_is_configurable(vad_service, monkeypatch):
+    monkeypatch.setattr(batch_jobs, 'BATCH_MAX_GAP_SECONDS', 15)
+    regions = batch_jobs.speech_regions(speech_at(20, (1, 3), (15, 17)), vad_service)
+    assert len(regions) == 1
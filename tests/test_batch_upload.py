@@ -0,0 +1,120 @@
+"""
+/jobs yükleme boyutu sınırı (ASGI): gövde belleğe toplanmadan 413
+
+    python -m pytest -q tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import asgi_app  # noqa: E402
+import batch_jobs  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_jobs, 'BATCH_MAX_UPLOAD_MB', 1)
+    monkeypatch.setattr(batch_jobs, 'manager', batch_jobs.BatchJobManager(directory=str(tmp_path)))
+    return batch_jobs.manager
+
+
+BOUNDARY = b'upload-boundary'
+MULTIPART = b'multipart/form-data; boundary=' + BOUNDARY
+
+
+def multipart_chunks(count):
+    """A multipart body with a 'file' part of count * CHUNK bytes, split in CHUNK-sized pieces"""
+    head = (b'--' + BOUNDARY + b'\r\nContent-Disposition: form-data; name="file"; filename="a.wav"\r\n'
+            b'Content-Type: application/octet-stream\r\n\r\n')
+    return [head] + [b'\0' * CHUNK] * count + [b'\r\n--' + BOUNDARY + b'--\r\n']
+
+
+def asgi_request(chunks, headers=(), content_type=b'application/octet-stream'):
+    """(scope, receive, received) for a POST /jobs whose body arrives in chunks"""
+    received = []
+
+    async def receive():
+        if len(received) < len(chunks):
+            received.append(chunks[len(received)])
+            return {'type': 'http.request', 'body': received[-1], 'more_body': len(received) < len(chunks)}
+        return {'type': 'http.disconnect'}
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+        'scheme': 'http', 'path': '/jobs', 'raw_path': b'/jobs', 'query_string': b'', 'root_path': '',
+        'headers': [(b'content-type', content_type)] + list(headers),
+        'client': ('test', 1), 'server': ('test', 80)
+    }
+    return scope, receive, received
+
+
+def post_jobs(chunks, headers=(), content_type=b'application/octet-stream'):
+    """POST /jobs through the ASGI app; returns (status, body chunks the app read)"""
+    scope, receive, received = asgi_request(chunks, headers, content_type)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi_app.app(scope, receive, send))
+    status = next(message['status'] for message in sent if message['type'] == 'http.response.start')
+    return status, len(received)
+
+
+def test_content_length_over_limit_is_rejected_before_reading(manager):
+    chunks = [b'\0' * CHUNK] * 32  # 2 MB
+    status, read = post_jobs(chunks, [(b'content-length', str(32 * CHUNK).encode())])
+    assert status == 413
+    assert read == 0
+
+
+def test_chunked_upload_stops_at_limit(manager):
+    chunks = [b'\0' * CHUNK] * 64  # 4 MB, Content-Length yok
+    status, read = post_jobs(chunks)
+    assert status == 413
+    # Sınır (1 MB = 16 parça) aşılınca okuma durur
+    assert read <= 16 + 1024 * 1024 // CHUNK
+    assert os.listdir(manager.directory) == []
+
+
+def test_oversized_upload_through_test_client(manager):
+    from starlette.testclient import TestClient
+
+    response = TestClient(asgi_app.app).post('/jobs', content=b'\0' * (2 * 1024 * 1024))
+    assert response.status_code == 413
+    assert 'MB' in response.json()['error']
+    assert os.listdir(manager.directory) == []
+
+
+def test_empty_upload_is_a_bad_request(manager):
+    status, _ = post_jobs([b''])
+    assert status == 400
+
+
+def test_size_limited_stream_stops_at_limit(manager):
+    scope, receive, received = asgi_request([b'\0' * CHUNK] * 64)
+    request = asgi_app.size_limited(asgi_app.Request(scope, receive))
+
+    async def drain():
+        async for _ in request.stream():
+            pass
+
+    with pytest.raises(batch_jobs.UploadTooLarge):
+        asyncio.run(drain())
+    assert len(received) == 1024 * 1024 // CHUNK + 1
+
+
+def test_chunked_multipart_upload_stops_at_limit(manager):
+    pytest.importorskip('python_multipart')
+    chunks = multipart_chunks(64)  # 4 MB, Content-Length yok
+    status, read = post_jobs(chunks, content_type=MULTIPART)
+    assert status == 413
+    assert read <= 1024 * 1024 // CHUNK + 2
+    assert os.listdir(manager.directory) == []
@@ -0,0 +1,90 @@
+"""
+Ogg/Opus fixture: paket ayrıştırma, decode ve session config ack'i
+
+tests/fixtures/tone_440hz_1s.opus: 1 sn 440 Hz sinüs (genlik 0.3), 48 kHz mono,
+PyAV + libopus ile 24 kbit/s, 20 ms'lik paketler halinde kodlandı (4 KB)
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from audio_codec import OPUS_ENCODING, OpusStreamDecoder, available_encodings, iter_ogg_packets, iter_opus_packets
+from conftest import FIXTURES, Client
+from session import TranscriptionSession
+
+FIXTURE = os.path.join(FIXTURES, 'tone_440hz_1s.opus')
+PACKETS = 51  # 20 ms'lik ses paketi (encoder son kareyi tamamlar)
+
+
+def opus_packets():
+    with open(FIXTURE, 'rb') as f:
+        return list(iter_opus_packets(f))
+
+
+def test_ogg_packets_start_with_opus_headers():
+    with open(FIXTURE, 'rb') as f:
+        packets = list(iter_ogg_packets(f))
+    head, tags = packets[:2]
+    assert head[:8] == b'OpusHead' and tags[:8] == b'OpusTags'
+    channels, _, input_rate = struct.unpack('<BHI', head[9:16])
+    assert (channels, input_rate) == (1, 48000)
+    assert len(opus_packets()) == len(packets) - 2 == PACKETS
+
+
+def test_fixture_decodes_to_16k():
+    pytest.importorskip('opuslib')
+    decoder = OpusStreamDecoder(sample_rate=16000)
+    frames = [decoder.decode(packet) for packet in opus_packets()]
+    audio = np.concatenate(frames)
+    assert decoder.sample_rate == 16000
+    assert {len(frame) for frame in frames} == {320}  # 20 ms @ 16 kHz
+    assert len(audio) == PACKETS * 320
+    spectrum = np.abs(np.fft.rfft(audio[1000:15000]))
+    assert np.argmax(spectrum) * 16000 / 14000 == pytest.approx(440, abs=5)
+
+
+def start_session():
+    client = Client()
+    session = TranscriptionSession(client)
+    assert session.start()
+    return session, client
+
+
+def test_session_acks_opus_config_and_decodes_packets(stub_runtime):
+    pytest.importorskip('opuslib')
+    session, client = start_session()
+    try:
+        assert OPUS_ENCODING in client.of_type('session_started')[0]['audio_encodings']
+        session.handle_message(json.dumps({
+            'type': 'config', 'config_id': 7, 'config': {'audio_encoding': OPUS_ENCODING}
+        }))
+        ack = client.of_type('config_updated')[-1]
+        assert ack['config_id'] == 7
+        assert ack['config']['audio_encoding'] == OPUS_ENCODING
+        for packet in opus_packets():
+            session.handle_message(packet)
+        assert session.samples_received == PACKETS * 320
+    finally:
+        session.close()
+
+
+def test_session_without_opuslib_keeps_pcm(stub_runtime):
+    if OPUS_ENCODING in available_encodings():
+        pytest.skip('opuslib kurulu')
+    session, client = start_session()
+    try:
+        assert OPUS_ENCODING not in client.of_type('session_started')[0]['audio_encodings']
+        session.handle_message(json.dumps({
+            'type': 'config', 'config_id': 'a1', 'config': {'audio_encoding': OPUS_ENCODING}
+        }))
+        assert 'opuslib' in client.of_type('error')[-1]['error']
+        # Reddedilen encoding'e rağmen ack config_id ile gelir; PCM devam eder
+        ack = client.of_type('config_updated')[-1]
+        assert ack['config_id'] == 'a1'
+        assert ack['config']['audio_encoding'] == 'pcm_s16le'
+    finally:
+        session.close()
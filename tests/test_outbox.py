@@ -0,0 +1,107 @@
+"""
+Outbox: durum mesajlarının seyreltilmesi, tekrarların atılması ve batch frame'leri
+"""
+
+import types
+
+import pytest
+
+import outbox
+from outbox import Outbox
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox, 'time', types.SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def make_outbox(**kwargs):
+    sent = []
+    return Outbox(sent.append, **kwargs), sent
+
+
+def buffered(seconds):
+    return {'type': 'partial_transcript', 'text': f'[{seconds}s audio buffered...]'}
+
+
+def test_identical_status_is_sent_once(clock):
+    box, sent = make_outbox(interval=0.5)
+    for _ in range(3):
+        box.status('vad', {'type': 'vad_status', 'speaking': False}, state=False)
+        box.flush()
+        clock.now += 1.0
+    assert sent == [{'type': 'vad_status', 'speaking': False}]
+
+
+def test_status_is_throttled_to_the_interval(clock):
+    box, sent = make_outbox(interval=0.5)
+    for i in range(10):  # 125 ms'de bir, aynı durumda
+        box.status('buffer', buffered(i), state='buffering')
+        box.flush()
+        clock.now += 0.125
+    # 0, 0.5 ve 1. sn'de birer mesaj; aradakiler birleştirildi
+    assert sent == [buffered(0), buffered(4), buffered(8)]
+    box.flush()
+    assert len(sent) == 3  # Aralık dolmadı: son durum bekletilir
+    clock.now += 0.5
+    box.flush()
+    box.flush()
+    assert sent[3:] == [buffered(9)]  # Bekleyen durum yalnızca bir kez gider
+
+
+def test_state_change_is_sent_immediately(clock):
+    box, sent = make_outbox(interval=0.5)
+    box.status('vad', {'speaking': False}, state=False)
+    clock.now += 0.05
+    box.status('vad', {'speaking': True}, state=True)
+    box.flush()
+    assert sent == [{'speaking': False}, {'speaking': True}]
+
+
+def test_repeating_the_last_sent_status_drops_the_held_one(clock):
+    box, sent = make_outbox(interval=0.5)
+    box.status('buffer', buffered(1), state='buffering')
+    clock.now += 0.1
+    box.status('buffer', buffered(2), state='buffering')  # Bekletilir
+    box.status('buffer', buffered(1), state='buffering')  # Gönderilenle aynı
+    clock.now += 1.0
+    box.flush()
+    assert sent == [buffered(1)]
+
+
+def test_events_are_never_coalesced(clock):
+    box, sent = make_outbox(interval=0.5)
+    for _ in range(3):
+        box.post({'type': 'speech_started'})
+    box.flush()
+    assert sent == [{'type': 'speech_started'}] * 3
+
+
+def test_zero_interval_sends_every_status(clock):
+    box, sent = make_outbox(interval=0)
+    for _ in range(3):
+        box.status('vad', {'speaking': False}, state=False)
+    box.flush()
+    assert len(sent) == 3
+
+
+def test_batch_sends_one_frame_per_flush(clock):
+    box, sent = make_outbox(interval=0.5, batch=True)
+    box.post({'type': 'speech_started'})
+    box.status('vad', {'type': 'vad_status'}, state=True)
+    box.flush()
+    assert sent == [{'type': 'batch', 'message_type': 'batch',
+                     'messages': [{'type': 'speech_started'}, {'type': 'vad_status'}]}]
+    box.post({'type': 'speech_ended'})
+    box.flush()
+    assert sent[-1] == {'type': 'speech_ended'}  # Tek mesaj batch'e sarılmaz
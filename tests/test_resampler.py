@@ -0,0 +1,58 @@
+"""
+StreamingResampler: chunk'lı işlem tek seferlik işlemle aynı çıktıyı verir
+"""
+
+import numpy as np
+import pytest
+
+from resampler import StreamingResampler
+
+RATES = (8000, 22050, 44100, 48000, 16000)
+
+
+def tone(rate, seconds=1.0, freq=1000.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize('rate', RATES)
+def test_chunked_matches_one_shot(rate):
+    audio = tone(rate)
+    one_shot = StreamingResampler(rate).process(audio)
+
+    rng = np.random.default_rng(rate)
+    resampler = StreamingResampler(rate)
+    pieces, position = [], 0
+    while position < len(audio):
+        # Tek örneklik ve boş chunk'lar dahil düzensiz boyutlar
+        size = int(rng.choice([0, 1, 7, 160, 1024, 4099]))
+        pieces.append(resampler.process(audio[position:position + size]))
+        position += size
+    chunked = np.concatenate(pieces)
+
+    assert len(one_shot) == -(-len(audio) * 16000 // rate)
+    np.testing.assert_allclose(chunked, one_shot, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('rate', RATES)
+def test_tone_frequency_is_preserved(rate):
+    out = StreamingResampler(rate).process(tone(rate))
+    segment = out[2000:14000]  # Filtre gecikmesi dışında
+    spectrum = np.abs(np.fft.rfft(segment))
+    assert np.argmax(spectrum) * 16000 / len(segment) == pytest.approx(1000, abs=2)
+    assert np.abs(segment).max() == pytest.approx(0.5, abs=0.02)
+
+
+def test_reset_restarts_the_stream():
+    audio = tone(44100, 0.1)
+    resampler = StreamingResampler(44100)
+    first = resampler.process(audio)
+    resampler.reset()
+    np.testing.assert_array_equal(resampler.process(audio), first)
+
+
+def test_invalid_rates():
+    with pytest.raises(ValueError):
+        StreamingResampler(0)
+    with pytest.raises(ValueError):
+        StreamingResampler(16000, -1)
@@ -0,0 +1,69 @@
+"""
+Live işlerin batch (/jobs) geçişleri arkasında beklemesi
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from asr_engine import SAMPLE_RATE, StubEngine  # noqa: E402
+from inference import (  # noqa: E402
+    PRIORITY_BATCH, PRIORITY_LIVE, PRIORITY_PARTIAL, InferenceScheduler, class_limits_for
+)
+
+# Stub: 30 s'lik bölge 300 ms'de decode edilir
+PER_SECOND_MS = 10.0
+REGION_SECONDS = 30.0
+
+
+def region(seconds=REGION_SECONDS):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def run_live_during_batch(num_workers, regions=8, **kwargs):
+    """Submit regions batch jobs, then a live job once the first pass started"""
+    scheduler = InferenceScheduler(
+        StubEngine(base_ms=0, per_second_ms=PER_SECOND_MS),
+        num_workers=num_workers, max_batch_size=8, batch_wait_ms=20, **kwargs
+    )
+    try:
+        batch = [scheduler.submit(region(), priority=PRIORITY_BATCH, language='en') for _ in range(regions)]
+        time.sleep(0.05)  # Batch geçişi başladı
+        live = scheduler.submit(region(1.0), priority=PRIORITY_LIVE, language='en').result(timeout=10)
+        results = [future.result(timeout=30) for future in batch]
+        return live, results
+    finally:
+        scheduler.close()
+
+
+def test_default_limits_reserve_a_worker_from_batch():
+    assert class_limits_for({}, 1) == {PRIORITY_LIVE: 1, PRIORITY_PARTIAL: 1, PRIORITY_BATCH: 1}
+    assert class_limits_for({}, 4)[PRIORITY_BATCH] == 3
+    assert class_limits_for({PRIORITY_BATCH: 0}, 4)[PRIORITY_BATCH] == 3
+    assert class_limits_for({PRIORITY_BATCH: 4}, 4)[PRIORITY_BATCH] == 4
+    assert class_limits_for({PRIORITY_BATCH: 9}, 2)[PRIORITY_BATCH] == 2
+
+
+def test_live_job_waits_at_most_one_region_on_a_single_worker():
+    live, results = run_live_during_batch(num_workers=1)
+    region_ms = REGION_SECONDS * PER_SECOND_MS
+    # Tek geçişte 8 bölge (2.4 s) yerine en fazla bir bölgenin decode'u beklenir
+    assert live.queue_ms < region_ms * 1.5
+    assert max(result.batch_size for result in results) == 1
+
+
+def test_batch_pass_seconds_groups_short_regions():
+    _, results = run_live_during_batch(num_workers=1, regions=4, batch_pass_seconds=2 * REGION_SECONDS)
+    assert max(result.batch_size for result in results) == 2
+
+
+def test_live_job_gets_the_reserved_worker():
+    live, _ = run_live_during_batch(num_workers=2, batch_pass_seconds=8 * REGION_SECONDS)
+    # Batch tek worker kullanır; live iş hiç beklemez
+    assert live.queue_ms < 100
@@ -0,0 +1,70 @@
+"""
+Session ses buffer'ı taşması ve overloaded bildirimi
+"""
+
+import numpy as np
+
+import runtime
+from asr_engine import SAMPLE_RATE
+from conftest import Client, noise, pcm_frames
+from session import TranscriptionSession, quietest_cut
+
+
+def start_session(monkeypatch, buffer_seconds=2.0):
+    monkeypatch.setattr(runtime, 'MAX_BUFFER_SECONDS', buffer_seconds)
+    client = Client()
+    session = TranscriptionSession(client)
+    assert session.start()
+    return session, client
+
+
+def test_silence_never_reports_overload(stub_runtime, monkeypatch):
+    session, client = start_session(monkeypatch)
+    try:
+        # Buffer'ın 5 katı düşük seviyeli gürültü: VAD konuşma görmez
+        for frame in pcm_frames(noise(10.0)):
+            session.handle_message(frame)
+        assert client.of_type('overloaded') == []
+        assert session.dropped_audio_samples == 0
+        assert not session.overloaded
+        assert len(session.audio_buffer) <= session.speech_pad
+    finally:
+        session.close()
+
+
+def test_overflow_episode_end_clears_overload(stub_runtime, monkeypatch):
+    session, client = start_session(monkeypatch)
+    try:
+        with session._lock:
+            session.note_buffer_overflow(1600)
+            session.note_buffer_overflow(1600)  # Aynı taşma: tekrar bildirilmez
+            session.note_buffer_overflow(0)
+        messages = client.of_type('overloaded')
+        assert [m['overloaded'] for m in messages] == [True, False]
+        assert messages[0]['dropped_audio_s'] == 0.1
+        assert not session.overloaded
+    finally:
+        session.close()
+
+
+def test_long_speech_keeps_its_start(stub_runtime, monkeypatch):
+    # Buffer'dan uzun konuşma: baştaki ses atılmaz, parça parça commit edilir
+    session, client = start_session(monkeypatch, buffer_seconds=3.0)
+    try:
+        words = np.zeros(SAMPLE_RATE * 8, dtype=np.float32)
+        for start in range(0, len(words), SAMPLE_RATE // 2):
+            words[start:start + int(SAMPLE_RATE * 0.4)] = 0.3  # 0.4 s kelime + 0.1 s boşluk
+        for frame in pcm_frames(np.concatenate([words, np.zeros(SAMPLE_RATE, dtype=np.float32)])):
+            session.handle_message(frame)
+        assert session.dropped_audio_samples == 0
+        assert client.of_type('overloaded') == []
+    finally:
+        session.close()
+
+
+def test_quietest_cut_prefers_the_latest_quiet_frame():
+    audio = np.full(SAMPLE_RATE * 3, 0.3, dtype=np.float32)
+    for start in (int(SAMPLE_RATE * 0.5), int(SAMPLE_RATE * 2.5)):
+        audio[start:start + 1600] = 0.0
+    cut = quietest_cut(audio, SAMPLE_RATE)
+    assert int(SAMPLE_RATE * 2.5) <= cut < int(SAMPLE_RATE * 2.5) + 1600
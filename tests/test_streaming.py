@@ -0,0 +1,80 @@
+"""
+HypothesisBuffer (LocalAgreement-2): yalnızca üzerinde anlaşılan ön ek kesinleşir
+"""
+
+import json
+import re
+
+import numpy as np
+
+from asr_engine import SAMPLE_RATE
+from conftest import Client, pcm_frames
+from session import TranscriptionSession
+from streaming import HypothesisBuffer, words_text
+
+
+def hypothesis(*texts, start=0.0, step=0.5):
+    return [
+        {'text': f' {text}', 'start': start + i * step, 'end': start + i * step + 0.4}
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_first_hypothesis_commits_nothing():
+    buffer = HypothesisBuffer()
+    buffer.insert(hypothesis('hello', 'world'))
+    assert buffer.flush() == []
+    assert buffer.pending_text == 'hello world'
+
+
+def test_commits_only_the_agreed_prefix():
+    buffer = HypothesisBuffer()
+    buffer.insert(hypothesis('hello', 'word'))
+    buffer.flush()
+    # Büyük/küçük harf ve noktalama farkı anlaşmayı bozmaz; ilk farklı kelimede durulur
+    buffer.insert(hypothesis('Hello,', 'world', 'again'))
+    assert words_text(buffer.flush()) == 'Hello,'
+    assert buffer.pending_text == 'world again'
+
+    buffer.insert(hypothesis('Hello,', 'world', 'again', 'today'))
+    assert words_text(buffer.flush()) == 'world again'
+    assert buffer.pending_text == 'today'
+    assert buffer.last_committed_time == 1.4
+
+
+def test_committed_words_are_not_repeated():
+    buffer = HypothesisBuffer()
+    for _ in range(2):
+        buffer.insert(hypothesis('one', 'two', 'three'))
+        committed = buffer.flush()
+    assert words_text(committed) == 'one two three'
+    # Örtüşen sesten yeniden çözülen kuyruk ('three') atılır
+    buffer.insert(hypothesis('three', 'four', start=1.1))
+    assert [w['text'].strip() for w in buffer.new] == ['four']
+    assert words_text(buffer.finalize()) == 'four'
+    assert buffer.pending_text == ''
+
+
+def test_commit_until_keeps_words_crossing_the_cut():
+    buffer = HypothesisBuffer()
+    buffer.insert(hypothesis('a', 'b', 'c'), offset=10.0)
+    assert words_text(buffer.commit_until(11.0)) == 'a b'
+    assert buffer.pending_text == 'c'
+
+
+def test_streaming_final_without_new_text_logs_no_empty_line(stub_runtime, capsys):
+    client = Client()
+    session = TranscriptionSession(client)
+    assert session.start()
+    try:
+        session.handle_message(json.dumps({'type': 'config', 'config': {'streaming': True}}))
+        audio = np.zeros(SAMPLE_RATE * 4, dtype=np.float32)
+        for start in range(0, SAMPLE_RATE * 2, SAMPLE_RATE // 2):
+            audio[start:start + int(SAMPLE_RATE * 0.4)] = 0.3
+        for frame in pcm_frames(audio):
+            session.handle_message(frame)
+        session.close()
+        assert client.of_type('committed_transcript')
+        assert not re.search(r'📝 \[\d+ms\] *$', capsys.readouterr().out, re.MULTILINE)
+    finally:
+        session.close()
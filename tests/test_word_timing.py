@@ -0,0 +1,59 @@
+"""
+word_timing: kelime / segment zamanlarının mesaj formatları
+"""
+
+import json
+
+from word_timing import encode_segments, encode_words, timing_fields, words_span
+
+WORDS = [
+    {'text': ' Merhaba', 'start': 0.0, 'end': 0.42, 'probability': 0.98765},
+    {'text': ' dünya', 'start': 0.5, 'end': 0.9, 'probability': 0.5},
+    {'text': '.', 'start': 0.9, 'end': 0.95, 'probability': 0.12345},
+]
+SEGMENTS = [{'text': ' Merhaba dünya.', 'start': 0.0, 'end': 0.95, 'words': WORDS}]
+
+
+def from_arrays(encoded):
+    """Client side: parallel arrays back to one dict per item"""
+    return [dict(zip(encoded, values)) for values in zip(*encoded.values())]
+
+
+def test_word_arrays_round_trip():
+    encoded = json.loads(json.dumps(encode_words(WORDS, 'arrays')))
+    assert set(encoded) == {'text', 'start', 'end', 'probability'}
+    assert from_arrays(encoded) == [dict(word, probability=round(word['probability'], 3)) for word in WORDS]
+
+
+def test_segment_arrays_round_trip():
+    encoded = json.loads(json.dumps(encode_segments(SEGMENTS, 'arrays')))
+    assert from_arrays(encoded) == encode_segments(SEGMENTS) == [
+        {'text': ' Merhaba dünya.', 'start': 0.0, 'end': 0.95}
+    ]
+
+
+def test_arrays_are_smaller_than_objects():
+    objects = json.dumps(encode_words(WORDS * 20, 'objects'))
+    arrays = json.dumps(encode_words(WORDS * 20, 'arrays'))
+    assert len(arrays) < len(objects) * 0.7
+
+
+def test_empty_input_encodes_to_none():
+    assert encode_words([], 'arrays') is None
+    assert encode_segments(None, 'arrays') is None
+    assert words_span([], 'x') is None
+
+
+def test_timing_fields_follow_the_mode():
+    assert timing_fields({'word_timing': 'off'}, WORDS, SEGMENTS) == {'words': None}
+    assert timing_fields({'word_timing': 'segment', 'word_format': 'arrays'}, WORDS, SEGMENTS) == {
+        'words': None, 'segments': encode_segments(SEGMENTS, 'arrays')
+    }
+    assert timing_fields({}, WORDS, SEGMENTS) == {'words': WORDS}
+    assert timing_fields({'word_format': 'arrays'}, WORDS, SEGMENTS)['words']['text'] == [
+        ' Merhaba', ' dünya', '.'
+    ]
+
+
+def test_words_span_covers_all_words():
+    assert words_span(WORDS, 'Merhaba dünya.') == [{'text': 'Merhaba dünya.', 'start': 0.0, 'end': 0.95}]
@@ -0,0 +1,117 @@
+"""
+Utterance başına aşama izleme (tracing)
+
+Her ASR işi (final utterance veya streaming partial'ı) bir UtteranceTrace
+taşır; session ve utterance id'leriyle ilişkilendirilmiş aşama süreleri
+burada toplanır:
+
+  receive.decode   utterance'a giren chunk'ların payload decode'u (toplam)
+  vad              aynı chunk'ların VAD değerlendirmesi (toplam)
+  buffer.copy      utterance sesinin buffer'dan kopyalanması
+  queue.session    session kuyruğunda bekleme
+  queue.scheduler  paylaşılan scheduler kuyruğunda bekleme
+  asr.transcribe   motorun decode süresi (batch'te batch süresi)
+  postprocess      commit / LocalAgreement ve mesajın hazırlanması
+  send             JSON serileştirme + transport'a yazma
+
+TRACE_FILE verilirse span'ler OpenTelemetry span alanlarıyla (trace_id,
+span_id, parent_span_id, start/end_time_unix_nano, attributes) JSONL olarak
+arka planda yazılır. Chunk aşamaları toplam süredir (attributes.chunks).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Span'lerin yazılacağı JSONL dosyası (boş: export kapalı)
+TRACE_FILE = os.environ.get("TRACE_FILE")
+
+
+class UtteranceTrace:
+    """Stage timings of one ASR job"""
+
+    def __init__(self, session_id, utterance_id, kind):
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.utterance_id = utterance_id
+        self.kind = kind
+        self.started = time.time()
+        self.stages = []  # (name, start (unix s), duration (s), attributes)
+        self.attributes = {}
+
+    def add(self, name, duration, start=None, **attributes):
+        """Record a stage; start defaults to 'duration seconds ago'"""
+        if start is None:
+            start = time.time() - duration
+        self.stages.append((name, start, max(0.0, duration), attributes))
+
+    def stage_ms(self):
+        """Stage name -> milliseconds (client breakdown)"""
+        totals = {}
+        for name, _, duration, _ in self.stages:
+            totals[name] = totals.get(name, 0.0) + duration * 1000
+        return {name: round(ms, 2) for name, ms in totals.items()}
+
+    def to_spans(self):
+        """Root 'utterance' span plus one child span per stage (OpenTelemetry fields)"""
+        root_id = uuid.uuid4().hex[:16]
+        common = {'session.id': self.session_id, 'utterance.id': self.utterance_id}
+        # Chunk aşamaları işin oluşturulmasından önce başlar
+        begin = min([self.started] + [start for _, start, _, _ in self.stages])
+        end = max([self.started] + [start + duration for _, start, duration, _ in self.stages])
+        spans = [{
+            'trace_id': self.trace_id,
+            'span_id': root_id,
+            'parent_span_id': None,
+            'name': 'utterance',
+            'start_time_unix_nano': int(begin * 1e9),
+            'end_time_unix_nano': int(end * 1e9),
+            'attributes': dict(common, **{'utterance.kind': self.kind}, **self.attributes)
+        }]
+        for name, start, duration, attributes in self.stages:
+            spans.append({
+                'trace_id': self.trace_id,
+                'span_id': uuid.uuid4().hex[:16],
+                'parent_span_id': root_id,
+                'name': name,
+                'start_time_unix_nano': int(start * 1e9),
+                'end_time_unix_nano': int((start + duration) * 1e9),
+                'attributes': dict(common, **attributes)
+            })
+        return spans
+
+
+class JsonlExporter:
+    """Append spans to a JSONL file from a background thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def export(self, trace):
+        self._queue.put(trace)
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                traces = [self._queue.get()]
+                # Birikmiş trace'ler tek yazımda
+                while not self._queue.empty():
+                    traces.append(self._queue.get_nowait())
+                for trace in traces:
+                    for span in trace.to_spans():
+                        f.write(json.dumps(span, ensure_ascii=False) + '\n')
+                f.flush()
+
+
+exporter = JsonlExporter(TRACE_FILE) if TRACE_FILE else None
+
+
+def export(trace):
+    if exporter is not None and trace is not None:
+        exporter.export(trace)
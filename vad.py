@@ -0,0 +1,308 @@
+"""
+Batched Silero VAD servisi
+
+Her session kendi VADStream'ini (recurrent state + context) tutar ve
+512 örneklik pencerelerini servise gönderir. Servis thread'i tüm aktif
+session'lardan bekleyen pencereleri toplar ve tek bir batched forward
+çağrısında değerlendirir; session başına olasılıklar Future ile döner.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+VAD_FRAME_SIZE = 512  # 32ms @ 16kHz
+VAD_CONTEXT_SIZE = 64  # Silero v5 her pencereye önceki 64 örneği ekler
+
+
+VAD_BACKENDS = ('torch', 'onnx')
+
+
+class VADBackend:
+    """
+    VAD backend arayüzü.
+
+    initial_state() tek bir session için başlangıç state'ini döner.
+    __call__(frames, states) (B, 512) float32 pencereleri ve B adet
+    state'i alır; (probs[B], new_states) döner.
+    """
+
+    def initial_state(self):
+        raise NotImplementedError
+
+    def __call__(self, frames, states):
+        raise NotImplementedError
+
+
+class SileroTorchBackend(VADBackend):
+    """
+    Silero VAD (torch.hub JIT modeli) için batched çağrı sarmalayıcısı.
+
+    JIT model recurrent state'i kendi içinde tutar; her batch öncesinde
+    session state'leri modele yüklenir, sonrasında geri okunur.
+    """
+
+    def __init__(self, model):
+        import torch
+        self.torch = torch
+        self.model = model
+
+    def initial_state(self):
+        torch = self.torch
+        return (torch.zeros((2, 1, 128)), torch.zeros((1, VAD_CONTEXT_SIZE)))
+
+    def __call__(self, frames, states):
+        """Evaluate (B, 512) frames; returns (probs[B], new_states)"""
+        torch = self.torch
+        batch_size = frames.shape[0]
+
+        with torch.no_grad():
+            self.model._state = torch.cat([state for state, _ in states], dim=1)
+            self.model._context = torch.cat([context for _, context in states], dim=0)
+            self.model._last_sr = SAMPLE_RATE
+            self.model._last_batch_size = batch_size
+
+            out = self.model(torch.from_numpy(frames), SAMPLE_RATE)
+
+            new_states = list(zip(
+                self.model._state.split(1, dim=1),
+                self.model._context.split(1, dim=0)
+            ))
+        return out.reshape(-1).numpy(), new_states
+
+
+class SileroOnnxBackend(VADBackend):
+    """
+    Silero VAD, ONNX Runtime (CPU) üzerinde.
+
+    Doğrudan NumPy float32 pencerelerle çalışır; torch import edilmez.
+    State ve context session başına NumPy dizileri olarak tutulur.
+    """
+
+    def __init__(self, model_path, num_threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.inter_op_num_threads = 1
+        options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self._sr = np.array(SAMPLE_RATE, dtype=np.int64)
+
+    def initial_state(self):
+        return (
+            np.zeros((2, 1, 128), dtype=np.float32),
+            np.zeros((1, VAD_CONTEXT_SIZE), dtype=np.float32)
+        )
+
+    def __call__(self, frames, states):
+        """Evaluate (B, 512) frames; returns (probs[B], new_states)"""
+        contexts = np.concatenate([context for _, context in states], axis=0)
+        x = np.concatenate([contexts, frames], axis=1)
+        out, state = self.session.run(None, {
+            'input': x,
+            'state': np.concatenate([state for state, _ in states], axis=1),
+            'sr': self._sr
+        })
+
+        new_contexts = x[:, -VAD_CONTEXT_SIZE:]
+        new_states = [
+            (state[:, i:i + 1], new_contexts[i:i + 1])
+            for i in range(frames.shape[0])
+        ]
+        return out.reshape(-1), new_states
+
+
+def load_vad_backend(backend='torch', model_path=None):
+    """
+    Create a VAD backend.
+
+    torch: model_path verilirse yerel JIT dosyası, yoksa torch.hub.
+    onnx: model_path (yerel .onnx dosyası) zorunlu, ağ erişimi gerekmez.
+    """
+    if backend == 'onnx':
+        if not model_path:
+            raise ValueError("ONNX VAD backend için VAD_MODEL_PATH gerekli")
+        return SileroOnnxBackend(model_path)
+
+    if backend == 'torch':
+        import torch
+        if model_path:
+            model = torch.jit.load(model_path)
+        else:
+            model, _ = torch.hub.load(
+                repo_or_dir='snakers4/silero-vad',
+                model='silero_vad',
+                force_reload=False,
+                onnx=False
+            )
+        model.eval()
+        return SileroTorchBackend(model)
+
+    raise ValueError(f"Unknown VAD backend: {backend} (expected one of {VAD_BACKENDS})")
+
+
+class VADStream:
+    """Per-session VAD state"""
+
+    def __init__(self, backend):
+        self.state = backend.initial_state()
+
+
+class _VADRequest:
+    __slots__ = ('stream', 'frames', 'probs', 'future')
+
+    def __init__(self, stream, frames):
+        self.stream = stream
+        self.frames = frames
+        self.probs = np.zeros(len(frames), dtype=np.float32)
+        self.future = Future()
+
+
+class VADService:
+    """
+    Central VAD evaluator shared by all sessions.
+
+    Bir request birden fazla ardışık pencere içerebilir; pencereler sırayla
+    (zaman adımı başına bir batch) işlenir, böylece her session'ın
+    recurrent state'i doğru ilerler.
+    """
+
+    def __init__(self, backend, max_batch_size=64, batch_wait_ms=2):
+        self.backend = backend
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._pending = []
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._loop, name="vad-service", daemon=True)
+        self._thread.start()
+
+    def new_stream(self):
+        return VADStream(self.backend)
+
+    def submit(self, stream, frames):
+        """Queue (n, 512) float32 frames of one stream; returns Future[np.ndarray]"""
+        frames = np.asarray(frames, dtype=np.float32).reshape(-1, VAD_FRAME_SIZE)
+        request = _VADRequest(stream, frames)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def _take_pending(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # Diğer session'ların pencerelerinin de gelmesi için kısa bekle
+            deadline = time.monotonic() + self.batch_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            requests, self._pending = self._pending, []
+        return requests
+
+    def _loop(self):
+        while True:
+            requests = self._take_pending()
+            try:
+                self._evaluate(requests)
+            except Exception as e:
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            for request in requests:
+                request.future.set_result(request.probs)
+
+    def _evaluate(self, requests):
+        steps = max(len(request.frames) for request in requests)
+        for step in range(steps):
+            active = [r for r in requests if step < len(r.frames)]
+            for i in range(0, len(active), self.max_batch_size):
+                group = active[i:i + self.max_batch_size]
+                frames = np.stack([r.frames[step] for r in group])
+                probs, states = self.backend(frames, [r.stream.state for r in group])
+                for request, prob, state in zip(group, probs, states):
+                    request.probs[step] = prob
+                    request.stream.state = state
+
+
+class StreamingVAD:
+    """
+    Per-session streaming VAD stage.
+
+    Gelen her chunk'ın tüm 512 örneklik pencerelerini (tek batched istekle)
+    değerlendirir; pencereye tam oturmayan kalan örnekler bir sonraki chunk'a
+    taşınır. Silero'nun get_speech_timestamps mantığındaki gibi histerezis
+    uygular: konuşma `threshold` üstünde başlar, `threshold - 0.15` altında
+    `min_silence_ms` boyunca kalınca biter. Zaman damgaları session başından
+    itibaren örnek cinsindendir.
+    """
+
+    def __init__(self, service, threshold=0.5, min_silence_ms=500):
+        self.service = service
+        self.stream = service.new_stream()
+        self.threshold = threshold
+        self.min_silence_ms = min_silence_ms
+        self.position = 0  # VAD'dan geçmiş örnek sayısı
+        self.triggered = False
+        self.speech_start = 0
+        self.last_prob = 0.0
+        self._temp_end = 0
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    @property
+    def neg_threshold(self):
+        return max(self.threshold - 0.15, 0.01)
+
+    def process(self, chunk):
+        """Feed new samples; returns (events, probs) for the completed frames"""
+        if len(self._remainder):
+            audio = np.concatenate([self._remainder, chunk])
+        else:
+            audio = np.asarray(chunk, dtype=np.float32)
+
+        n_frames = len(audio) // VAD_FRAME_SIZE
+        used = n_frames * VAD_FRAME_SIZE
+        self._remainder = audio[used:].copy()
+        if n_frames == 0:
+            return [], np.zeros(0, dtype=np.float32)
+
+        probs = self.service.submit(self.stream, audio[:used]).result()
+
+        events = []
+        min_silence = int(SAMPLE_RATE * self.min_silence_ms / 1000)
+        for prob in probs:
+            frame_start = self.position
+            self.position += VAD_FRAME_SIZE
+
+            if prob >= self.threshold:
+                self._temp_end = 0
+                if not self.triggered:
+                    self.triggered = True
+                    self.speech_start = frame_start
+                    events.append({'type': 'speech_started', 'start': frame_start})
+            elif prob < self.neg_threshold and self.triggered:
+                if not self._temp_end:
+                    self._temp_end = frame_start
+                if self.position - self._temp_end >= min_silence:
+                    events.append({
+                        'type': 'speech_ended',
+                        'start': self.speech_start,
+                        'end': self._temp_end
+                    })
+                    self.triggered = False
+                    self._temp_end = 0
+
+        self.last_prob = float(probs[-1])
+        return events, probs
@@ -0,0 +1,67 @@
+"""
+Transcript mesajlarında kelime / segment zamanları
+
+word_timing (session config):
+  auto     kelime zamanları decode zaten hesaplıyorsa gönderilir (streaming,
+           zaman tabanlı kesimler); ek maliyet yok (varsayılan)
+  off      zaman bilgisi gönderilmez
+  segment  yalnızca segment başı/sonu ('segments'); kelime hizalaması yapılmaz
+  full     her kelimenin zamanı; word_timestamps=True ile decode edilir
+           (cross-attention hizalaması, maliyet: benchmarks/bench_word_timing.py)
+
+word_format:
+  objects  [{"text", "start", "end", "probability"}, ...] (varsayılan)
+  arrays   {"text": [...], "start": [...], "end": [...], "probability": [...]}
+           paralel diziler: anahtarlar kelime başına tekrarlanmaz
+"""
+
+WORD_TIMING_MODES = ('auto', 'off', 'segment', 'full')
+WORD_FORMATS = ('objects', 'arrays')
+
+
+def encode_words(words, word_format='objects'):
+    """Words in the requested payload format (None: no words)"""
+    if not words:
+        return None
+    if word_format == 'arrays':
+        return {
+            'text': [word['text'] for word in words],
+            'start': [word['start'] for word in words],
+            'end': [word['end'] for word in words],
+            'probability': [round(word['probability'], 3) for word in words]
+        }
+    return words
+
+
+def encode_segments(segments, word_format='objects'):
+    """Segment text and bounds without words (None: no segments)"""
+    if not segments:
+        return None
+    if word_format == 'arrays':
+        return {
+            'text': [segment['text'] for segment in segments],
+            'start': [segment['start'] for segment in segments],
+            'end': [segment['end'] for segment in segments]
+        }
+    return [
+        {'text': segment['text'], 'start': segment['start'], 'end': segment['end']}
+        for segment in segments
+    ]
+
+
+def words_span(words, text):
+    """A single segment covering words (streaming commits have no model segments)"""
+    if not words:
+        return None
+    return [{'text': text, 'start': words[0]['start'], 'end': words[-1]['end']}]
+
+
+def timing_fields(config, words, segments):
+    """'words' / 'segments' fields of a transcript message for the session config"""
+    mode = config.get('word_timing', 'auto')
+    word_format = config.get('word_format', 'objects')
+    if mode == 'off':
+        return {'words': None}
+    if mode == 'segment':
+        return {'words': None, 'segments': encode_segments(segments, word_format)}
+    return {'words': encode_words(words, word_format)}